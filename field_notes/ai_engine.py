@@ -1,19 +1,140 @@
-import requests
+import asyncio
 import json
 import logging
 
+import http_pool
+from cancellation import GenerationCancelled, run_cancellable, run_in_thread
+from json_stream import JsonValueScanner, first_json_text
+from model_catalog import CATALOG, pick_model
+
 # --- CONFIGURATION ---
 DEFAULT_MODEL = "llama3.1:8b"
 OLLAMA_URL = "http://localhost:11434/api/generate"
+DEFAULT_NUM_CTX = 8192 # Context window requested from Ollama (chunk_planner sizes tasks against it)
+DEFAULT_CONCURRENCY = http_pool.MAX_PER_HOST # agenerate_many calls in flight; keeps the backend's batch slots full
+# Shape of the nibbler/scan event lists. Plain `format: json` forces an object, so list prompts pass this.
+EVENT_LIST_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "date": {"type": "string"},
+            "summary": {"type": "string"},
+            "evidence": {"type": "string"},
+            "sensitivity": {"type": "string"},
+            "tags": {"type": "array", "items": {"type": "string"}}
+        },
+        "required": ["date", "summary"]
+    }
+}
 
 class CognitiveEngine:
     """
     Abstract Base Class for the AI Interface.
     Use this to decouple the Portfolio logic from the specific AI provider.
     """
-    def generate(self, prompt, context="", options=None):
+    def generate(self, prompt, context="", options=None, on_token=None, cancel=None):
+        """
+        on_token(piece) is called as output arrives; cancel is a CancelToken. A tripped
+        token raises GenerationCancelled and the partial output is discarded.
+        """
         raise NotImplementedError("Subclasses must implement generate()")
 
+    def generate_json(self, prompt, context="", options=None, schema=None, on_token=None, cancel=None):
+        """
+        Structured-output mode: returns the text of the first complete JSON value in the
+        response (the raw response if none closes). Engines that support constrained
+        decoding override this to stream and stop as soon as the value closes.
+        """
+        response = self.generate(prompt, context, options, on_token=on_token, cancel=cancel)
+        return first_json_text(response) or response
+
+    async def agenerate(self, prompt, context="", options=None, on_token=None, cancel=None):
+        """
+        Coroutine form of generate(). By default the call runs on a worker thread over the
+        pooled transport (http_pool); cancelling the awaiting task aborts the generation.
+        Engines with a native async protocol override this.
+        """
+        return await run_in_thread(lambda token: self.generate(prompt, context, options, on_token, token), cancel)
+
+    async def agenerate_json(self, prompt, context="", options=None, schema=None, on_token=None, cancel=None):
+        return await run_in_thread(
+            lambda token: self.generate_json(prompt, context, options, schema, on_token, token), cancel)
+
+    async def agenerate_many(self, calls, concurrency=DEFAULT_CONCURRENCY, timeout=None, structured=False):
+        """
+        Runs calls (prompts, or dicts of agenerate keyword arguments) with at most
+        concurrency in flight and returns their results in order. structured uses
+        agenerate_json. A call that raises, or runs past timeout seconds (it is then
+        aborted), contributes its exception instead of a result.
+        """
+        slots = asyncio.Semaphore(concurrency)
+        run = self.agenerate_json if structured else self.agenerate
+
+        async def _one(call):
+            kwargs = call if isinstance(call, dict) else {"prompt": call}
+            async with slots:
+                return await asyncio.wait_for(run(**kwargs), timeout)
+
+        return await asyncio.gather(*(_one(call) for call in calls), return_exceptions=True)
+
+def stream_ollama(url, payload, on_token=None, cancel=None, timeout=120, proxies=None):
+    """
+    Streams an Ollama generate call and returns the full text. on_token(piece) may return
+    True to stop early. Stopping, or cancel tripping from any thread, drops the connection,
+    which makes Ollama abort the generation; cancellation raises GenerationCancelled.
+    With a cancel token the request runs on a helper thread, so on_token does too.
+    Goes through the host's pooled keep-alive session; a refused connection is retried.
+    """
+    payload = dict(payload, stream=True)
+
+    def _stream():
+        pieces = []
+        # timeout bounds each read (time to first token, gaps between tokens), not the whole call
+        with http_pool.stream("POST", url, json=payload, timeout=timeout, proxies=proxies,
+                              idempotent=True) as response:
+            release = cancel.on_cancel(response.close) if cancel else None
+            try:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if cancel:
+                        cancel.check()
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    piece = chunk.get('response', '')
+                    pieces.append(piece)
+                    # Past `done` the body ends on its own; reading it out keeps the connection alive
+                    if on_token and on_token(piece):
+                        break
+            except Exception:
+                if cancel:
+                    cancel.check() # A read cut short by the closer surfaces as cancellation
+                raise
+            finally:
+                if release:
+                    release()
+        if cancel:
+            cancel.check()
+        return "".join(pieces)
+
+    return run_cancellable(_stream, cancel)
+
+def stream_ollama_json(url, payload, schema=None, on_token=None, cancel=None, timeout=120, proxies=None):
+    """
+    stream_ollama constrained to JSON (`format` is the schema, or "json" for any object),
+    fed through a JsonValueScanner that hangs up as soon as the value closes.
+    """
+    scanner = JsonValueScanner()
+
+    def _feed(piece):
+        if on_token:
+            on_token(piece)
+        return scanner.feed(piece)
+
+    stream_ollama(url, dict(payload, format=schema or "json"), _feed, cancel, timeout, proxies)
+    return scanner.text
+
 class OllamaClient(CognitiveEngine):
     """
     Direct Model Access (DMA) client.
@@ -22,37 +143,23 @@ class OllamaClient(CognitiveEngine):
     """
     def __init__(self, model=DEFAULT_MODEL, url=OLLAMA_URL):
         self.url = url
-        self.model = model # Default
+        self.requested_model = model
+        self._model = None
 
-        try:
-            tags_url = url.replace("/api/generate", "/api/tags")
-            response = requests.get(tags_url, timeout=5)
-            response.raise_for_status()
-            models = [m.get('name') for m in response.json().get('models', [])]
-            
-            if not models:
-                logging.warning("Ollama /api/tags returned no models. Using configured default.")
-                return
-
-            if model in models:
-                self.model = model
-            else:
-                logging.warning(f"Model '{model}' not found in Ollama.")
-                # Find a non-embedding model as a fallback
-                fallback_model = next((m for m in models if "embed" not in m), None)
-                
-                if fallback_model:
-                    self.model = fallback_model
-                    logging.warning(f"Falling back to first available model: {self.model}")
-                else:
-                    logging.error("No suitable fallback models found in Ollama.")
-                    # Stick with original model and likely fail
-        except Exception as e:
-            logging.error(f"Failed to probe Ollama for models: {e}. Using configured default.")
+    @property
+    def model(self):
+        """Resolved against the shared model catalog on first use, so construction costs nothing."""
+        if self._model is None:
+            self._model = pick_model(self.requested_model, CATALOG.models(self.url))
+        return self._model
 
-    def generate(self, prompt, context="", options=None):
+    @model.setter
+    def model(self, value):
+        self._model = value
+
+    def generate(self, prompt, context="", options=None, on_token=None, cancel=None):
         """
-        Generates a response from Ollama.
+        Generates a response from Ollama (streamed, so it can be cancelled mid-flight).
         """
         full_prompt = prompt
         if context:
@@ -61,15 +168,29 @@ class OllamaClient(CognitiveEngine):
         payload = {
             "model": self.model,
             "prompt": full_prompt,
-            "stream": False,
-            "options": options or {"temperature": 0.1, "num_ctx": 8192}
+            "options": options or {"temperature": 0.1, "num_ctx": DEFAULT_NUM_CTX}
         }
         
         try:
-            # 120s timeout for reasoning-heavy tasks on 11GB VRAM
-            response = requests.post(self.url, json=payload, timeout=120)
-            response.raise_for_status()
-            return response.json()['response']
+            # 120s read timeout for reasoning-heavy tasks on 11GB VRAM
+            return stream_ollama(self.url, payload, on_token, cancel)
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            logging.error(f"Ollama Error: {e}")
+            return None
+
+    def generate_json(self, prompt, context="", options=None, schema=None, on_token=None, cancel=None):
+        full_prompt = f"{context}\n\n{prompt}" if context else prompt
+        payload = {
+            "model": self.model,
+            "prompt": full_prompt,
+            "options": options or {"temperature": 0.1, "num_ctx": DEFAULT_NUM_CTX}
+        }
+        try:
+            return stream_ollama_json(self.url, payload, schema, on_token, cancel)
+        except GenerationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Ollama Error: {e}")
             return None
@@ -91,36 +212,52 @@ class AcmeLabClient(CognitiveEngine):
             proxies = {"http": None, "https": None}
             payload = {"model": self.model, "prompt": "wake up", "keep_alive": "10m", "stream": False}
             # 90s timeout for cold-start model loading on Windows
-            requests.post(self.url, json=payload, timeout=90, proxies=proxies)
+            http_pool.post(self.url, json=payload, timeout=90, proxies=proxies, idempotent=True)
             return True
         except Exception as e:
             logging.error(f"Prime failed: {e}")
             return False
 
-    def generate(self, prompt, context="", options=None):
+    def generate(self, prompt, context="", options=None, on_token=None, cancel=None):
         full_prompt = f"{context}\n\n{prompt}" if context else prompt
         payload = {
             "model": self.model,
             "prompt": full_prompt,
-            "stream": False,
-            "options": options or {"temperature": 0.1, "num_ctx": 8192}
+            "options": options or {"temperature": 0.1, "num_ctx": DEFAULT_NUM_CTX}
         }
         try:
             proxies = {"http": None, "https": None}
-            # 120s timeout for complex brain reasoning
-            response = requests.post(self.url, json=payload, timeout=120, proxies=proxies)
-            response.raise_for_status()
-            return response.json()['response']
+            # 120s read timeout for complex brain reasoning
+            return stream_ollama(self.url, payload, on_token, cancel, proxies=proxies)
+        except GenerationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Brain Connection Failed: {e}. Falling back to Pinky.")
             # Fallback to local Ollama
-            return OllamaClient().generate(prompt, context, options)
+            return OllamaClient().generate(prompt, context, options, on_token, cancel)
+
+    def generate_json(self, prompt, context="", options=None, schema=None, on_token=None, cancel=None):
+        full_prompt = f"{context}\n\n{prompt}" if context else prompt
+        payload = {
+            "model": self.model,
+            "prompt": full_prompt,
+            "options": options or {"temperature": 0.1, "num_ctx": DEFAULT_NUM_CTX}
+        }
+        try:
+            return stream_ollama_json(self.url, payload, schema, on_token, cancel,
+                                      proxies={"http": None, "https": None})
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            logging.error(f"Brain Connection Failed: {e}. Falling back to Pinky.")
+            return OllamaClient().generate_json(prompt, context, options, schema, on_token, cancel)
 
 # --- FACTORY ---
 def get_engine(mode="LOCAL"):
+    from llm_cache import cached # llm_cache builds on this module
     if mode == "LOCAL":
-        return OllamaClient()
+        return cached(OllamaClient())
     elif mode == "LAB":
-        return AcmeLabClient()
+        return cached(AcmeLabClient())
     else:
         raise ValueError(f"Unknown engine mode: {mode}")
@@ -1,15 +1,21 @@
-import requests
+import asyncio
+import concurrent.futures
 import json
 import logging
 import os
 import glob
 import re
-from ai_engine import OllamaClient, get_engine, CognitiveEngine
+from ai_engine import OllamaClient, get_engine, CognitiveEngine, EVENT_LIST_SCHEMA
+from json_stream import JsonValueScanner, first_json_text
+from cancellation import GenerationCancelled, run_cancellable
+import http_pool
+from llm_cache import cached
+from hub_session import get_session
 
 # Try to import Liger/Transformers for DMA mode
 try:
     import torch
-    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from transformers import AutoModelForCausalLM, AutoTokenizer, StoppingCriteriaList
     from liger_kernel.transformers import apply_liger_kernel_to_llama
     HAS_LIGER = True
 except ImportError:
@@ -23,6 +29,46 @@ VLLM_URL = "http://localhost:8088/v1/completions"
 DATA_DIR = "field_notes/data"
 RAW_DIR = "raw_notes"
 
+def stream_completions(url, payload, on_token=None, cancel=None, timeout=120):
+    """
+    Streams an OpenAI-style /v1/completions call (server-sent events) and returns the
+    text, "" on an HTTP error. Same stop/cancel contract as ai_engine.stream_ollama.
+    """
+    payload = dict(payload, stream=True)
+
+    def _stream():
+        pieces = []
+        with http_pool.stream("POST", url, json=payload, timeout=timeout, idempotent=True) as resp:
+            if resp.status_code != 200:
+                logging.error(f"vLLM Error ({resp.status_code}): {resp.text}")
+                return ""
+            release = cancel.on_cancel(resp.close) if cancel else None
+            try:
+                for line in resp.iter_lines():
+                    if cancel:
+                        cancel.check()
+                    if not line.startswith(b"data: "):
+                        continue
+                    data = line[len(b"data: "):]
+                    if data == b"[DONE]":
+                        continue # The body ends right after; reading it out keeps the connection alive
+                    piece = json.loads(data)['choices'][0]['text']
+                    pieces.append(piece)
+                    if on_token and on_token(piece):
+                        break
+            except Exception:
+                if cancel:
+                    cancel.check()
+                raise
+            finally:
+                if release:
+                    release()
+        if cancel:
+            cancel.check()
+        return "".join(pieces)
+
+    return run_cancellable(_stream, cancel)
+
 class VLLMClient(OllamaClient):
     """
     OpenAI-compatible client for vLLM server.
@@ -32,27 +78,47 @@ class VLLMClient(OllamaClient):
         self.url = url
         self.model = model
 
-    def generate(self, prompt, context="", options=None):
+    def _payload(self, prompt, context, options):
         full_prompt = f"{context}\n\n{prompt}" if context else prompt
-        payload = {
+        return {
             "model": self.model,
             "prompt": full_prompt,
             "max_tokens": options.get("num_predict", 512) if options else 512,
-            "temperature": options.get("temperature", 0.1) if options else 0.1,
-            "stream": False
+            "temperature": options.get("temperature", 0.1) if options else 0.1
         }
+
+    def generate(self, prompt, context="", options=None, on_token=None, cancel=None):
         try:
-            # 120s timeout for complex synthesis
-            resp = requests.post(self.url, json=payload, timeout=120)
-            if resp.status_code == 200:
-                data = resp.json()
-                return data['choices'][0]['text']
-            else:
-                logging.error(f"vLLM Error ({resp.status_code}): {resp.text}")
-                return ""
+            # 120s read timeout for complex synthesis
+            return stream_completions(self.url, self._payload(prompt, context, options), on_token, cancel)
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            logging.error(f"vLLM Connection Failed: {e}. Falling back to Ollama.")
+            return super().generate(prompt, context, options, on_token, cancel)
+
+    def generate_json(self, prompt, context="", options=None, schema=None, on_token=None, cancel=None):
+        """Guided decoding (guided_json / json_object), streamed until the value closes."""
+        payload = self._payload(prompt, context, options)
+        if schema:
+            payload["guided_json"] = schema
+        else:
+            payload["response_format"] = {"type": "json_object"}
+        scanner = JsonValueScanner()
+
+        def _feed(piece):
+            if on_token:
+                on_token(piece)
+            return scanner.feed(piece)
+
+        try:
+            stream_completions(self.url, payload, _feed, cancel)
+            return scanner.text
+        except GenerationCancelled:
+            raise
         except Exception as e:
             logging.error(f"vLLM Connection Failed: {e}. Falling back to Ollama.")
-            return super().generate(prompt, context, options)
+            return super().generate_json(prompt, context, options, schema, on_token, cancel)
 
 class McpClient(OllamaClient):
     """
@@ -64,70 +130,70 @@ class McpClient(OllamaClient):
         super().__init__()
         self.uri = uri
 
-    def generate(self, prompt, context="", options=None):
-        import asyncio
-        import json
-        import websockets
-        import time
-
+    def _exchange(self, prompt, context, options, on_token):
+        """Starts a think call on the process's shared Hub session: (future, reply pieces)."""
         target_source = options.get("target_source") if options else None
+        pieces = []
 
-        async def _call():
-            try:
-                # Use a high timeout for weights loading/derivation
-                async with websockets.connect(self.uri, open_timeout=10, ping_interval=20) as ws:
-                    # Handshake
-                    await ws.send(json.dumps({"type": "handshake", "client": "refine_worker"}))
-                    
-                    # Call Think Tool (via text_input for simplified Hub routing)
-                    message = {
-                        "type": "text_input",
-                        "content": f"[INTERNAL] [REFINE]: {prompt}",
-                        "context": context
-                    }
-                    await ws.send(json.dumps(message))
-                    
-                    full_response = ""
-                    start_t = time.time()
-                    while time.time() - start_t < 180:
-                        try:
-                            msg = await asyncio.wait_for(ws.recv(), timeout=5.0)
-                            data = json.loads(msg)
-                            
-                            # Filter for actual reasoning tokens
-                            source = str(data.get("brain_source", data.get("source", "System"))).lower()
-                            
-                            # DEBUG: Log incoming sources
-                            # print(f"DEBUG: WS INGEST from {source}")
-
-                            # If target_source is specified, ONLY accept tokens from that source
-                            if target_source and target_source.lower() not in source:
-                                continue
-                                
-                            if "brain" in data and source not in ["system", "attendant"]:
-                                # print(f"DEBUG: ACCEPTED token from {source}")
-                                full_response += data["brain"]
-                            
-                            # Final flag from Hub
-                            if data.get("final") == True:
-                                break
-                            
-                            # [FIX] Loop breaker for situation tags
-                            if "[SITUATION: EXIT_LIKELY]" in str(data):
-                                break
-                        except asyncio.TimeoutError:
-                            continue
-                    return full_response
-            except Exception as e:
-                logging.error(f"McpClient Failure: {e}")
-                return ""
+        def _on_message(data):
+            # Filter for actual reasoning tokens
+            source = str(data.get("brain_source", data.get("source", "System"))).lower()
+
+            # If target_source is specified, ONLY accept tokens from that source
+            if target_source and target_source.lower() not in source:
+                return False
+
+            if "brain" in data and source not in ["system", "attendant"]:
+                pieces.append(data["brain"])
+                if on_token:
+                    on_token(data["brain"])
+
+            # Final flag from Hub; [FIX] Loop breaker for situation tags
+            return data.get("final") == True or "[SITUATION: EXIT_LIKELY]" in str(data)
+
+        # Call Think Tool (via text_input for simplified Hub routing)
+        future = get_session(self.uri).submit(f"[INTERNAL] [REFINE]: {prompt}", context, _on_message)
+        return future, pieces
+
+    async def agenerate(self, prompt, context="", options=None, on_token=None, cancel=None):
+        """Native coroutine over the shared Hub session; awaits on the caller's event loop."""
+        future, pieces = self._exchange(prompt, context, options, on_token)
+        release = cancel.on_cancel(future.cancel) if cancel else None
+        try:
+            await asyncio.wrap_future(future)
+        except (asyncio.CancelledError, concurrent.futures.CancelledError):
+            if cancel and cancel.cancelled:
+                raise GenerationCancelled(cancel.reason)
+            raise
+        except Exception as e:
+            logging.error(f"McpClient Failure: {e}")
+            return ""
+        finally:
+            if release:
+                release()
+        return "".join(pieces)
 
-        # Bridge async call to sync generate method
+    def generate(self, prompt, context="", options=None, on_token=None, cancel=None):
+        future, pieces = self._exchange(prompt, context, options, on_token)
+        release = cancel.on_cancel(future.cancel) if cancel else None
         try:
-            return asyncio.run(_call())
+            future.result()
+        except concurrent.futures.CancelledError:
+            raise GenerationCancelled(cancel.reason if cancel else "cancelled")
         except Exception as e:
             logging.error(f"McpBridge failed: {e}")
             return ""
+        finally:
+            if release:
+                release()
+        return "".join(pieces)
+
+    # The Hub has no constrained decoding; scan its full reply instead of bypassing it via Ollama
+    generate_json = CognitiveEngine.generate_json
+
+    async def agenerate_json(self, prompt, context="", options=None, schema=None, on_token=None, cancel=None):
+        response = await self.agenerate(prompt, context, options, on_token, cancel)
+        return first_json_text(response) or response
 
 class LigerEngine(OllamaClient):
     """
@@ -159,24 +225,39 @@ class LigerEngine(OllamaClient):
             logging.error(f"Failed to initialize LigerEngine: {e}. Falling back to Ollama.")
             self._initialized = False
 
-    def generate(self, prompt, context="", options=None):
+    def generate(self, prompt, context="", options=None, on_token=None, cancel=None):
         if not self._initialized:
             self._initialize()
         
         if not self._initialized:
-            return super().generate(prompt, context, options)
+            return super().generate(prompt, context, options, on_token, cancel)
 
         full_prompt = f"{context}\n\n{prompt}" if context else prompt
         inputs = self.tokenizer(full_prompt, return_tensors="pt").to(self.model.device)
         
+        # A tripped token stops decoding at the next step
+        stopping = [lambda input_ids, scores, **kwargs: cancel.cancelled] if cancel else []
         with torch.no_grad():
             outputs = self.model.generate(
                 **inputs, 
                 max_new_tokens=options.get("num_predict", 512) if options else 512,
-                temperature=options.get("temperature", 0.1) if options else 0.1
+                temperature=options.get("temperature", 0.1) if options else 0.1,
+                stopping_criteria=StoppingCriteriaList(stopping)
             )
+        if cancel:
+            cancel.check()
         
-        return self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        if on_token:
+            on_token(text) # Decoded in one piece; no per-token streamer on this path
+        return text
+
+    def generate_json(self, prompt, context="", options=None, schema=None, on_token=None, cancel=None):
+        if not self._initialized:
+            self._initialize()
+        if not self._initialized:
+            return super().generate_json(prompt, context, options, schema, on_token, cancel)
+        return CognitiveEngine.generate_json(self, prompt, context, options, schema, on_token, cancel)
 
 # --- DOCUMENT TIERS (The 'QQ' Mapping) ---
 DOCUMENT_TIERS = {
@@ -299,7 +380,7 @@ class SemanticCondenser:
     def __init__(self, client):
         self.client = client
 
-    def condense(self, text):
+    def condense(self, text, cancel=None):
         prompt = f"""
         [TASK]
         Compress the following technical log into a high-density 'Technical Abstract'.
@@ -307,12 +388,12 @@ class SemanticCondenser:
         Remove all conversational filler and redundant dates.
         
         [RAW LOG]
-        {text[:4000]}
+        {text}
         
         [OUTPUT FORMAT]
         One paragraph of high-density technical prose.
         """
-        return self.client.generate(prompt)
+        return self.client.generate(prompt, cancel=cancel)
 
 class CurriculumEngine(CognitiveEngine):
     """
@@ -328,22 +409,38 @@ class CurriculumEngine(CognitiveEngine):
                 self.local_backend = OllamaClient()
         else:
             self.local_backend = backend
+        # Condense, anchor and solve steps on unchanged chunks are answered from the cache
+        self.local_backend = cached(self.local_backend)
             
         self.backend = self.local_backend
         self.memory = ArchiveMemory()
         self.condenser = SemanticCondenser(self.backend)
 
-    def generate(self, prompt, context="", options=None):
-        return self.backend.generate(prompt, context, options)
+    def generate(self, prompt, context="", options=None, on_token=None, cancel=None):
+        return self.backend.generate(prompt, context, options, on_token, cancel)
+
+    def generate_json(self, prompt, context="", options=None, schema=None, on_token=None, cancel=None):
+        return self.backend.generate_json(prompt, context, options, schema, on_token, cancel)
+
+    @property
+    def last_hit(self):
+        """Whether the latest backend call (the final consolidation, for reasoning) came from the cache."""
+        return getattr(self.backend, 'last_hit', False)
+
+    def forget_last(self):
+        if hasattr(self.backend, 'forget_last'):
+            self.backend.forget_last()
 
-    def generate_with_reasoning(self, raw_text, bucket=None):
+    def generate_with_reasoning(self, raw_text, bucket=None, cancel=None, history=None):
         logging.info(f"Starting Curriculum Reasoning for {bucket}...")
         
         # 1. FS-Researcher & Agentic-R: Inject History + Utility Ranking
-        history = self.memory.get_context(bucket, raw_text)
+        # (callers that prefetch pass it in, computed off the GPU's critical path)
+        if history is None:
+            history = self.memory.get_context(bucket, raw_text)
         
         # 2. CLaRa: Semantic Compression
-        abstract = self.condenser.condense(raw_text)
+        abstract = self.condenser.condense(raw_text, cancel=cancel)
         
         # 3. TTCS Phase 1: Synthesize Anchors
         synth_prompt = f"""
@@ -367,12 +464,12 @@ class CurriculumEngine(CognitiveEngine):
         3. Do not invent technical issues (e.g. SSD errors, permissions) that are not in the text.
         4. Ensure tool associations match the [TOOL ERA REGISTRY].
         """
-        anchors = self.backend.generate(synth_prompt)
+        anchors = self.backend.generate(synth_prompt, cancel=cancel)
         
         # 4. TTCS Phase 2: Solve
         solve_prompt = f"""
         [RAW LOGS]
-        {raw_text[:4000]}
+        {raw_text}
         [TECHNICAL ANCHORS]
         {anchors}
         
@@ -381,7 +478,7 @@ class CurriculumEngine(CognitiveEngine):
         **CRITICAL:** Verify the year of the log against the tool's release year.
         If there is a conflict (e.g., tool released in 2022 used in a 2019 note), flag it as a [CAUSALITY ERROR] and ignore the tool name.
         """
-        solutions = self.backend.generate(solve_prompt)
+        solutions = self.backend.generate(solve_prompt, cancel=cancel)
         
         # 5. Final Consolidation
         final_prompt = f"""
@@ -410,18 +507,18 @@ class CurriculumEngine(CognitiveEngine):
           {{ "date": "YYYY-MM-DD", "summary": "...", "evidence": "...", "sensitivity": "Public", "tags": [] }}
         ]
         """
-        return self.backend.generate(final_prompt)
+        return self.backend.generate_json(final_prompt, schema=EVENT_LIST_SCHEMA, cancel=cancel)
 
 def get_engine_v2(mode="LOCAL"):
     if mode == "VLLM":
-        return VLLMClient()
+        return cached(VLLMClient())
     elif mode == "REASONING":
         return CurriculumEngine()
     elif mode == "DMA":
-        return LigerEngine()
+        return cached(LigerEngine())
     elif mode == "LAB":
         # [FEAT-330] Use unified MCP client for resource coordination
-        return McpClient()
+        return cached(McpClient())
     elif mode == "HYBRID":
         # [FEAT-330] Use unified MCP client as reasoning backend
         brain = McpClient()
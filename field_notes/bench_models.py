@@ -3,7 +3,7 @@ import os
 import sys
 import json
 import time
-import requests
+import http_pool
 import subprocess
 import threading
 from prometheus_client import Gauge, start_http_server
@@ -208,25 +208,25 @@ def test_vllm_model(model_name):
     token_times = []
     
     try:
-        response = requests.post(url, json=payload, stream=True, timeout=(5, 60))
-        response.raise_for_status()
-        
-        for line in response.iter_lines():
-            if line:
-                chunk_time = time.time()
-                line_str = line.decode('utf-8').strip()
-                if line_str.startswith("data:"):
-                    data_str = line_str[5:].strip()
-                    if data_str == "[DONE]":
-                        break
-                    chunk = json.loads(data_str)
-                    choices = chunk.get("choices", [])
-                    if choices:
-                        text = choices[0].get("text", "")
-                        if text:
-                            token_times.append(chunk_time)
-                            if ttft is None:
-                                ttft = chunk_time - start_time
+        with http_pool.stream("POST", url, json=payload, timeout=(5, 60)) as response:
+            response.raise_for_status()
+
+            for line in response.iter_lines():
+                if line:
+                    chunk_time = time.time()
+                    line_str = line.decode('utf-8').strip()
+                    if line_str.startswith("data:"):
+                        data_str = line_str[5:].strip()
+                        if data_str == "[DONE]":
+                            break
+                        chunk = json.loads(data_str)
+                        choices = chunk.get("choices", [])
+                        if choices:
+                            text = choices[0].get("text", "")
+                            if text:
+                                token_times.append(chunk_time)
+                                if ttft is None:
+                                    ttft = chunk_time - start_time
     except Exception as e:
         tracker.stop()
         raise e
@@ -262,7 +262,7 @@ def test_ollama_model(model_name):
     """Benchmarks Ollama model by streaming a generation request."""
     # First probe if the model is locally loaded
     probe_url = f"http://{OLLAMA_HOST}:{OLLAMA_PORT}/api/tags"
-    resp = requests.get(probe_url, timeout=3)
+    resp = http_pool.get(probe_url, timeout=(http_pool.CONNECT_TIMEOUT, 3))
     resp.raise_for_status()
     available_models = [m.get("name") for m in resp.json().get("models", [])]
     
@@ -292,19 +292,19 @@ def test_ollama_model(model_name):
     token_times = []
     
     try:
-        response = requests.post(url, json=payload, stream=True, timeout=(5, 180))
-        response.raise_for_status()
-        
-        for line in response.iter_lines():
-            if line:
-                chunk_time = time.time()
-                chunk = json.loads(line.decode('utf-8'))
-                if chunk.get("response"):
-                    token_times.append(chunk_time)
-                    if ttft is None:
-                        ttft = chunk_time - start_time
-                if chunk.get("done", False):
-                    break
+        with http_pool.stream("POST", url, json=payload, timeout=(5, 180)) as response:
+            response.raise_for_status()
+
+            for line in response.iter_lines():
+                if line:
+                    chunk_time = time.time()
+                    chunk = json.loads(line.decode('utf-8'))
+                    if chunk.get("response"):
+                        token_times.append(chunk_time)
+                        if ttft is None:
+                            ttft = chunk_time - start_time
+                    if chunk.get("done", False):
+                        break
     except Exception as e:
         tracker.stop()
         raise e
@@ -0,0 +1,65 @@
+import hashlib
+import os
+import zlib
+
+from utils import DATA_DIR
+
+# Config
+BLOB_DIR = os.path.join(DATA_DIR, "blobs")
+COMPRESSION_LEVEL = 6
+
+def get_hash(text):
+    """md5 of the UTF-8 text; the same key scan_queue and chunk_state.json have always used."""
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+class BlobStore:
+    """
+    Content-addressed chunk store. Queue tasks and chunk_state.json carry the md5,
+    and the chunk text lives here once, zlib-compressed, under blobs/<h[:2]>/<h>.z.
+    """
+    def __init__(self, root=BLOB_DIR):
+        self.root = root
+
+    def _path(self, content_hash):
+        return os.path.join(self.root, content_hash[:2], f"{content_hash}.z")
+
+    def has(self, content_hash):
+        return os.path.exists(self._path(content_hash))
+
+    def put(self, text, content_hash=None):
+        """Stores text (idempotent) and returns its hash."""
+        content_hash = content_hash or get_hash(text)
+        path = self._path(content_hash)
+        if os.path.exists(path):
+            return content_hash
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL))
+        os.replace(tmp_path, path)
+        return content_hash
+
+    def get(self, content_hash):
+        """Returns the stored text, or None if the blob is missing or unreadable."""
+        try:
+            with open(self._path(content_hash), 'rb') as f:
+                return zlib.decompress(f.read()).decode('utf-8')
+        except (OSError, zlib.error):
+            return None
+
+    def prune(self, live_hashes):
+        """Deletes blobs not referenced by live_hashes. Returns the number removed."""
+        removed = 0
+        if not os.path.isdir(self.root):
+            return 0
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".z") and entry.name[:-2] not in live_hashes:
+                    try:
+                        os.remove(entry.path)
+                        removed += 1
+                    except OSError:
+                        pass
+        return removed
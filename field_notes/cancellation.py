@@ -0,0 +1,127 @@
+import asyncio
+import threading
+
+# Config
+POLL_SECONDS = 0.25 # How often watchers and waiting callers look at a token (bounds abort latency)
+
+class GenerationCancelled(Exception):
+    """Raised by an engine call whose CancelToken tripped. Its partial output is discarded."""
+
+class CancelToken:
+    """
+    Cooperative cancellation for one in-flight generation. The governor (a CancelWatcher,
+    a SIGUSR1 handler) calls cancel() from any thread; engines check the token between
+    tokens and register closers (e.g. the streaming HTTP response's close) so a blocked
+    read is interrupted right away and the server stops generating.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.RLock() # Re-entrant: cancel() may run in a signal handler
+        self._closers = []
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            closers, self._closers = self._closers, []
+        for closer in closers:
+            try:
+                closer()
+            except Exception:
+                pass
+
+    def on_cancel(self, closer):
+        """Runs closer when the token trips (now, if it already has). Returns an unregister callable."""
+        with self._lock:
+            if not self._event.is_set():
+                self._closers.append(closer)
+                return lambda: self._discard(closer)
+        closer()
+        return lambda: None
+
+    def _discard(self, closer):
+        with self._lock:
+            if closer in self._closers:
+                self._closers.remove(closer)
+
+    def check(self):
+        """Raises GenerationCancelled if the token has tripped."""
+        if self._event.is_set():
+            raise GenerationCancelled(self.reason)
+
+def run_cancellable(fn, cancel, poll=POLL_SECONDS):
+    """
+    Returns fn(), or raises GenerationCancelled within poll seconds of cancel tripping even
+    if fn is stuck in a blocking call (e.g. waiting out prompt processing for the first
+    token). fn keeps running on a daemon thread until it notices the token itself.
+    """
+    if cancel is None:
+        return fn()
+    result = {}
+
+    def _run():
+        try:
+            result["value"] = fn()
+        except BaseException as e:
+            result["error"] = e
+
+    worker = threading.Thread(target=_run, daemon=True)
+    worker.start()
+    while worker.is_alive():
+        worker.join(poll)
+        if cancel.cancelled:
+            raise GenerationCancelled(cancel.reason)
+    if "error" in result:
+        raise result["error"]
+    return result.get("value")
+
+async def run_in_thread(fn, cancel=None):
+    """
+    Awaits fn(token) on the event loop's worker threads, token being cancel or a fresh
+    CancelToken. Cancelling the awaiting task (an asyncio.wait_for timeout included) trips
+    the token, so the blocking call aborts and frees its connection instead of running on.
+    """
+    token = cancel or CancelToken()
+    future = asyncio.get_running_loop().run_in_executor(None, fn, token)
+    try:
+        return await future
+    except asyncio.CancelledError:
+        token.cancel("Task cancelled")
+        raise
+
+class CancelWatcher:
+    """
+    Polls should_cancel() on a daemon thread while a generation runs and trips the token
+    with its (truthy) return value as the reason. Use as a context manager.
+    """
+    def __init__(self, token, should_cancel, poll=POLL_SECONDS):
+        self.token = token
+        self.should_cancel = should_cancel
+        self.poll = poll
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def _watch(self):
+        while not self._stop.wait(self.poll):
+            try:
+                reason = self.should_cancel()
+            except Exception:
+                continue
+            if reason:
+                self.token.cancel(reason)
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self.token
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
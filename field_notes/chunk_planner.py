@@ -0,0 +1,110 @@
+import os
+import string
+import zlib
+
+from ai_engine import DEFAULT_NUM_CTX
+from date_chunker import LINE_BREAK_RE
+
+# Config
+CHARS_PER_TOKEN = 4 # Letters per token in English words (no tokenizer dependency)
+# Byte classes for estimate_tokens: letters -> a, spaces -> blank (they ride on the next token), rest -> .
+TOKEN_CLASSES = bytes(ord('a') if chr(b) in string.ascii_letters else ord(' ') if b == 32 else ord('.')
+                      for b in range(256))
+PROMPT_RESERVE_TOKENS = 2048 # Instructions, anchors/history and the generated reply
+CHUNK_TOKEN_BUDGET = int(os.environ.get("CHUNK_TOKEN_BUDGET", DEFAULT_NUM_CTX - PROMPT_RESERVE_TOKENS))
+CDC_MIN_BYTES = 512 # No content-defined cut until a sub-chunk is at least this long
+CDC_WINDOW = 48 # Bytes before a line break that decide whether it is a cut point
+CDC_MASK = 0x1F # Cut where the window hash has 5 low zero bits (~every 32 lines)
+
+def estimate_tokens(data):
+    """
+    Prompt tokens of text (str or UTF-8 bytes), erring high: every byte that is not a
+    letter or space (digits, punctuation, line breaks, non-ASCII) counts as a token, and
+    letters as CHARS_PER_TOKEN per token but at least one per run (the 'de ad be ef' of
+    a hex dump). Register and hex dumps therefore cannot overrun num_ctx, where Ollama
+    would silently truncate the prompt.
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    classes = data.translate(TOKEN_CLASSES)
+    letters = classes.count(b"a")
+    runs = classes.startswith(b"a") + classes.count(b" a") + classes.count(b".a")
+    return classes.count(b".") + max(runs, -(-letters // CHARS_PER_TOKEN))
+
+def spans_tokens(buf, spans):
+    """estimate_tokens of the newline-joined text the spans describe."""
+    return sum(estimate_tokens(buf[start:end]) for start, end in spans) + max(len(spans) - 1, 0)
+
+def spans_size(spans):
+    """Length of the newline-joined text the spans describe."""
+    return sum(end - start for start, end in spans) + max(len(spans) - 1, 0)
+
+def _lines(buf, start, end, limit):
+    """
+    Line sub-spans of one entry (line breaks excluded). A line over limit tokens is
+    hard-cut every limit bytes, which is at most limit tokens.
+    """
+    while True:
+        newline = LINE_BREAK_RE.search(buf, start, end)
+        line_end = end if newline is None else newline.start()
+        while line_end - start > limit and estimate_tokens(buf[start:line_end]) > limit:
+            # Back off to a UTF-8 character boundary
+            cut = start + limit
+            while cut > start + 1 and (buf[cut] & 0xC0) == 0x80:
+                cut -= 1
+            yield start, cut
+            start = cut
+        yield start, line_end
+        if newline is None:
+            return
+        start = newline.end()
+
+def _is_boundary(buf, line_start, line_end):
+    """Content-defined cut point: the hash of the window ending at this line break."""
+    window = buf[max(line_start, line_end - CDC_WINDOW):line_end]
+    return bool(window) and (zlib.crc32(window) & CDC_MASK) == 0
+
+def split_spans(buf, spans, budget=CHUNK_TOKEN_BUDGET):
+    """
+    Content-defined sub-chunks of one bucket, each within the token budget (estimate_tokens).
+    Cuts fall at line breaks chosen by the bytes just before them, not by their
+    offset, so an edit only changes the sub-chunks around it and the rest keep
+    their hashes. Joining the parts with newlines reproduces the bucket text
+    (apart from hard cuts inside a line longer than the whole budget).
+    """
+    parts, current, tokens = [], [], 0
+    for start, end in spans:
+        for s, e in _lines(buf, start, end, budget):
+            line_tokens = estimate_tokens(buf[s:e])
+            if current and tokens + 1 + line_tokens > budget:
+                parts.append(current)
+                current, tokens = [], 0
+            tokens += line_tokens + (1 if current else 0)
+            if current and LINE_BREAK_RE.fullmatch(buf, current[-1][1], s):
+                # Same stretch of the file: extend the span instead of adding a line
+                current[-1] = (current[-1][0], e)
+            else:
+                current.append((s, e))
+            if spans_size(current) >= CDC_MIN_BYTES and _is_boundary(buf, s, e):
+                parts.append(current)
+                current, tokens = [], 0
+    if current:
+        parts.append(current)
+    return parts
+
+def pack_pieces(pieces, budget=CHUNK_TOKEN_BUDGET, group_of=lambda piece: None):
+    """
+    Greedily packs consecutive pieces ({'tokens': n, ...}) into tasks that fill the
+    budget. Only neighbours with the same group_of() key are merged, so callers can
+    keep e.g. different years apart. Returns a list of piece lists in input order.
+    """
+    tasks, current, tokens = [], [], 0
+    for piece in pieces:
+        if current and (group_of(piece) != group_of(current[-1]) or tokens + 1 + piece["tokens"] > budget):
+            tasks.append(current)
+            current, tokens = [], 0
+        tokens += piece["tokens"] + (1 if current else 0)
+        current.append(piece)
+    if current:
+        tasks.append(current)
+    return tasks
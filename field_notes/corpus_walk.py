@@ -0,0 +1,95 @@
+import json
+import os
+import types
+
+from utils import DATA_DIR, RAW_NOTES_DIR, atomic_write_json
+
+# Config
+CORPUS_WALK_FILE = os.path.join(DATA_DIR, "corpus_walk.json")
+NOTE_EXTENSIONS = (".txt", ".docx")
+
+def walk_corpus(root=RAW_NOTES_DIR, recursive=True):
+    """
+    One os.scandir-based pass over the knowledge base.
+    Returns [{path, size, mtime_ns, inode}, ...] with each file listed once even if
+    reachable through several symlinks (deduplicated by realpath). Hidden entries are
+    skipped, matching the recursive globs this replaces.
+    """
+    entries = []
+    seen_files = set()
+    seen_dirs = set()
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        real_dir = os.path.realpath(current)
+        if real_dir in seen_dirs:
+            continue
+        seen_dirs.add(real_dir)
+        try:
+            with os.scandir(current) as it:
+                children = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for child in children:
+            if child.name.startswith('.'):
+                continue
+            try:
+                if child.is_dir():
+                    if recursive:
+                        subdirs.append(child.path)
+                    continue
+                if not child.is_file():
+                    continue
+                real = os.path.realpath(child.path)
+                if real in seen_files:
+                    continue
+                seen_files.add(real)
+                st = child.stat()
+            except OSError:
+                continue
+            entries.append({"path": child.path, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "inode": st.st_ino})
+        # Reverse so the stack pops subdirectories in name order
+        stack.extend(reversed(subdirs))
+    return entries
+
+def write_corpus_walk(root=RAW_NOTES_DIR, path=CORPUS_WALK_FILE):
+    """Walks the corpus and persists the snapshot for the epoch's subprocess stages."""
+    entries = walk_corpus(root)
+    atomic_write_json(path, {"root": root, "entries": entries}, indent=None)
+    return entries
+
+def read_corpus_walk(argv, root=RAW_NOTES_DIR):
+    """Returns the epoch snapshot passed as --walk=PATH, or None if absent/unusable."""
+    for arg in argv:
+        if arg.startswith("--walk="):
+            try:
+                with open(arg.split("=", 1)[1], 'r') as f:
+                    snapshot = json.load(f)
+                if snapshot.get("root") == root:
+                    return snapshot["entries"]
+                print(f"Warning: corpus walk {arg} is for another root. Walking directly.")
+            except Exception as e:
+                print(f"Warning: unusable corpus walk {arg}: {e}. Walking directly.")
+    return None
+
+def load_corpus_walk(argv, root=RAW_NOTES_DIR):
+    """Uses the epoch snapshot passed as --walk=PATH, or walks the corpus directly."""
+    entries = read_corpus_walk(argv, root)
+    return entries if entries is not None else walk_corpus(root)
+
+def note_files(entries):
+    """Sorted .txt/.docx paths (the union the NOTES/RAS/DOCX globs used to produce)."""
+    return sorted(e["path"] for e in entries if e["path"].endswith(NOTE_EXTENSIONS))
+
+def dir_files(entries, directory, recursive=False):
+    """Paths directly inside directory, or anywhere under it when recursive."""
+    directory = directory.rstrip(os.sep)
+    if recursive:
+        prefix = directory + os.sep
+        return [e["path"] for e in entries if e["path"].startswith(prefix)]
+    return [e["path"] for e in entries if os.path.dirname(e["path"]) == directory]
+
+def entry_stat(entry):
+    """Stat-like view of a walk entry for FileInventory lookups."""
+    return types.SimpleNamespace(st_size=entry["size"], st_mtime_ns=entry["mtime_ns"], st_ino=entry["inode"])
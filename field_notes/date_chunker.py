@@ -0,0 +1,106 @@
+import codecs
+import contextlib
+import hashlib
+import mmap
+import re
+
+# Config
+HASH_BLOCK = 1 << 20 # Bytes decoded per step when hashing a span
+
+# Start-of-line M/D/Y dates (1/1/16, 12/12/2016, ...), leading whitespace allowed as with line.strip().
+# Files are scanned raw: ^ covers LF and CRLF breaks; the slower CR form is only used on
+# files that also break lines with a lone CR, so spans match what text mode would split.
+DATE_LINE_RE = re.compile(rb'^[ \t\f\v]*((\d{1,2})/(\d{1,2})/(\d{2,4}))', re.MULTILINE)
+CR_DATE_LINE_RE = re.compile(rb'(?<![^\r\n])[ \t\f\v]*((\d{1,2})/(\d{1,2})/(\d{2,4}))')
+LONE_CR_RE = re.compile(rb'\r(?!\n)')
+LINE_BREAK_RE = re.compile(rb'\r\n?|\n')
+
+def month_bucket(match):
+    """'YYYY-MM' bucket for a date match (two-digit years are 20xx)."""
+    month, _day, year = (g.decode('ascii') for g in match.groups()[1:])
+    if len(year) == 2: year = "20" + year
+    return f"{year}-{month.zfill(2)}"
+
+def date_label(match):
+    """The raw date text ('1/2/24'), as used by scan_pinky's per-entry chunks."""
+    return match.group(1).decode('ascii')
+
+def lf_text(text):
+    """text with CRLF and lone CR line breaks turned into LF, as reading it in text mode does."""
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+@contextlib.contextmanager
+def open_buffer(path):
+    """Read-only mmap of path (b'' for empty files). Scanning it never copies the file."""
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # Empty file
+            yield b""
+            return
+        try:
+            yield mm
+        finally:
+            mm.close()
+
+def iter_date_spans(buf, leading_bucket, bucket_of=month_bucket):
+    """
+    Lazily yields (bucket, byte_start, byte_end) for each dated entry in buf.
+    Text before the first date line belongs to leading_bucket. A span runs from its
+    date line up to the next one, minus the line break that separates them, so
+    spans_text() of a span is exactly the old "\\n".join(lines) entry.
+    """
+    prev_start, prev_bucket = 0, leading_bucket
+    date_line = CR_DATE_LINE_RE if LONE_CR_RE.search(buf) else DATE_LINE_RE
+    for match in date_line.finditer(buf):
+        start = match.start()
+        if start > prev_start:
+            yield prev_bucket, prev_start, _trim_newline(buf, prev_start, start)
+        prev_start, prev_bucket = start, bucket_of(match)
+    end = len(buf)
+    if end > prev_start:
+        yield prev_bucket, prev_start, _trim_newline(buf, prev_start, end)
+
+def _trim_newline(buf, start, end):
+    if end - start >= 2 and buf[end - 2:end] == b"\r\n":
+        return end - 2
+    if end > start and buf[end - 1:end] in (b"\n", b"\r"):
+        return end - 1
+    return end
+
+def group_spans(spans):
+    """{bucket: [(start, end), ...]} preserving first-seen bucket order."""
+    grouped = {}
+    for bucket, start, end in spans:
+        grouped.setdefault(bucket, []).append((start, end))
+    return grouped
+
+def spans_hash(buf, spans):
+    """
+    get_hash() of spans_text(buf, spans), computed block by block without materializing
+    the text: the same UTF-8 decoding (undecodable bytes dropped) and LF line breaks.
+    """
+    digest = hashlib.md5()
+    view = memoryview(buf)
+    for i, (start, end) in enumerate(spans):
+        if i: digest.update(b"\n")
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        carry = "" # A CR that may be the first half of a CRLF split across blocks
+        for pos in range(start, end, HASH_BLOCK):
+            text = carry + decoder.decode(view[pos:min(pos + HASH_BLOCK, end)])
+            carry = "\r" if text.endswith("\r") else ""
+            digest.update(lf_text(text[:len(text) - len(carry)]).encode('utf-8'))
+        digest.update(lf_text(carry + decoder.decode(b"", final=True)).encode('utf-8'))
+    view.release()
+    return digest.hexdigest()
+
+def buffer_hash(buf):
+    """
+    The inventory's file hash: get_hash() of the buffer's text as scan_pinky reads
+    files (UTF-8 with undecodable bytes dropped, universal newlines).
+    """
+    return spans_hash(buf, [(0, len(buf))])
+
+def spans_text(buf, spans):
+    """Materializes one bucket's text (only when it is actually needed)."""
+    return "\n".join(lf_text(buf[start:end].decode('utf-8', errors='ignore')) for start, end in spans)
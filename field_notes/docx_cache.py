@@ -0,0 +1,75 @@
+import json
+import os
+
+from utils import DATA_DIR, atomic_write_json
+from blob_store import BlobStore
+
+try:
+    import docx2txt
+except ImportError:
+    docx2txt = None
+
+# Config
+DOCX_CACHE_DIR = os.path.join(DATA_DIR, "docx_cache")
+
+class DocxTextCache:
+    """
+    Persistent DOCX text-extraction cache shared by scan_librarian and scan_queue.
+    The index maps a real path to its (size, mtime_ns, inode) and the hash of the
+    extracted text; the text itself is kept compressed in a private blob store.
+    """
+    def __init__(self, root=DOCX_CACHE_DIR):
+        self.index_path = os.path.join(root, "index.json")
+        self.blobs = BlobStore(os.path.join(root, "text"))
+        self.index = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    self.index = json.load(f)
+            except Exception:
+                self.index = {}
+
+    def extract(self, path):
+        """Returns the document text, unzipping/parsing only when the file changed."""
+        key = os.path.realpath(path)
+        st = os.stat(path)
+        sig = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "inode": st.st_ino}
+        entry = self.index.get(key)
+        if entry and all(entry.get(k) == v for k, v in sig.items()):
+            text = self.blobs.get(entry["text_hash"])
+            if text is not None:
+                return text
+
+        if docx2txt is None:
+            raise ImportError("docx2txt is required to extract .docx files")
+        text = docx2txt.process(path) or ""
+        sig["text_hash"] = self.blobs.put(text)
+        self.index[key] = sig
+        self.save()
+        return text
+
+    def evict_missing(self):
+        """Drops entries (and their text) whose source .docx no longer exists."""
+        stale = [k for k in self.index if not os.path.exists(k)]
+        for k in stale:
+            del self.index[k]
+        if stale:
+            self.blobs.prune({e["text_hash"] for e in self.index.values()})
+            self.save()
+        return len(stale)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        atomic_write_json(self.index_path, self.index, indent=None)
+
+_CACHE = None
+
+def get_docx_cache():
+    """Process-wide cache instance (loaded on first use)."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = DocxTextCache()
+    return _CACHE
+
+def extract_docx_text(path):
+    return get_docx_cache().extract(path)
@@ -0,0 +1,43 @@
+import json
+import os
+
+from utils import DATA_DIR, atomic_write_json
+
+# Config
+ENGINE_STATS_FILE = os.path.join(DATA_DIR, "engine_stats.json")
+DEFAULT_TOKENS_PER_SEC = 25.0 # Cold-start guess for a local 8B model running the nibbler prompts
+EWMA_ALPHA = 0.2 # Weight of the newest sample
+
+class EngineStats:
+    """
+    Historical engine throughput per engine mode, as an EWMA of prompt tokens per
+    wall-clock second of engine time. The nibbler records a sample per task; the work
+    queue uses the rate to turn task sizes into expected run times.
+    """
+    def __init__(self, path=ENGINE_STATS_FILE):
+        self.path = path
+        self.data = {"modes": {}, "last_mode": None}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.data.update(json.load(f))
+            except Exception:
+                pass
+
+    def record(self, mode, tokens, seconds):
+        """Folds one task's (tokens, engine seconds) into the mode's rate and persists it."""
+        if tokens <= 0 or seconds <= 0:
+            return
+        rate = tokens / seconds
+        entry = self.data["modes"].setdefault(mode, {"tokens_per_sec": rate, "samples": 0})
+        if entry["samples"]:
+            entry["tokens_per_sec"] = (1 - EWMA_ALPHA) * entry["tokens_per_sec"] + EWMA_ALPHA * rate
+        entry["samples"] += 1
+        self.data["last_mode"] = mode
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        atomic_write_json(self.path, self.data)
+
+    def tokens_per_sec(self, mode=None):
+        """Rate for mode (default: the mode that ran most recently)."""
+        entry = self.data["modes"].get(mode or self.data.get("last_mode"))
+        return entry["tokens_per_sec"] if entry else DEFAULT_TOKENS_PER_SEC
@@ -38,9 +38,11 @@ async def call_kender(context_text: str, query: str) -> tuple[dict, str, str]:
     """Route RAG output to KENDER for BKM-032 qualitative audit.
 
     Sends the retrieved context + original query to the remote LLM
-    and requests a structured quality assessment.
+    and requests a structured quality assessment. Runs on a worker thread
+    over KENDER's pooled keep-alive session, shared across the whole run.
     """
-    import aiohttp
+    import requests
+    import http_pool
 
     prompt = (
         "[BKM-032 AUDIT] Evaluate the following RAG retrieval quality.\n\n"
@@ -66,23 +68,24 @@ async def call_kender(context_text: str, query: str) -> tuple[dict, str, str]:
     }
 
     try:
-        async with aiohttp.ClientSession(trust_env=False) as session:
-            async with session.post(
-                KENDER_URL, json=payload, timeout=KENDER_TIMEOUT
-            ) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    raw_response = data.get("response", "")
-                    return _parse_kender_response(raw_response), prompt, raw_response
-                else:
-                    err_res = {
-                        "relevance": 0.0,
-                        "coverage": 0.0,
-                        "issues": [f"KENDER HTTP {resp.status}"],
-                        "verdict": "ERROR",
-                    }
-                    return err_res, prompt, f"HTTP {resp.status}"
-    except asyncio.TimeoutError:
+        # Bypass proxies, as trust_env=False did for the old per-call aiohttp session
+        resp = await asyncio.to_thread(
+            http_pool.post, KENDER_URL, json=payload, timeout=KENDER_TIMEOUT,
+            proxies={"http": None, "https": None}, idempotent=True
+        )
+        if resp.status_code == 200:
+            data = resp.json()
+            raw_response = data.get("response", "")
+            return _parse_kender_response(raw_response), prompt, raw_response
+        else:
+            err_res = {
+                "relevance": 0.0,
+                "coverage": 0.0,
+                "issues": [f"KENDER HTTP {resp.status_code}"],
+                "verdict": "ERROR",
+            }
+            return err_res, prompt, f"HTTP {resp.status_code}"
+    except requests.exceptions.Timeout:
         err_res = {
             "relevance": 0.0,
             "coverage": 0.0,
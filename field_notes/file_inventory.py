@@ -0,0 +1,106 @@
+import json
+import os
+
+from utils import DATA_DIR, atomic_write_json
+from blob_store import get_hash
+
+# Config
+INVENTORY_FILE = os.path.join(DATA_DIR, "file_inventory.json")
+
+class FileInventory:
+    """
+    Persistent raw-notes inventory keyed by real path.
+    Each entry records (size, mtime_ns, inode) alongside the content hash and the
+    chunk hashes produced from it, so an unchanged file costs one stat() per epoch.
+    """
+    def __init__(self, path=INVENTORY_FILE):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f)
+            except Exception:
+                self.entries = {}
+
+    @staticmethod
+    def _key(path):
+        return os.path.realpath(path)
+
+    @staticmethod
+    def _signature(st):
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "inode": st.st_ino}
+
+    def lookup(self, path, st=None):
+        """Returns the stored entry if the file's stat signature is unchanged, else None."""
+        entry = self.entries.get(self._key(path))
+        if not entry:
+            return None
+        try:
+            st = st or os.stat(path)
+        except OSError:
+            return None
+        sig = self._signature(st)
+        if all(entry.get(k) == v for k, v in sig.items()):
+            return entry
+        return None
+
+    def record(self, path, content_hash, chunks=None, chunk_params=None, st=None, parts=None):
+        """
+        Stores a fresh entry for path. chunks maps bucket id -> chunk hash; parts maps
+        the id of a bucket split into sub-chunks -> its part hashes.
+        """
+        try:
+            st = st or os.stat(path)
+        except OSError:
+            return
+        entry = self._signature(st)
+        entry["hash"] = content_hash
+        if chunks is not None:
+            entry["chunks"] = chunks
+            entry["chunk_params"] = chunk_params
+        if parts:
+            entry["parts"] = parts
+        self.entries[self._key(path)] = entry
+        self.dirty = True
+
+    def cached_chunks(self, path, chunk_params, st=None):
+        """Chunk hashes for an unchanged file chunked with the same parameters, else None."""
+        entry = self.lookup(path, st)
+        if entry and "chunks" in entry and entry.get("chunk_params") == chunk_params:
+            return entry["chunks"]
+        return None
+
+    def cached_parts(self, path, st=None):
+        """Part hashes of the split buckets of an unchanged file ({} if none were recorded)."""
+        entry = self.lookup(path, st)
+        return entry.get("parts", {}) if entry else {}
+
+    def file_hash(self, path, reader):
+        """Content hash of path; only calls reader(path) when the stat signature changed."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return get_hash(reader(path))
+        entry = self.lookup(path, st)
+        if entry:
+            return entry["hash"]
+        content_hash = get_hash(reader(path))
+        self.record(path, content_hash, st=st)
+        return content_hash
+
+    def prune(self, live_paths):
+        """Forgets entries whose source file was not seen in the latest walk."""
+        live = {self._key(p) for p in live_paths}
+        stale = [k for k in self.entries if k not in live]
+        for k in stale:
+            del self.entries[k]
+        if stale:
+            self.dirty = True
+        return len(stale)
+
+    def save(self):
+        if self.dirty:
+            atomic_write_json(self.path, self.entries, indent=None)
+            self.dirty = False
@@ -1,20 +1,23 @@
 import os
 import sys
-import time
 import subprocess
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BASE_DIR)
+from work_queue import WorkQueue
+from utils import update_status, get_total_events
+import nibbler_worker
+
 LIBRARIAN = os.path.join(BASE_DIR, "scan_librarian.py")
 QUEUE_MGR = os.path.join(BASE_DIR, "scan_queue.py")
-NIBBLER = os.path.join(BASE_DIR, "nibble.py")
-DATA_DIR = os.path.join(BASE_DIR, "data")
-QUEUE_FILE = os.path.join(DATA_DIR, "queue.json")
+# nibble.py (v1) predates the shared WorkQueue; v2 leases from it directly
+NIBBLER = os.path.join(BASE_DIR, "nibble_v2.py")
 
-def run_script(script_path):
+def run_script(script_path, *args):
     print(f"\n>> Running {os.path.basename(script_path)}...")
     try:
-        subprocess.run([sys.executable, script_path], check=True)
+        subprocess.run([sys.executable, script_path, *args], check=True)
     except subprocess.CalledProcessError as e:
         print(f"Error running {script_path}: {e}")
         return False
@@ -32,33 +35,35 @@ def main():
 
     # 3. Nibble Loop
     print("\n>> Starting Nibble Loop...")
-    import json
+    queue = WorkQueue()
     
     while True:
         # Check Queue
-        if not os.path.exists(QUEUE_FILE):
-            print("Queue file missing.")
-            break
-            
-        with open(QUEUE_FILE, 'r') as f:
-            queue = json.load(f)
-            
-        if not queue:
+        count = queue.pending()
+        if not count:
             print("Queue empty. Feed complete.")
             break
+        if queue.peek() is None:
+            print(f"[PENDING: {count}] All remaining chunks are leased by another nibbler. Stopping.")
+            break
             
-        count = len(queue)
-        print(f"\n[PENDING: {count}] Consuming next chunk...")
+        print(f"\n[PENDING: {count}, ETA ~{queue.eta() / 60:.0f} min] Consuming next chunk...")
         
-        if not run_script(NIBBLER):
-            print("Nibbler crashed. Stopping.")
+        reply = nibbler_worker.dispatch(NIBBLER, [], limit=1, cwd=BASE_DIR)
+        if reply is None:
+            # No warm worker could be started: fall back to a one-shot nibbler
+            if not run_script(NIBBLER, "--limit=1"):
+                print("Nibbler crashed. Stopping.")
+                break
+        elif not reply.get("ok"):
+            print(f"Nibbler worker failed: {reply.get('error')}. Stopping.")
             break
             
         # Optional: Cool down for GPU?
         # time.sleep(1) 
+    queue.close()
 
     # Final Status Update
-    from nibble import update_status, get_total_events
     total = get_total_events()
     update_status("IDLE", f"Archives synced. Total records: {total}")
 
@@ -0,0 +1,117 @@
+import contextlib
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Config
+CONNECT_TIMEOUT = 5 # Seconds to open a connection; a dead host fails fast
+READ_TIMEOUT = 120 # Seconds per read (time to first token, gaps between tokens)
+MAX_PER_HOST = 4 # Requests in flight per backend; more wait for a slot
+POOL_SIZE = 4 # Keep-alive connections kept per backend
+RETRIES = 3 # Attempts for idempotent calls
+RETRY_BASE = 0.5 # Backoff before the first retry (full jitter, doubling)
+RETRY_CAP = 8.0
+RETRY_STATUSES = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+class HostPool:
+    """
+    One keep-alive session per backend host, with a cap on requests in flight.
+    Streams hold their slot until the response is closed.
+    """
+    def __init__(self, base, limit=MAX_PER_HOST, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        self.base = base
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(POOL_SIZE, limit), max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.slots = threading.BoundedSemaphore(limit)
+
+    def timeout(self, timeout=None):
+        """(connect, read) tuple; a bare number overrides the read timeout only."""
+        if isinstance(timeout, tuple):
+            return timeout
+        return (self.connect_timeout, timeout or self.read_timeout)
+
+POOLS = {}
+POOLS_LOCK = threading.Lock()
+
+def host_of(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def get_pool(url):
+    """The shared HostPool for url's scheme://host:port, created on first use."""
+    base = host_of(url)
+    with POOLS_LOCK:
+        if base not in POOLS:
+            POOLS[base] = HostPool(base)
+        return POOLS[base]
+
+def configure(url, limit=MAX_PER_HOST, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+    """Replaces url's host pool with one using these limits (idle connections of the old one are dropped)."""
+    pool = HostPool(host_of(url), limit, connect_timeout, read_timeout)
+    with POOLS_LOCK:
+        old = POOLS.get(pool.base)
+        POOLS[pool.base] = pool
+    if old:
+        old.session.close()
+    return pool
+
+def _backoff(attempt):
+    return random.uniform(0, min(RETRY_CAP, RETRY_BASE * 2 ** attempt))
+
+def _send(pool, method, url, timeout, idempotent, retries, kwargs):
+    """One call with retries: connection failures and 502/503/504, idempotent calls only."""
+    idempotent = method.upper() in IDEMPOTENT_METHODS if idempotent is None else idempotent
+    attempts = retries if idempotent else 1
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        try:
+            response = pool.session.request(method, url, timeout=pool.timeout(timeout), **kwargs)
+        except requests.exceptions.ConnectionError as e:
+            # Includes ConnectTimeout; a ReadTimeout means the server is working on it, so it is not retried
+            if last:
+                raise
+            logging.warning(f"{method} {url} failed ({e}); retrying.")
+        else:
+            if last or response.status_code not in RETRY_STATUSES:
+                return response
+            response.close()
+            logging.warning(f"{method} {url} returned {response.status_code}; retrying.")
+        time.sleep(_backoff(attempt))
+
+def request(method, url, timeout=None, idempotent=None, retries=RETRIES, **kwargs):
+    """
+    requests.request over the host's pooled keep-alive session. timeout is a
+    (connect, read) tuple or a read timeout. Only idempotent calls are retried; POST
+    is not unless the caller says so (a stateless generation is safe to resend).
+    """
+    pool = get_pool(url)
+    with pool.slots:
+        return _send(pool, method, url, timeout, idempotent, retries, dict(kwargs, stream=False))
+
+@contextlib.contextmanager
+def stream(method, url, timeout=None, idempotent=None, retries=RETRIES, **kwargs):
+    """request() for streamed bodies: yields the response and keeps the host slot until the block exits."""
+    pool = get_pool(url)
+    with pool.slots:
+        response = _send(pool, method, url, timeout, idempotent, retries, dict(kwargs, stream=True))
+        try:
+            yield response
+        finally:
+            # A fully read body returns its connection to the pool; an abandoned one is dropped
+            response.close()
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
@@ -0,0 +1,152 @@
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+# Config
+CONNECT_TIMEOUT = 10 # Seconds to open the socket (the Hub may be loading weights)
+HEARTBEAT_SECONDS = 20 # Keepalive ping interval
+HEARTBEAT_TIMEOUT = 20 # A ping unanswered this long closes the connection
+REQUEST_SECONDS = 180 # Longest wait for one reply; what arrived by then is returned
+RECONNECT_BASE = 1.0 # Backoff after a failed connect, doubling per failure...
+RECONNECT_CAP = 30.0 # ...up to this
+CLIENT_NAME = "refine_worker"
+
+def websockets_connect(uri):
+    import websockets
+    return websockets.connect(uri, open_timeout=CONNECT_TIMEOUT,
+                              ping_interval=HEARTBEAT_SECONDS, ping_timeout=HEARTBEAT_TIMEOUT)
+
+class HubSession:
+    """
+    [FEAT-330] One long-lived WebSocket to the Lab Hub per process, shared by every
+    McpClient call. The socket, handshake and a reader task live on the session's own
+    event loop thread, so sync and async callers on any thread or loop can share it.
+
+    Each text_input carries a request_id. Once the Hub is seen echoing ids, replies are
+    routed by id and requests run concurrently; until then exchanges are serialized, and
+    one that ends early (cancelled, timed out) drops the connection so its tail cannot
+    bleed into the next request. A lost connection fails the requests in flight and the
+    next request reconnects, backing off after failures. Keepalive pings are the heartbeat.
+    """
+    def __init__(self, uri, connect=websockets_connect):
+        self.uri = uri
+        self.connect = connect
+        self.ws = None
+        self.pending = {} # request_id -> asyncio.Queue of Hub messages (None: connection lost)
+        self.tagged = False # The Hub echoes request ids
+        self.connects = 0
+        self.failures = 0
+        self.retry_at = 0.0
+        self.ids = itertools.count(1)
+        self.loop = asyncio.new_event_loop()
+        self._locks = None
+        threading.Thread(target=self.loop.run_forever, daemon=True, name="hub-session").start()
+
+    def locks(self):
+        # Created on the session loop (asyncio primitives bind to the loop that first uses them)
+        if self._locks is None:
+            self._locks = (asyncio.Lock(), asyncio.Lock())
+        return self._locks
+
+    async def _connection(self):
+        connecting, _ = self.locks()
+        async with connecting:
+            if self.ws is not None:
+                return self.ws
+            wait = self.retry_at - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                ws = await self.connect(self.uri)
+                await ws.send(json.dumps({"type": "handshake", "client": CLIENT_NAME}))
+            except Exception:
+                self.failures += 1
+                self.retry_at = time.monotonic() + min(RECONNECT_CAP, RECONNECT_BASE * 2 ** (self.failures - 1))
+                raise
+            self.failures = 0
+            self.connects += 1
+            self.ws = ws
+            asyncio.ensure_future(self._read(ws))
+            return ws
+
+    async def _read(self, ws):
+        """Routes Hub messages to their request until the socket closes, then fails what is left."""
+        try:
+            async for raw in ws:
+                try:
+                    data = json.loads(raw)
+                except ValueError:
+                    continue
+                if not isinstance(data, dict):
+                    continue
+                request_id = data.get("request_id")
+                if request_id in self.pending:
+                    self.tagged = True
+                    self.pending[request_id].put_nowait(data)
+                elif request_id is None and len(self.pending) == 1:
+                    next(iter(self.pending.values())).put_nowait(data)
+        except Exception as e:
+            logging.warning(f"Hub connection lost: {e}")
+        finally:
+            if self.ws is ws:
+                self.ws = None
+            for queue in self.pending.values():
+                queue.put_nowait(None)
+
+    def _drop(self, ws):
+        if self.ws is ws:
+            self.ws = None
+        asyncio.ensure_future(ws.close())
+
+    async def _request(self, content, context, on_message):
+        _, exclusive = self.locks()
+        async with (contextlib.nullcontext() if self.tagged else exclusive):
+            ws = await self._connection()
+            request_id = f"{os.getpid()}-{next(self.ids)}"
+            queue = self.pending[request_id] = asyncio.Queue()
+            finished = False
+            try:
+                await ws.send(json.dumps({"type": "text_input", "content": content, "context": context,
+                                          "request_id": request_id}))
+                deadline = self.loop.time() + REQUEST_SECONDS
+                while not finished:
+                    try:
+                        data = await asyncio.wait_for(queue.get(), deadline - self.loop.time())
+                    except asyncio.TimeoutError:
+                        break
+                    if data is None:
+                        raise ConnectionError("Hub connection lost mid-request")
+                    finished = bool(on_message(data))
+            finally:
+                del self.pending[request_id]
+                if not finished and not self.tagged:
+                    self._drop(ws)
+
+    def submit(self, content, context, on_message):
+        """
+        Sends one text_input and feeds each reply to on_message(data) (on the session
+        thread) until it returns True or REQUEST_SECONDS pass. Returns a
+        concurrent.futures.Future; cancelling it abandons the request.
+        """
+        return asyncio.run_coroutine_threadsafe(self._request(content, context, on_message), self.loop)
+
+    def close(self):
+        if self.ws is not None:
+            asyncio.run_coroutine_threadsafe(self.ws.close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+SESSIONS = {}
+SESSIONS_LOCK = threading.Lock()
+
+def get_session(uri):
+    """The process's HubSession for uri (keyed by pid too, so a forked worker opens its own)."""
+    key = (uri, os.getpid())
+    with SESSIONS_LOCK:
+        if key not in SESSIONS:
+            SESSIONS[key] = HubSession(uri)
+        return SESSIONS[key]
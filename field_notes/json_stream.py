@@ -0,0 +1,72 @@
+import json
+
+# Config
+OPENERS = "[{"
+CLOSERS = "]}"
+
+class JsonValueScanner:
+    """
+    Incremental scanner for the first complete top-level JSON value in a token stream.
+    Prose before the value is skipped and brackets inside strings are ignored. feed()
+    returns True as soon as the value closes, so a streaming caller can hang up on the
+    engine instead of paying for the chatter after it. A bracketed span that does not
+    parse (e.g. "[sic]" in a preamble) is discarded and scanning resumes after it.
+    """
+    def __init__(self):
+        self.parts = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.done = False
+        self.value = None
+
+    def feed(self, chunk):
+        """Consumes the next piece of output. Returns True once a value has closed."""
+        if self.done or not chunk:
+            return self.done
+        begin = 0 if self.depth else None
+        for i, ch in enumerate(chunk):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch in OPENERS:
+                if self.depth == 0:
+                    begin = i
+                self.depth += 1
+            elif self.depth == 0:
+                continue
+            elif ch == '"':
+                self.in_string = True
+            elif ch in CLOSERS:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.parts.append(chunk[begin:i + 1])
+                    if self._close():
+                        return True
+                    begin = None
+        if begin is not None:
+            self.parts.append(chunk[begin:])
+        return False
+
+    def _close(self):
+        try:
+            self.value = json.loads("".join(self.parts))
+            self.done = True
+        except ValueError:
+            self.parts = []
+        return self.done
+
+    @property
+    def text(self):
+        """Source text of the closed value, or None if none has closed yet."""
+        return "".join(self.parts) if self.done else None
+
+def first_json_text(text):
+    """Source text of the first parseable top-level JSON value in text, or None."""
+    scanner = JsonValueScanner()
+    scanner.feed(text or "")
+    return scanner.text
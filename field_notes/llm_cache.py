@@ -0,0 +1,250 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from ai_engine import CognitiveEngine
+from utils import DATA_DIR
+
+# Config
+CACHE_DB = os.path.join(DATA_DIR, "llm_cache.db")
+CACHE_ENABLED = os.environ.get("LLM_CACHE", "1") != "0" # LLM_CACHE=0 sends every call to the backend
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+EVICT_TO = 0.9 # Eviction trims the cache to this fraction of MAX_CACHE_BYTES
+WAIT_POLL = 0.25 # Seconds between cancellation checks while waiting on an identical in-flight call
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    backend TEXT NOT NULL,
+    model TEXT,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_lru ON responses (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+def normalize_prompt(text):
+    """Line endings and trailing whitespace never change the answer, so they never split the cache."""
+    return "\n".join(line.rstrip() for line in text.strip().splitlines())
+
+def backend_identity(engine):
+    """(backend, model) a response depends on: the client class and endpoint, and the model name."""
+    endpoint = getattr(engine, 'url', None) or getattr(engine, 'uri', None) or getattr(engine, 'model_path', None)
+    model = getattr(engine, 'model', None)
+    return f"{type(engine).__name__}@{endpoint}", model if isinstance(model, str) else None
+
+class ResponseCache:
+    """
+    Content-addressed store of LLM responses in SQLite, bounded to max_bytes by
+    evicting the least recently used. Identical calls in flight in this process are
+    coalesced: one goes to the backend, the others wait for its answer. Hit, miss,
+    coalesced and eviction counts persist across runs.
+    """
+    def __init__(self, path=CACHE_DB, max_bytes=MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.conn = None
+        self.lock = threading.RLock()
+        self.inflight = {}
+
+    def _db(self):
+        # Opened on first use: engines are built at import time by scripts that may never call them
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+        return self.conn
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    @staticmethod
+    def key(backend, model, prompt, options=None, kind="text", schema=None):
+        blob = json.dumps([backend, model, kind, normalize_prompt(prompt), options or {}, schema], sort_keys=True)
+        return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+    def _count(self, name, n=1):
+        self._db().execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                           "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, n))
+
+    def get(self, key):
+        """Cached response for key (marking it recently used), or None."""
+        with self.lock:
+            row = self._db().execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def put(self, key, backend, model, response):
+        with self.lock:
+            now = time.time()
+            self._db().execute(
+                "INSERT OR REPLACE INTO responses (key, backend, model, response, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, backend, model, response, len(response.encode('utf-8')), now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess, evicted = total - self.max_bytes * EVICT_TO, []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self._count("evictions", len(evicted))
+        self.conn.execute("COMMIT")
+
+    def fetch(self, key, compute, backend, model=None, cancel=None):
+        """
+        (response, hit). On a miss the first caller runs compute() and stores a non-empty
+        result; identical concurrent callers wait for it (a failed or cancelled leader
+        hands the call to the next waiter). Waiting honours cancel.
+        """
+        waited = False
+        while True:
+            response = self.get(key)
+            if response is not None:
+                with self.lock:
+                    self._count("coalesced" if waited else "hits")
+                return response, True
+            with self.lock:
+                done = self.inflight.get(key)
+                if done is None:
+                    done = self.inflight[key] = threading.Event()
+                    break
+            waited = True
+            while not done.wait(WAIT_POLL):
+                if cancel:
+                    cancel.check()
+        try:
+            with self.lock:
+                self._count("misses")
+            response = compute()
+            if isinstance(response, str) and response.strip():
+                try:
+                    self.put(key, backend, model, response)
+                except sqlite3.Error as e:
+                    logging.warning(f"LLM cache write failed: {e}")
+            return response, False
+        finally:
+            with self.lock:
+                del self.inflight[key]
+            done.set()
+
+    def invalidate(self, key):
+        """Drops key's response, so the next identical call goes to the backend."""
+        with self.lock:
+            if self._db().execute("DELETE FROM responses WHERE key = ?", (key,)).rowcount:
+                self._count("invalidations")
+
+    def stats(self):
+        with self.lock:
+            db = self._db()
+            stats = dict(db.execute("SELECT name, value FROM counters"))
+            stats["entries"], stats["bytes"] = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = stats.get("hits", 0) + stats.get("coalesced", 0) + stats.get("misses", 0)
+        stats["hit_rate"] = (stats.get("hits", 0) + stats.get("coalesced", 0)) / lookups if lookups else 0.0
+        return stats
+
+CACHE = ResponseCache()
+
+class CachedEngine(CognitiveEngine):
+    """
+    Wraps a backend engine with the response cache, keyed by (backend, model,
+    normalized prompt, options). A hit is handed to on_token in one piece. Attributes
+    the wrapper does not define (model, prime, ...) are the backend's.
+    """
+    def __init__(self, backend, cache=None):
+        self.backend = backend
+        self.cache = cache or CACHE
+        self.last_hit = False # Whether the latest call was served from the cache
+        self.last_key = None
+
+    def __getattr__(self, name):
+        if name == "backend":
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    def _cached(self, kind, compute, prompt, context, options, schema, on_token, cancel):
+        if cancel:
+            cancel.check()
+        backend, model = backend_identity(self.backend)
+        full_prompt = f"{context}\n\n{prompt}" if context else prompt
+        key = self.last_key = self.cache.key(backend, model, full_prompt, options, kind, schema)
+        try:
+            response, self.last_hit = self.cache.fetch(key, compute, backend, model, cancel)
+        except sqlite3.Error as e:
+            # The cache is an optimization; a locked or corrupt file must not stop the pipeline
+            logging.warning(f"LLM cache unavailable ({e}); calling the backend directly.")
+            response, self.last_hit = compute(), False
+        if self.last_hit and on_token:
+            on_token(response)
+        return response
+
+    def forget_last(self):
+        """
+        Drops the latest response from the cache. Callers that judge an answer unusable
+        (nibble_v2 on a chunk failure) call this so a retry asks the model again.
+        """
+        if self.last_key is None:
+            return
+        try:
+            self.cache.invalidate(self.last_key)
+        except sqlite3.Error as e:
+            logging.warning(f"LLM cache invalidate failed: {e}")
+        self.last_key = None
+
+    def generate(self, prompt, context="", options=None, on_token=None, cancel=None):
+        return self._cached("text", lambda: self.backend.generate(prompt, context, options, on_token, cancel),
+                            prompt, context, options, None, on_token, cancel)
+
+    def generate_json(self, prompt, context="", options=None, schema=None, on_token=None, cancel=None):
+        return self._cached("json",
+                            lambda: self.backend.generate_json(prompt, context, options, schema, on_token, cancel),
+                            prompt, context, options, schema, on_token, cancel)
+
+def cached(engine):
+    """engine behind the shared response cache (unless disabled or already cached)."""
+    if not CACHE_ENABLED or isinstance(engine, CachedEngine):
+        return engine
+    return CachedEngine(engine)
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else CACHE_DB
+    if not os.path.exists(path):
+        print(f"Error: {path} not found.")
+        return
+    stats = ResponseCache(path).stats()
+    print(f"--- LLM Cache: {stats['entries']} responses, {stats['bytes'] / 1e6:.1f} MB ---")
+    print(f"Hits: {stats.get('hits', 0)}  Coalesced: {stats.get('coalesced', 0)}  "
+          f"Misses: {stats.get('misses', 0)}  Evictions: {stats.get('evictions', 0)}  "
+          f"Invalidated: {stats.get('invalidations', 0)}  "
+          f"Hit rate: {stats['hit_rate']:.0%}")
+
+if __name__ == "__main__":
+    main()
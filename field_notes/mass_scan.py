@@ -14,7 +14,11 @@ import datetime
 
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from utils import update_status, get_vram_usage, trigger_pager, ROUND_TABLE_LOCK, DATA_DIR
+from utils import update_status, get_vram_usage, trigger_pager, check_lock, ROUND_TABLE_LOCK, DATA_DIR
+from work_queue import WorkQueue
+from corpus_walk import write_corpus_walk, CORPUS_WALK_FILE
+from pacer import Pacer
+import nibbler_worker
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -28,13 +32,13 @@ ARTIFACT_SCANNER = os.path.join(BASE_DIR, "scan_artifacts.py")
 GEM_REFINER = os.path.join(BASE_DIR, "refine_gem.py")
 CLEANER = os.path.join(BASE_DIR, "clean_duplicates.py")
 AGGREGATOR = os.path.join(BASE_DIR, "aggregate_years.py")
-QUEUE_FILE = os.path.join(DATA_DIR, "queue.json")
 RAW_NOTES_DIR = os.path.join(os.path.dirname(BASE_DIR), "raw_notes")
 
 # Config
 VRAM_THRESHOLD = 0.95 # Allow up to 95% utilization
 MAX_LOAD = 4.0        # True Slow Burn threshold
-SLEEP_INTERVAL = 60   # Longer interval for polite background operation
+PACER = Pacer() # Inter-task delay driven by GPU temperature/utilization and load (replaces a fixed 60s)
+NIBBLE_BATCH = 8 # Tasks per worker dispatch; the worker prepares each next task during generation
 
 logging.basicConfig(
     level=logging.INFO,
@@ -44,11 +48,17 @@ logging.basicConfig(
 
 # [FEAT-330] Signal Throttling
 IS_PAUSED = False
+WORKER_PID = None # Warm nibbler worker; PAUSE is forwarded so it aborts its in-flight generation
 
 def handle_pause(signum, frame):
     global IS_PAUSED
     logging.warning("[GOVERNOR] Received PAUSE signal (SIGUSR1). Throttling execution...")
     IS_PAUSED = True
+    if WORKER_PID:
+        try:
+            os.kill(WORKER_PID, signal.SIGUSR1)
+        except OSError:
+            pass
 
 def handle_resume(signum, frame):
     global IS_PAUSED
@@ -86,21 +96,36 @@ def vram_guard():
         return False
     return True
 
+def task_env():
+    env = os.environ.copy()
+    env["MAX_LOAD"] = "5.0"
+    lab_root = os.path.dirname(os.path.dirname(BASE_DIR))
+    homelab_src = os.path.join(lab_root, "HomeLabAI/src")
+    curr_pp = env.get("PYTHONPATH", "")
+    env["PYTHONPATH"] = f"{BASE_DIR}:{homelab_src}:{curr_pp}" if curr_pp else f"{BASE_DIR}:{homelab_src}"
+    return env
+
 def run_task(cmd_list):
     try:
-        env = os.environ.copy()
-        env["MAX_LOAD"] = "5.0"
-        lab_root = os.path.dirname(os.path.dirname(BASE_DIR))
-        homelab_src = os.path.join(lab_root, "HomeLabAI/src")
-        curr_pp = env.get("PYTHONPATH", "")
-        env["PYTHONPATH"] = f"{BASE_DIR}:{homelab_src}:{curr_pp}" if curr_pp else f"{BASE_DIR}:{homelab_src}"
-        cwd = BASE_DIR
-        subprocess.run([sys.executable] + cmd_list, check=True, env=env, cwd=cwd, timeout=1800)
+        subprocess.run([sys.executable] + cmd_list, check=True, env=task_env(), cwd=BASE_DIR, timeout=1800)
         return True
     except Exception as e:
         logging.error(f"Task failed: {e}")
         return False
 
+def run_nibbler(flags, limit=1):
+    """Hands up to limit queue tasks to the warm `nibble_v2 --serve` worker (one-shot subprocess as fallback)."""
+    global WORKER_PID
+    if nibbler_worker.ensure_worker(NIBBLER, env=task_env(), cwd=BASE_DIR):
+        WORKER_PID = nibbler_worker.worker_pid()
+    reply = nibbler_worker.dispatch(NIBBLER, flags, limit=limit, env=task_env(), cwd=BASE_DIR)
+    if reply is None:
+        logging.warning("Nibbler worker unavailable. Falling back to a one-shot nibbler.")
+        return run_task([NIBBLER, f"--limit={limit}"] + flags)
+    if not reply.get("ok"):
+        logging.error(f"Nibbler worker failed: {reply.get('error')}")
+    return reply.get("ok", False)
+
 def get_low_rank_items():
     """Finds items that could benefit from re-reasoning."""
     items = []
@@ -130,49 +155,6 @@ def wait_for_roundtable_lock(lock_path, timeout=LOCK_ACQUIRE_TIMEOUT):
         time.sleep(0.5)
     return False
 
-def lock_pid_alive(pid):
-    """Returns True if the given PID is still alive, False otherwise.
-    Non-int/empty values are treated as alive (True)."""
-    try:
-        pid = int(pid)
-    except (TypeError, ValueError):
-        return True
-    try:
-        os.kill(pid, 0)
-        return True
-    except ProcessLookupError:
-        return False
-    except PermissionError:
-        return True
-    except OSError:
-        return False
-
-def check_lock(lock_path):
-    """Returns True if background tasks should yield to Intercom."""
-    if os.path.exists(lock_path):
-        # Check for stale lock (older than 30 mins for faster recovery)
-        if time.time() - os.path.getmtime(lock_path) > 1800:
-            logging.warning("[LOCK] Stale Round Table Lock detected (>30m). Ignoring.")
-            return False
-        # If the lock file holds a valid PID that is no longer alive, treat as stale
-        try:
-            with open(lock_path, 'r') as f:
-                content = f.read().strip()
-            if content:
-                pid = int(content)
-                if not lock_pid_alive(pid):
-                    logging.warning(f"[LOCK] Round Table Lock PID {pid} is dead. Removing stale lock.")
-                    try:
-                        os.remove(lock_path)
-                    except OSError as e:
-                        logging.error(f"[LOCK] Failed to remove stale lock {lock_path}: {e}")
-                    return False
-        except (ValueError, OSError):
-            # Empty or unreadable content: fall back to mtime check only
-            pass
-        return True
-    return False
-
 def hallway_protocol(keyword):
     """[FEAT-179] Targeted scan for the Hallway Protocol."""
     logging.info(f"=== HALLWAY PROTOCOL: Targeted Search for '{keyword}' ===")
@@ -408,11 +390,21 @@ def main():
         logging.info(f"--- Starting Epoch {epoch_count} ---")
         update_status("ONLINE", f"Starting Epoch {epoch_count}...")
         
+        # 0. One shared corpus walk for the librarian, queue manager and artifact scanner
+        walk_arg = f"--walk={CORPUS_WALK_FILE}"
+        try:
+            entries = write_corpus_walk()
+            logging.info(f"Corpus walk: {len(entries)} files.")
+        except Exception as e:
+            logging.error(f"Corpus walk failed ({e}). Stages will walk individually.")
+            walk_arg = None
+        walk_flags = [walk_arg] if walk_arg else []
+
         # 1. Update Manifest
-        run_task([LIBRARIAN])
+        run_task([LIBRARIAN] + walk_flags)
         
         # 2. Update Queue
-        run_task([QUEUE_MGR])
+        run_task([QUEUE_MGR] + walk_flags)
 
         # 3. Artifact Map Refresh (Hybrid/Brain Mode)
         # Only run if there is work or if specifically requested
@@ -428,47 +420,41 @@ def main():
             progress = int((idx / len(years)) * 100)
             logging.info(f"Scanning Artifact Sector: {year} (Brain) [{progress}%]")
             update_status("ONLINE", f"Scanning Artifacts: {year}", progress_pct=progress)
-            run_task([ARTIFACT_SCANNER, year, "--hybrid"])
+            run_task([ARTIFACT_SCANNER, year, "--hybrid"] + walk_flags)
         
         if check_lock(lock_path) or os.path.exists(maint_lock): continue
 
         # 4. Notes Fast Burn
         logging.info("Step 4: Consuming Note Queue...")
-        initial_queue_size = 0
-        if os.path.exists(QUEUE_FILE):
-            try:
-                with open(QUEUE_FILE, 'r') as f:
-                    queue = json.load(f)
-                    initial_queue_size = len(queue)
-            except: queue = []
+        queue = WorkQueue()
+        initial_queue_size = queue.pending()
 
-            while queue:
-                if check_lock(lock_path) or os.path.exists(maint_lock): break
-                
-                while not vram_guard(): 
-                    update_status("WAITING", "VRAM Cooling...")
-                    time.sleep(60)
-                
-                task = queue[0]
-                remaining = len(queue)
-                progress = 100
-                if initial_queue_size > 0:
-                    progress = int(((initial_queue_size - remaining) / initial_queue_size) * 100)
-                
-                logging.info(f"Processing: {task['id']} ({remaining} remaining) [{progress}%]")
-                update_status("BUSY", f"Nibbling: {task['id']}", filename=task['filename'], progress_pct=progress)
-                
-                use_hybrid = "2024" in task['bucket'] or "PIAV" in task['filename']
-                flag = "--hybrid" if use_hybrid else "--reasoning"
-                
-                if run_task([NIBBLER, flag]):
-                    time.sleep(SLEEP_INTERVAL)
-                else:
-                    time.sleep(60)
-                
-                # Reload queue
-                with open(QUEUE_FILE, 'r') as f:
-                    queue = json.load(f)
+        while True:
+            # A forwarded PAUSE aborted the last dispatch; don't send the next one until RESUME
+            wait_if_paused()
+            if check_lock(lock_path) or os.path.exists(maint_lock): break
+            
+            while not vram_guard(): 
+                update_status("WAITING", "VRAM Cooling...")
+                time.sleep(60)
+            
+            # Peek only: the nibbler leases and acks the tasks itself
+            task = queue.peek()
+            if task is None: break
+            remaining = queue.pending()
+            progress = 100
+            if initial_queue_size > 0:
+                progress = int(((initial_queue_size - remaining) / initial_queue_size) * 100)
+            
+            logging.info(f"Processing: {task['id']} ({remaining} remaining, ETA ~{queue.eta() / 60:.0f} min) [{progress}%]")
+            update_status("BUSY", f"Nibbling: {task['id']}", filename=task['filename'], progress_pct=progress)
+            
+            # --auto: the worker picks hybrid/reasoning per leased task and prepares the next
+            # one during generation. It aborts on the Round Table lock or a forwarded PAUSE and
+            # cools down between tasks itself; VRAM and locks are re-checked here per batch.
+            if not run_nibbler(["--auto"], limit=NIBBLE_BATCH):
+                PACER.pause("Nibbler dispatch failed")
+        queue.close()
 
         if check_lock(lock_path) or os.path.exists(maint_lock): continue
 
@@ -492,9 +478,9 @@ def main():
                 logging.info(f"Step 5.1: Refining Gem [{i+1}/{len(items_to_refine)}]...")
                 update_status("ONLINE", f"Refining Gem {i+1}/{len(items_to_refine)}")
                 if run_task([GEM_REFINER]):
-                    time.sleep(SLEEP_INTERVAL)
+                    PACER.pause()
                 else:
-                    time.sleep(120) 
+                    PACER.pause("Gem refiner failed")
 
         if check_lock(lock_path): continue
 
@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import http_pool
+from utils import DATA_DIR, atomic_write_json
+
+# Config
+CATALOG_FILE = os.path.join(DATA_DIR, "model_catalog.json") # Shared by every script on this box
+CATALOG_TTL = 600 # Seconds a model list is trusted before /api/tags is asked again
+DOWN_TTL = 60 # Seconds a failed probe is remembered, so a down Ollama is not re-probed by every start
+PROBE_TIMEOUT = (2, 5) # (connect, read); probed once, without retries
+
+def tags_url(url):
+    return url.replace("/api/generate", "/api/tags")
+
+def fetch_tags(url):
+    """Model names an Ollama host serves (raises if it is unreachable)."""
+    response = http_pool.get(tags_url(url), timeout=PROBE_TIMEOUT, retries=1)
+    response.raise_for_status()
+    return [m.get('name') for m in response.json().get('models', [])]
+
+def pick_model(requested, models):
+    """The requested model if served, else the first non-embedding one; requested when the list is unknown."""
+    if not models:
+        logging.warning("Ollama model list unavailable or empty. Using configured default.")
+        return requested
+    if requested in models:
+        return requested
+    logging.warning(f"Model '{requested}' not found in Ollama.")
+    # Find a non-embedding model as a fallback
+    fallback_model = next((m for m in models if "embed" not in m), None)
+    if fallback_model:
+        logging.warning(f"Falling back to first available model: {fallback_model}")
+        return fallback_model
+    logging.error("No suitable fallback models found in Ollama.")
+    return requested
+
+class ModelCatalog:
+    """
+    Process-wide cache of each Ollama host's /api/tags, persisted to CATALOG_FILE so
+    short-lived scripts share it. A list is reused for CATALOG_TTL; a failed probe is
+    remembered for DOWN_TTL and keeps the last known list.
+    """
+    def __init__(self, path=CATALOG_FILE, ttl=CATALOG_TTL, down_ttl=DOWN_TTL, fetch=fetch_tags, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.down_ttl = down_ttl
+        self.fetch = fetch
+        self.clock = clock
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, key, entry):
+        if not self.path:
+            return
+        try:
+            data = self._load()
+            data[key] = entry
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            atomic_write_json(self.path, data)
+        except OSError as e:
+            logging.warning(f"Could not persist model catalog: {e}")
+
+    def _fresh(self, entry, now):
+        if entry.get("failed") and now - entry["failed"] < self.down_ttl:
+            return True
+        return entry.get("fetched") is not None and now - entry["fetched"] < self.ttl
+
+    def models(self, url):
+        """Model names served at url, or None if the host has never answered."""
+        key = tags_url(url)
+        with self.lock:
+            now = self.clock()
+            entry = self.entries.get(key)
+            if entry is None or not self._fresh(entry, now):
+                # Another process may have probed since
+                entry = (self._load() if self.path else {}).get(key) or entry or {}
+            if not self._fresh(entry, now):
+                try:
+                    entry = {"models": self.fetch(url), "fetched": now}
+                except Exception as e:
+                    logging.error(f"Failed to probe Ollama for models: {e}. Using last known list.")
+                    entry = dict(entry, failed=now)
+                self._save(key, entry)
+            self.entries[key] = entry
+            return entry.get("models")
+
+    def invalidate(self, url=None):
+        """Forgets url's list (every host's if url is None) in this process and on disk."""
+        with self.lock:
+            keys = [tags_url(url)] if url else list(self.entries)
+            for key in keys:
+                self.entries.pop(key, None)
+                self._save(key, {})
+
+CATALOG = ModelCatalog()
@@ -3,13 +3,11 @@ import os
 import sys
 import re
 import time
-import glob
-import requests
-import hashlib
 import logging
 import difflib
 import psutil
 import threading
+import signal
 
 # Add current directory and HomeLabAI/src to path
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -19,12 +17,22 @@ for p in [BASE_DIR, HOMELAB_SRC]:
     if p not in sys.path:
         sys.path.append(p)
 
+from ai_engine import EVENT_LIST_SCHEMA
 from ai_engine_v2 import get_engine_v2
-from utils import update_status, get_system_load, ROUND_TABLE_LOCK, can_burn, DATA_DIR
+from utils import update_status, check_lock, ROUND_TABLE_LOCK, can_burn, DATA_DIR
+from work_queue import WorkQueue
+from blob_store import BlobStore, get_hash
+from engine_stats import EngineStats
+from chunk_planner import estimate_tokens
+from nibbler_worker import NIBBLER_SOCKET, serve as serve_socket
+from write_behind import WriteBehind
+from cancellation import CancelToken, CancelWatcher, GenerationCancelled
+from pacer import Pacer
+from rule_engine import RuleSet
+from quarantine import record_failure, backend_answered
 from infra.status_model import StatusModel
 
 # Config
-QUEUE_FILE = os.path.join(DATA_DIR, "queue.json")
 STATE_FILE = os.path.join(DATA_DIR, "chunk_state.json")
 AUDIT_FILE = os.path.join(DATA_DIR, "privacy_audit.jsonl")
 STATUS_FILE = os.path.join(DATA_DIR, "status.json")
@@ -43,16 +51,50 @@ logging.basicConfig(
 def log(msg):
     logging.info(msg)
 
+def engine_mode_for(flags):
+    if "--auto" in flags: return "AUTO"
+    if "--hybrid" in flags: return "HYBRID"
+    if "--reasoning" in flags: return "REASONING"
+    return "LOCAL"
+
+def task_engine_mode(task, mode):
+    """[--auto] picks per task: hybrid for 2024 buckets and PIAV notes, reasoning for the rest."""
+    if mode != "AUTO":
+        return mode
+    return "HYBRID" if "2024" in task['bucket'] or "PIAV" in task['filename'] else "REASONING"
+
 # AI & Metrics
 REASONING_MODE = "--reasoning" in sys.argv
 HYBRID_MODE = "--hybrid" in sys.argv
 FAST_MODE = "--fast" in sys.argv
-engine_mode = "LOCAL"
-if HYBRID_MODE: engine_mode = "HYBRID"
-elif REASONING_MODE: engine_mode = "REASONING"
+engine_mode = engine_mode_for(sys.argv)
+
+# Engines are built on first use and kept for the life of the process, so a --serve
+# worker pays the Ollama probe, tool registry and model load once, not per task
+ENGINES = {}
+ENGINE_STATS = EngineStats()
+
+def get_engine(mode):
+    if mode not in ENGINES:
+        ENGINES[mode] = get_engine_v2(mode=mode)
+    return ENGINES[mode]
 
-ENGINE = get_engine_v2(mode=engine_mode)
 MAX_LOAD = float(os.environ.get("MAX_LOAD", 4.0))
+PACER = Pacer() # Inter-task delay driven by GPU temperature/utilization and load
+
+# Token of the in-flight generation; the Round Table lock or a governor SIGUSR1 trips it
+ACTIVE_CANCEL = None
+
+def interactive_session():
+    """Reason to abort a background generation right now, or None (stale locks don't count)."""
+    if check_lock(ROUND_TABLE_LOCK):
+        return "Round Table session started"
+    return None
+
+def handle_pause(signum, frame):
+    """[FEAT-330] Governor PAUSE (SIGUSR1): abort the in-flight generation."""
+    if ACTIVE_CANCEL is not None:
+        ACTIVE_CANCEL.cancel("Governor PAUSE (SIGUSR1)")
 
 def should_yield() -> bool:
     """Check if Nibbler should yield due to non-idle mode, memory pressure, or high load."""
@@ -76,45 +118,16 @@ def should_yield() -> bool:
 
     return False
 
-# FEAT-428 Progressive Cooldown State
-CONSECUTIVE_YIELDS = 0
-
 def check_system_load():
-    global CONSECUTIVE_YIELDS
-    if FAST_MODE: 
-        CONSECUTIVE_YIELDS = 0
+    """[FEAT-428] Progressive cooldown: the pacer backs off while can_burn() says no."""
+    if FAST_MODE:
         return True
     ready, reason = can_burn(max_load=MAX_LOAD)
     if not ready:
-        CONSECUTIVE_YIELDS += 1
-        if CONSECUTIVE_YIELDS == 1:
-            log(f"[FEAT-428] Cooldown Tier 1 ({reason}). Sleeping 15s...")
-            time.sleep(15)
-        elif CONSECUTIVE_YIELDS == 2:
-            log(f"[FEAT-428] Cooldown Tier 2 ({reason}). Sleeping 60s...")
-            time.sleep(60)
-        else:
-            if CONSECUTIVE_YIELDS == 3:
-                log(f"[FEAT-428] Cooldown Tier 3 ({reason}). Entering COOLDOWN mode (sleeping 15m)...")
-            time.sleep(900)
+        waited, _ = PACER.pause(reason)
+        log(f"[FEAT-428] Cooldown ({reason}). Waited {waited:.0f}s.")
         return False
-    else:
-        if CONSECUTIVE_YIELDS > 0:
-            log(f"[FEAT-428] System load clear. Cooldown reset (was {CONSECUTIVE_YIELDS}).")
-        CONSECUTIVE_YIELDS = 0
-        return True
-
-def load_json(path):
-    if os.path.exists(path):
-        with open(path, 'r') as f:
-            try:
-                return json.load(f)
-            except: return []
-    return []
-
-def save_json(path, data):
-    with open(path, 'w') as f:
-        json.dump(data, f, indent=2)
+    return True
 
 def extract_json_from_llm(text):
     """
@@ -168,97 +181,299 @@ def validate_date(date_str):
 
 def is_semantic_duplicate(new_summary, existing_events, threshold=0.85):
     """Checks if a summary is semantically similar to any existing event on the same date."""
-    for event in existing_events:
-        existing_summary = event.get('summary', '')
-        # Simple fuzzy ratio
-        ratio = difflib.SequenceMatcher(None, new_summary.lower(), existing_summary.lower()).ratio()
-        if ratio > threshold:
+    return is_near_duplicate(new_summary.lower(), [(e.get('summary') or '').lower() for e in existing_events], threshold)
+
+def is_near_duplicate(new_summary, existing_summaries, threshold=0.85):
+    """
+    Exact SequenceMatcher(new, existing).ratio() > threshold test over lower-cased summaries.
+    difflib's own upper bounds (length, then character multiset) reject most candidates
+    before the quadratic ratio() runs; neither can reject a true duplicate. ratio() is not
+    symmetric (autojunk and tie-breaks follow seq2), so the order must stay (new, existing).
+    """
+    n = len(new_summary)
+    for existing in existing_summaries:
+        total = n + len(existing)
+        if total and 2.0 * min(n, len(existing)) / total <= threshold:
+            continue
+        matcher = difflib.SequenceMatcher(None, new_summary, existing)
+        if matcher.quick_ratio() > threshold and matcher.ratio() > threshold:
             return True
     return False
 
+class SummaryIndex:
+    """
+    Lower-cased event summaries by date for each bucket document, so the duplicate check
+    does not rescan the whole bucket for every new event. An index is rebuilt only when
+    its document is replaced (re-read after an external rewrite) or changes behind its back.
+    """
+    def __init__(self):
+        self.entries = {}
+
+    def on_date(self, path, events, date):
+        entry = self.entries.get(path)
+        if entry is None or entry["doc"] is not events or entry["count"] != len(events):
+            by_date = {}
+            for e in events:
+                by_date.setdefault(e.get('date'), []).append((e.get('summary') or '').lower())
+            entry = self.entries[path] = {"doc": events, "count": len(events), "by_date": by_date}
+        return entry["by_date"].get(date, [])
+
+    def add(self, path, event):
+        entry = self.entries.get(path)
+        if entry:
+            entry["by_date"].setdefault(event.get('date'), []).append((event.get('summary') or '').lower())
+            entry["count"] += 1
+
+SUMMARY_INDEX = SummaryIndex()
+
+def task_members(task, content_hash):
+    """chunk_state entries a task covers (tasks queued before the planner cover just their id)."""
+    return task.get('members') or [{"id": task['id'], "hash": content_hash}]
+
+def member_done(state, member):
+    if state.get(member['id']) == member['hash']:
+        return True
+    return 'part' in member and member['part'] in state.get(f"{member['id']}::parts", [])
+
+def mark_done(state, members):
+    """chunk_state updates recording captured members; a split bucket is done once all of its parts are."""
+    updates = {}
+    for member in members:
+        if 'part' not in member:
+            updates[member['id']] = member['hash']
+            continue
+        key = f"{member['id']}::parts"
+        done = [h for h in updates.get(key, state.get(key, [])) if h in member['parts']]
+        if member['part'] not in done:
+            done.append(member['part'])
+        updates[key] = done
+        if set(member['parts']) <= set(done):
+            updates[member['id']] = member['hash']
+    return updates
+
+def bucket_path(bucket):
+    return os.path.join(DATA_DIR, f"{bucket.replace('-', '_')}.json")
+
+def event_bucket(task, clean_date):
+    """An event's bucket: its own month when the task spans it, else the task's first bucket."""
+    month = clean_date[:7]
+    return month if month in task.get('buckets', []) else task['bucket']
+
+# [VIBE-008] Guillotine rules: a FORBIDDEN header drops its section, a SAFE header ends the drop
+GUILLOTINE_FORBIDDEN = RuleSet([
+    r"AREAS FOR IMPROVEMENT",
+    r"AREAS FOR DEVELOPMENT",
+    r"Results Coaching",
+    r"Behaviors Coaching",
+    r"Behaviors Feedback",
+    r"Coach\b",
+    r"Growth Feedback"
+])
+GUILLOTINE_SAFE = RuleSet([
+    r"Next Year's Technical Strategy",
+    r"Future Goals",
+    r"Technical Strategy",
+    r"Strategic Focal Points",
+    r"Architecture Plans"
+])
+
 def scrub_input_buffer(text):
     """
     [VIBE-008] Structural Guillotine.
-    Drops forbidden sections based on headers.
+    Drops forbidden sections based on headers. Only header lines are visited from
+    Python (RuleSet.scan); kept text is copied in whole runs of lines.
     """
-    FORBIDDEN_HEADERS = [
-        r"AREAS FOR IMPROVEMENT",
-        r"AREAS FOR DEVELOPMENT",
-        r"Results Coaching",
-        r"Behaviors Coaching",
-        r"Behaviors Feedback",
-        r"Coach\b",
-        r"Growth Feedback"
-    ]
-    
-    SAFE_HEADERS = [
-        r"Next Year's Technical Strategy",
-        r"Future Goals",
-        r"Technical Strategy",
-        r"Strategic Focal Points",
-        r"Architecture Plans"
-    ]
+    text = "\n".join(text.splitlines())
+    drops = {start: (rule, end) for rule, start, end in GUILLOTINE_FORBIDDEN.scan(text)}
+    if not drops:
+        return text
+    resumes = {start: (rule, end) for rule, start, end in GUILLOTINE_SAFE.scan(text) if start not in drops}
+
+    kept = []
+    keep_from, is_dropped = 0, False
+    for line_start in sorted(set(drops) | set(resumes)):
+        if line_start in drops:
+            if not is_dropped:
+                if line_start > keep_from:
+                    kept.append(text[keep_from:line_start - 1])
+                logging.info(f"   [GUILLOTINE] Dropping section starting at: {text[line_start:drops[line_start][1]].strip()[:50]}...")
+                is_dropped = True
+        elif is_dropped:
+            logging.info(f"   [GUILLOTINE] Resuming at safe header: {text[line_start:resumes[line_start][1]].strip()[:50]}...")
+            keep_from, is_dropped = line_start, False
+    if not is_dropped:
+        kept.append(text[keep_from:])
+    return "\n".join(kept)
+
+def build_prompt(task, scrubbed_content):
+    """[FEAT-128] Strategic Prompt selection."""
+    file_type = task.get('type', 'LOG')
+    is_deep_connect = task.get("mode") == "DEEP_CONNECT"
+    prompt = ""
     
-    lines = text.splitlines()
-    clean_lines = []
-    is_dropped = False
-    
-    for line in lines:
-        # Check if we should drop
-        if any(re.search(pattern, line, re.IGNORECASE) for pattern in FORBIDDEN_HEADERS):
-            logging.info(f"   [GUILLOTINE] Dropping section starting at: {line.strip()[:50]}...")
-            is_dropped = True
-            continue
-            
-        # Check if we should resume
-        if is_dropped and any(re.search(pattern, line, re.IGNORECASE) for pattern in SAFE_HEADERS):
-            logging.info(f"   [GUILLOTINE] Resuming at safe header: {line.strip()[:50]}...")
-            is_dropped = False
-            
-        if not is_dropped:
-            clean_lines.append(line)
-            
-    return "\n".join(clean_lines)
+    if is_deep_connect:
+        strategic_context = task.get("strategic_context", "General Technical DNA")
+        prompt = f"""
+        [ROLE] You are 'Pinky', a high-fidelity technical forensic investigator.
+        [STRATEGIC SEEDS] {strategic_context}
+        [TASK] Perform 'Reverse RAG'. Analyze the RAW LOGS to find specific 'Technical Evidence'.
+        1. Harvest high-density technical blocks (50-100 words).
+        2. Focus on: Error traces, register values, post-mortem logic.
+        Return a JSON list of EVIDENCE pairs:
+        [
+          {{
+            "date": "YYYY-MM-DD", 
+            "summary": "...", 
+            "evidence": "...", 
+            "tags": ["technical", "evidence", "lora_candidate"]
+          }}
+        ]
+        """
+    elif file_type == "META":
+        prompt = f"""
+        [TASK] Expert Career Strategist. Analyze this high-level document and extract the core strategic anchor.
+        [EXCLUSION] EXCLUDE all behavioral feedback, coaching, or personal growth plans. Focus exclusively on technical milestones and strategic focal points.
+        [YEAR] {task['bucket']}
+        [CONTENT]
+        {scrubbed_content}
+        
+        [OUTPUT]
+        Generate a JSON list containing ONE high-value entry.
+        Prefix the summary with [STRATEGIC_ANCHOR].
+# [FEAT-129] The Philosophical Core
+        The summary should capture the primary focal point, philosophical shift, or major career milestone.
+        
+        [FORMAT]
+        [
+          {{ 
+            "date": "{task['bucket']}-01-01", 
+            "summary": "[STRATEGIC_ANCHOR] ...", 
+            "evidence": "...", 
+            "sensitivity": "Public", 
+            "tags": ["strategy", "anchor"] 
+          }}
+        ]
+        """
+    else:
+        prompt = f"Extract technical events from this log: {scrubbed_content}"
+    return prompt
 
-def main():
-    log(f"--- Pinky Nibbler v2.1 (Reasoning: {REASONING_MODE}) ---")
-    
-    # --- LIMIT FLAG ---
-    limit = 999
-    for arg in sys.argv:
-        if arg.startswith("--limit="):
-            limit = int(arg.split("=")[1])
+def prepare_task(task, blobs, memory=None):
+    """
+    CPU/disk half of a task: blob load, [VIBE-008] guillotine scrub, prompt and, for
+    reasoning engines, the ArchiveMemory context. Returns None if the blob is missing.
+    """
+    # Lazy load: chunk text is only pulled from the blob store once we commit to the task
+    content = task['content'] if 'content' in task else blobs.get(task.get('hash'))
+    if content is None:
+        return None
+    scrubbed_content = scrub_input_buffer(content)
+    history = None
+    if memory is not None and task.get('type', 'LOG') != "META":
+        history = memory.get_context(task['bucket'], scrubbed_content)
+    return {"content": content, "scrubbed": scrubbed_content,
+            "prompt": build_prompt(task, scrubbed_content), "history": history}
+
+class Prefetcher:
+    """
+    Producer stage of the nibbler pipeline: while the engine works on task N, a daemon
+    thread prepares the next leased task (prepare_task), so the GPU never waits on
+    Python-side work. A caller that passes one to nibble() keeps the look-ahead lease
+    across calls; --serve does not, since mass_scan dispatches multi-task --auto runs
+    and the look-ahead lives within each run.
+    """
+    def __init__(self):
+        self.task = None
+        self.job = None
+        self.thread = None
 
-    if not os.path.exists(QUEUE_FILE):
-        update_status("IDLE", "Queue empty.")
-        return
+    def start(self, task, blobs, memory):
+        self.task, self.job = task, None
+        self.thread = threading.Thread(target=self._prepare, args=(task, blobs, memory), daemon=True)
+        self.thread.start()
 
-    with open(QUEUE_FILE, 'r') as f:
-        queue = json.load(f)
-        
-    if not queue:
+    def _prepare(self, task, blobs, memory):
+        try:
+            self.job = prepare_task(task, blobs, memory)
+        except Exception as e:
+            log(f"   ! Prefetch of {task['id']} failed ({e}). It will be prepared inline.")
+
+    def take(self):
+        """(task, prepared job or None) for the look-ahead task, or (None, None). Clears the slot."""
+        if self.task is None:
+            return None, None
+        self.thread.join()
+        task, job = self.task, self.job
+        self.task = self.job = self.thread = None
+        return task, job
+
+    def release(self, queue):
+        """Hands an unused look-ahead task back to the queue."""
+        task, _ = self.take()
+        if task is not None:
+            queue.release(task['id'])
+
+def nibble(queue, blobs, store, limit=999, mode=engine_mode, fast=FAST_MODE, prefetch=None):
+    """
+    Leases and processes up to limit queue tasks with the given engine mode ("AUTO"
+    picks it per task, see task_engine_mode). Bucket and
+    state writes go through the write-behind store. A cancelled generation puts its task
+    back and ends the run. The next task is prepared during each generation; pass a
+    Prefetcher to keep that look-ahead across calls (the caller releases it at the end).
+    Returns the count.
+    """
+    owns_prefetch = prefetch is None
+    prefetch = prefetch or Prefetcher()
+    if prefetch.task is None and not queue.pending():
         update_status("IDLE", "Queue empty.")
-        return
-
-    # Load State for De-duping
-    state = load_json(STATE_FILE)
-    if isinstance(state, list): state = {} # Safety for corrupted state
+        return 0
 
     processed_this_run = 0
-    while queue and processed_this_run < limit:
-        task = queue.pop(0)
+    try:
+        processed_this_run = _nibble_loop(queue, blobs, store, limit, mode, fast,
+                                          prefetch, lookahead=not owns_prefetch)
+    finally:
+        if owns_prefetch:
+            prefetch.release(queue)
+
+    # Queue drained: publish the buckets now for the refine/aggregate stages that follow
+    if queue.peek() is None:
+        store.flush()
+    return processed_this_run
+
+def task_engine(task, mode):
+    """(engine mode, engine, reasoning memory or None) that process task."""
+    mode = task_engine_mode(task, mode)
+    engine = get_engine(mode)
+    return mode, engine, getattr(engine, 'memory', None) if mode == "REASONING" else None
+
+def _nibble_loop(queue, blobs, store, limit, mode, fast, prefetch, lookahead):
+    global ACTIVE_CANCEL
+    processed_this_run = 0
+    while processed_this_run < limit:
+        task, job = prefetch.take()
+        if task is None:
+            task = queue.lease()
+        if task is None:
+            break
         processed_this_run += 1
+
+        # Load State for De-duping (cached; re-read only if another process rewrote it)
+        state = store.get(STATE_FILE, {})
         
-        # --- HASH DE-DUPING ---
-        content_hash = hashlib.md5(task['content'].encode('utf-8')).hexdigest()
-        if state.get(task['id']) == content_hash:
+        # --- HASH DE-DUPING --- (legacy queue.json tasks still carry inline content)
+        content_hash = task.get('hash') or get_hash(task['content'])
+        members = task_members(task, content_hash)
+        if all(member_done(state, m) for m in members):
             log(f"   > Skipping {task['id']} (Hash match)")
+            queue.ack(task['id'])
             continue
 
         # --- IDLE-ONLY & RAM/LOAD SENTINEL ---
         if should_yield():
             log("[NIBBLER] Yielding due to system conditions")
-            time.sleep(30)
+            queue.release(task['id'])
+            PACER.pause()
             continue
 
         # --- POLITENESS CHECK ---
@@ -267,81 +482,58 @@ def main():
             time.sleep(10)
 
         log(f"Nibbling: {task['id']} ({task['bucket']})")
-        
-        # [VIBE-008] Apply structural guillotine to all content
-        scrubbed_content = scrub_input_buffer(task['content'])
 
-        # [FEAT-128] Strategic Prompt selection
+        task_mode, engine, memory = task_engine(task, mode)
+        reasoning = task_mode == "REASONING"
+        job = job or prepare_task(task, blobs, memory)
+        if job is None:
+            log(f"   ! Blob {content_hash} missing for {task['id']}. Dropping task; scan_queue will requeue it.")
+            queue.ack(task['id'])
+            continue
+        content, scrubbed_content, prompt = job["content"], job["scrubbed"], job["prompt"]
         file_type = task.get('type', 'LOG')
-        is_deep_connect = task.get("mode") == "DEEP_CONNECT"
-        prompt = ""
-        
-        if is_deep_connect:
-            strategic_context = task.get("strategic_context", "General Technical DNA")
-            prompt = f"""
-            [ROLE] You are 'Pinky', a high-fidelity technical forensic investigator.
-            [STRATEGIC SEEDS] {strategic_context}
-            [TASK] Perform 'Reverse RAG'. Analyze the RAW LOGS to find specific 'Technical Evidence'.
-            1. Harvest high-density technical blocks (50-100 words).
-            2. Focus on: Error traces, register values, post-mortem logic.
-            Return a JSON list of EVIDENCE pairs:
-            [
-              {{
-                "date": "YYYY-MM-DD", 
-                "summary": "...", 
-                "evidence": "...", 
-                "tags": ["technical", "evidence", "lora_candidate"]
-              }}
-            ]
-            """
-        elif file_type == "META":
-            prompt = f"""
-            [TASK] Expert Career Strategist. Analyze this high-level document and extract the core strategic anchor.
-            [EXCLUSION] EXCLUDE all behavioral feedback, coaching, or personal growth plans. Focus exclusively on technical milestones and strategic focal points.
-            [YEAR] {task['bucket']}
-            [CONTENT]
-            {scrubbed_content[:4000]}
-            
-            [OUTPUT]
-            Generate a JSON list containing ONE high-value entry.
-            Prefix the summary with [STRATEGIC_ANCHOR].
-# [FEAT-129] The Philosophical Core
-            The summary should capture the primary focal point, philosophical shift, or major career milestone.
-            
-            [FORMAT]
-            [
-              {{ 
-                "date": "{task['bucket']}-01-01", 
-                "summary": "[STRATEGIC_ANCHOR] ...", 
-                "evidence": "...", 
-                "sensitivity": "Public", 
-                "tags": ["strategy", "anchor"] 
-              }}
-            ]
-            """
-        else:
-            prompt = f"Extract technical events from this log: {scrubbed_content[:4000]}"
 
-        bucket_file = os.path.join(DATA_DIR, f"{task['bucket'].replace('-', '_')}.json")
-        existing_data = load_json(bucket_file)
-            
+        # Pipeline: lease and prepare the next task while the engine works on this one
+        if processed_this_run < limit or lookahead:
+            next_task = queue.lease()
+            if next_task is not None:
+                prefetch.start(next_task, blobs, task_engine(next_task, mode)[2])
+
+        ACTIVE_CANCEL = cancel = CancelToken()
+        response = None
         try:
-            if file_type == "META":
-                # Meta documents always use the strategic anchor prompt
-                response = ENGINE.generate(prompt)
-            elif REASONING_MODE and hasattr(ENGINE, 'generate_with_reasoning'):
-                response = ENGINE.generate_with_reasoning(scrubbed_content, task['bucket'])
-            else:
-                response = ENGINE.generate(prompt)
+            started = time.time()
+            with CancelWatcher(cancel, interactive_session):
+                if file_type == "META":
+                    # Meta documents always use the strategic anchor prompt
+                    response = engine.generate_json(prompt, schema=EVENT_LIST_SCHEMA, cancel=cancel)
+                elif reasoning and hasattr(engine, 'generate_with_reasoning'):
+                    response = engine.generate_with_reasoning(scrubbed_content, task['bucket'], cancel=cancel,
+                                                              history=job["history"])
+                else:
+                    response = engine.generate_json(prompt, schema=EVENT_LIST_SCHEMA, cancel=cancel)
+            # Throughput history for the queue's cost-aware scheduling and ETAs (cache hits say nothing about it)
+            if not getattr(engine, 'last_hit', False):
+                ENGINE_STATS.record(task_mode, task.get('tokens') or estimate_tokens(content), time.time() - started)
                 
             new_events = extract_json_from_llm(response)
+            # The clients return None when the backend is unreachable; only a real answer counts against the chunk
+            error = f"No valid events in response: {response[:120]!r}" if backend_answered(response) else None
+        except GenerationCancelled as e:
+            # Nothing was written for this task: drop the partial output and hand it back
+            log(f"   > Generation aborted ({e}). {task['id']} returned to the queue.")
+            update_status("YIELD", f"Nibbler aborted: {e}", filename=task['id'])
+            queue.release(task['id'])
+            prefetch.release(queue)
+            processed_this_run -= 1
+            break
         except Exception as e:
             log(f"   ! Engine Error: {e}")
             new_events = []
+            # Transport failures (requests/socket errors are OSErrors) say nothing about the chunk
+            error = None if isinstance(e, OSError) or not backend_answered(response) else f"Engine Error: {e}"
         
         if isinstance(new_events, list) and len(new_events) > 0:
-            final_events = existing_data
-            
             added_count = 0
             for event in new_events:
                 if not isinstance(event, dict): continue
@@ -365,12 +557,16 @@ def main():
                 if file_type == "META":
                     event['rank'] = 5
                 
-                # Filter events for the same date to check for semantic duplicates
-                same_date_events = [e for e in final_events if e.get('date') == clean_date]
+                bucket_file = bucket_path(event_bucket(task, clean_date))
+                final_events = store.get(bucket_file, [])
+
+                # Same-date summaries (indexed) to check for semantic duplicates
+                same_date_summaries = SUMMARY_INDEX.on_date(bucket_file, final_events, clean_date)
                 
-                if not is_semantic_duplicate(event.get('summary', ''), same_date_events):
+                if not is_near_duplicate((event.get('summary') or '').lower(), same_date_summaries):
                     if event.get("sensitivity") == "Public":
-                        final_events.append(event)
+                        store.append(bucket_file, [event], sort_by='date')
+                        SUMMARY_INDEX.add(bucket_file, event)
                         added_count += 1
                     else:
                         with open(AUDIT_FILE, "a") as f:
@@ -378,23 +574,82 @@ def main():
                 else:
                     log(f"   > Semantic Duplicate skipped: {event.get('summary')[:50]}...")
             
-            final_events.sort(key=lambda x: x.get('date', ''))
-            save_json(bucket_file, final_events)
-            update_status("ONLINE", f"Processed {task['bucket']}", added_count, filename=task['filename'], engine=engine_mode)
+            update_status("ONLINE", f"Processed {task['bucket']}", added_count, filename=task['filename'], engine=task_mode)
             
             # [FEAT-130] Atomic State Update: ONLY mark as done if data was captured
-            state[task['id']] = content_hash
-            save_json(STATE_FILE, state)
+            store.update(STATE_FILE, mark_done(state, members))
         else:
             log("   > No valid events found. State NOT updated.")
+            if error:
+                # [FEAT-429] Count the failure; repeat offenders back off, then go to quarantine.
+                # A cached answer cost no GPU time, and must not be replayed to the retry.
+                cache_hit = getattr(engine, 'last_hit', False)
+                tokens = 0 if cache_hit else task.get('tokens') or estimate_tokens(content)
+                store.update(STATE_FILE, record_failure(state, members, error, tokens))
+                if hasattr(engine, 'forget_last'):
+                    engine.forget_last()
+            else:
+                log("   > Backend gave no answer. Not counted against the chunk; scan_queue requeues it.")
 
-        save_json(QUEUE_FILE, queue)
+        # Journal before ack: a crash after this point loses nothing, before it the task is re-served
+        store.commit()
+        queue.ack(task['id'])
 
-        if not FAST_MODE:
-            log("Waiting 15s for silicon cooling...")
-            time.sleep(15)
+        if not fast:
+            waited, reason = PACER.pause()
+            log(f"Paced {waited:.1f}s for silicon cooling ({reason or 'under setpoints'}; ceiling {PACER.delay:.0f}s).")
         else:
             time.sleep(1) # Tiny yield to prevent CPU spinning
+    return processed_this_run
+
+def serve():
+    """
+    [--serve] Long-lived nibbler: engines, queue connection, blob store and state stay
+    warm, and mass_scan / force_feed hand it work over a Unix socket (nibbler_worker).
+    Request: {"cmd": "run", "flags": ["--auto"], "limit": 8}
+    """
+    log(f"--- Pinky Nibbler v2.1 Worker (pid {os.getpid()}) on {NIBBLER_SOCKET} ---")
+    queue = WorkQueue()
+    blobs = BlobStore()
+    store = WriteBehind()
+
+    def handle(request):
+        if request.get("cmd") != "run":
+            return {"ok": False, "error": f"unknown command {request.get('cmd')!r}"}
+        flags = request.get("flags", [])
+        queue.tokens_per_sec = ENGINE_STATS.tokens_per_sec() # Keep the scheduler's rate current
+        processed = nibble(queue, blobs, store, limit=request.get("limit") or 999,
+                           mode=engine_mode_for(flags), fast="--fast" in flags)
+        return {"ok": True, "processed": processed}
+
+    try:
+        serve_socket(handle)
+    finally:
+        store.flush()
+        queue.close()
+
+def main():
+    signal.signal(signal.SIGUSR1, handle_pause)
+    if "--serve" in sys.argv:
+        serve()
+        return
+
+    log(f"--- Pinky Nibbler v2.1 (Reasoning: {REASONING_MODE}) ---")
+    
+    # --- LIMIT FLAG ---
+    limit = 999
+    for arg in sys.argv:
+        if arg.startswith("--limit="):
+            limit = int(arg.split("=")[1])
+
+    queue = WorkQueue()
+    blobs = BlobStore()
+    store = WriteBehind()
+    try:
+        nibble(queue, blobs, store, limit)
+    finally:
+        store.flush()
+        queue.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,125 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from utils import DATA_DIR
+
+# Config
+NIBBLER_SOCKET = os.path.join(DATA_DIR, "nibbler.sock")
+STARTUP_TIMEOUT = 120 # Seconds to wait for a freshly spawned worker (torch/transformers imports)
+REQUEST_TIMEOUT = 1800 # Matches mass_scan.run_task subprocess timeout
+IDLE_TIMEOUT = 600 # A worker nobody talks to for this long exits and frees its engines
+
+def send(request, path=NIBBLER_SOCKET, timeout=REQUEST_TIMEOUT):
+    """
+    Sends one JSON request to the worker. Returns its reply, or None if no worker
+    answers. A worker that accepted the request but did not reply within timeout is
+    still busy with it (a long generation or pacing pause), which is reported as
+    {"ok": False, "timeout": True, ...} rather than None.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            with sock.makefile('rw') as stream:
+                stream.write(json.dumps(request) + "\n")
+                stream.flush()
+                try:
+                    line = stream.readline()
+                except socket.timeout:
+                    return {"ok": False, "timeout": True, "error": f"No reply within {timeout}s; worker still busy"}
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
+
+def worker_alive(path=NIBBLER_SOCKET):
+    """True if a worker is listening on path (it may be busy with another client's task)."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(5)
+            sock.connect(path)
+        return True
+    except OSError:
+        return False
+
+def worker_pid(path=NIBBLER_SOCKET):
+    """Pid of the worker on path, or None. Only answers promptly while the worker is idle."""
+    reply = send({"cmd": "ping"}, path, timeout=5)
+    return reply.get("pid") if reply else None
+
+def ensure_worker(script, env=None, cwd=None, path=NIBBLER_SOCKET, startup_timeout=STARTUP_TIMEOUT):
+    """Starts `script --serve` unless a worker already listens on path. Returns True once one does."""
+    if worker_alive(path):
+        return True
+    subprocess.Popen([sys.executable, script, "--serve"], env=env, cwd=cwd, start_new_session=True)
+    deadline = time.time() + startup_timeout
+    while time.time() < deadline:
+        time.sleep(0.5)
+        if worker_alive(path):
+            return True
+    return False
+
+def dispatch(script, flags, limit=1, env=None, cwd=None, path=NIBBLER_SOCKET):
+    """
+    Runs up to limit queue tasks on the warm worker (spawning it if needed).
+    Returns the worker's reply, or None if no worker could be reached. Callers fall
+    back to a one-shot nibbler on None, so a worker that is still alive never yields
+    None: that would put two jobs on the GPU.
+    """
+    if not ensure_worker(script, env=env, cwd=cwd, path=path):
+        return None
+    reply = send({"cmd": "run", "flags": list(flags), "limit": limit}, path)
+    if reply is None and worker_alive(path):
+        return {"ok": False, "error": "Worker is alive but gave no reply"}
+    return reply
+
+def serve(handler, path=NIBBLER_SOCKET, idle_timeout=IDLE_TIMEOUT):
+    """
+    Newline-delimited JSON request/reply loop on a Unix socket, one client at a time
+    (the GPU is serialized anyway). handler(request) returns the reply dict for work
+    requests; "ping" and "shutdown" are answered here, and shutdown or idle_timeout
+    seconds without a client ends the loop.
+    """
+    if os.path.exists(path):
+        if worker_alive(path):
+            print(f"[WORKER] Another worker is already serving {path}. Exiting.")
+            return
+        os.remove(path) # Stale socket from a worker that died
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)
+    server.listen(8)
+    server.settimeout(idle_timeout)
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                print(f"[WORKER] Idle for {idle_timeout}s. Exiting.")
+                return
+            conn.settimeout(None)
+            try:
+                with conn, conn.makefile('rw') as stream:
+                    for line in stream:
+                        try:
+                            request = json.loads(line)
+                            if request.get("cmd") in ("ping", "shutdown"):
+                                reply = {"ok": True, "pid": os.getpid()}
+                            else:
+                                reply = handler(request)
+                        except Exception as e:
+                            request, reply = {}, {"ok": False, "error": str(e)}
+                        stream.write(json.dumps(reply) + "\n")
+                        stream.flush()
+                        if request.get("cmd") == "shutdown":
+                            return
+            except OSError as e:
+                print(f"[WORKER] Client went away: {e}")
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,77 @@
+import time
+
+from utils import get_gpu_telemetry, get_system_load
+
+# Config
+TARGET_GPU_TEMP_C = 72 # Setpoint: background work keeps the card at or below this
+MAX_GPU_TEMP_C = 83 # Hard ceiling: never start another task above this, however long it takes
+BUSY_GPU_UTIL = 40 # Utilization between our tasks means someone else is on the GPU
+TARGET_LOAD = 2.0 # Matches nibble_v2.should_yield's load ceiling
+MIN_DELAY = 1.0
+MAX_DELAY = 900.0 # The old FEAT-428 tier 3 cooldown
+START_DELAY = 15.0 # The old fixed "silicon cooling" sleep
+BACKOFF_FACTOR = 2.0 # Multiplicative increase while over a setpoint...
+BACKOFF_FLOOR = 15.0 # ...starting from at least this
+RECOVERY_STEP = 5.0 # Additive decrease per clear observation
+POLL_SECONDS = 5.0 # pause() re-reads telemetry this often
+
+class Pacer:
+    """
+    AIMD pacing between background tasks. Each observation compares live GPU
+    temperature and utilization and the load average with their setpoints: over any
+    of them the delay backs off multiplicatively, under all of them it recovers
+    additively. The delay is only a ceiling on the wait; pause() returns as soon as
+    the readings are back under the setpoints, so a cool, idle machine runs tasks
+    back to back. Reasons the pacer cannot sense (lock, non-IDLE mode) wait it out.
+    """
+    def __init__(self, target_load=TARGET_LOAD, read_gpu=get_gpu_telemetry, read_load=get_system_load,
+                 sleep=time.sleep, clock=time.time):
+        self.target_load = target_load
+        self.read_gpu = read_gpu
+        self.read_load = read_load
+        self.sleep = sleep
+        self.clock = clock
+        self.delay = START_DELAY
+        self.temp = None
+
+    def sample(self):
+        """Why we are over a setpoint right now, or None."""
+        gpu = self.read_gpu()
+        self.temp = gpu[0] if gpu else None
+        if gpu and gpu[0] > TARGET_GPU_TEMP_C:
+            return f"GPU {gpu[0]:.0f}C > {TARGET_GPU_TEMP_C}C"
+        if gpu and gpu[1] > BUSY_GPU_UTIL:
+            return f"GPU busy ({gpu[1]:.0f}%)"
+        load = self.read_load()
+        if load > self.target_load:
+            return f"Load {load:.2f} > {self.target_load}"
+        return None
+
+    def observe(self, reason=None):
+        """Folds one observation (or an external reason) into the delay. Returns the reason."""
+        reason = reason or self.sample()
+        if reason:
+            self.delay = min(MAX_DELAY, max(self.delay, BACKOFF_FLOOR) * BACKOFF_FACTOR)
+        else:
+            self.delay = max(MIN_DELAY, self.delay - RECOVERY_STEP)
+        return reason
+
+    def pause(self, reason=None):
+        """
+        Observes, then waits: the full delay for an external reason, otherwise until the
+        readings clear (past the delay only while above MAX_GPU_TEMP_C). Returns
+        (seconds waited, reason or None).
+        """
+        start = self.clock()
+        if reason:
+            self.observe(reason)
+            self.sleep(self.delay)
+            return self.clock() - start, reason
+        reason = self.observe()
+        self.sleep(MIN_DELAY)
+        deadline = start + self.delay
+        current = reason
+        while current and (self.clock() < deadline or (self.temp or 0) >= MAX_GPU_TEMP_C):
+            self.sleep(POLL_SECONDS)
+            current = self.sample()
+        return self.clock() - start, reason
@@ -1,8 +1,9 @@
 import json
 import os
-import re
 import glob
 
+from rule_engine import RuleSet
+
 # Audit on the backup
 TARGET_DIR = "Portfolio_Dev/field_notes/data_contaminated_backup"
 REPORT_FILE = "Portfolio_Dev/field_notes/data/privacy_audit.json"
@@ -17,6 +18,7 @@ FORBIDDEN_PATTERNS = [
     r"Results Coaching",
     r"Behaviors Coaching"
 ]
+FORBIDDEN_RULES = RuleSet(FORBIDDEN_PATTERNS)
 
 def audit():
     print(f"--- Privacy Audit: Analyzing {TARGET_DIR} ---")
@@ -39,18 +41,20 @@ def audit():
             summary = entry.get('summary', '')
             text_to_check = f"{summary} {evidence}"
             
-            for pattern in FORBIDDEN_PATTERNS:
-                if re.search(pattern, text_to_check, re.IGNORECASE):
-                    report.append({
-                        "file": os.path.basename(fpath),
-                        "pattern": pattern,
-                        "entry": entry
-                    })
-                    break
+            # One fused pass per entry; the first listed pattern that hits is reported
+            pattern = FORBIDDEN_RULES.match(text_to_check)
+            if pattern:
+                report.append({
+                    "file": os.path.basename(fpath),
+                    "pattern": pattern,
+                    "entry": entry
+                })
                     
     with open(REPORT_FILE, 'w') as f:
         json.dump(report, f, indent=2)
     print(f"Audit complete. Found {len(report)} contaminated entries. Saved to {REPORT_FILE}")
+    for pattern, hits in FORBIDDEN_RULES.hits.most_common():
+        print(f"   {hits:5d}  {pattern}")
 
 if __name__ == "__main__":
     audit()
@@ -0,0 +1,91 @@
+import json
+import os
+import sys
+import time
+
+from utils import DATA_DIR
+
+# Config
+STATE_FILE = os.path.join(DATA_DIR, "chunk_state.json")
+MAX_ATTEMPTS = 3 # Failed nibbles of the same content before it is quarantined
+BACKOFF_SECONDS = 6 * 3600 # Wait before the first retry; doubles with every failure
+MAX_BACKOFF_SECONDS = 7 * 86400
+
+def failures_key(chunk_id):
+    return f"{chunk_id}::failures"
+
+def unit_hash(member):
+    """Content hash a failure is charged to: the sub-chunk for split buckets, else the bucket."""
+    return member.get('part') or member['hash']
+
+def is_held(state, chunk_id, content_hash, now=None):
+    """[FEAT-429] True while this content of chunk_id is quarantined or backing off after a failure."""
+    record = state.get(failures_key(chunk_id), {}).get(content_hash)
+    if not record:
+        return False
+    return record.get("quarantined", False) or (now or time.time()) < record.get("retry_after", 0)
+
+def backend_answered(response):
+    """True for a real model reply. Engines return None (or "") when the backend is down or times out."""
+    return isinstance(response, str) and bool(response.strip())
+
+def record_failure(state, members, error, tokens=0, now=None):
+    """
+    [FEAT-429] chunk_state updates for a task that captured nothing. Each member's
+    attempts, wasted tokens (the task's estimate, split across members) and last error
+    are recorded under chunk_id::failures keyed by content hash, so an edit starts
+    over. Retries back off exponentially; MAX_ATTEMPTS failures quarantine the content.
+    """
+    now = now or time.time()
+    share = round(tokens / max(1, len(members)))
+    updates = {}
+    for member in members:
+        key = failures_key(member['id'])
+        records = dict(updates.get(key, state.get(key, {})))
+        record = dict(records.get(unit_hash(member), {"attempts": 0, "tokens": 0}))
+        record["attempts"] += 1
+        record["tokens"] += share
+        record["last_error"] = str(error)[:300]
+        record["last_attempt"] = now
+        record["retry_after"] = now + min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2 ** (record["attempts"] - 1))
+        if record["attempts"] >= MAX_ATTEMPTS:
+            record["quarantined"] = True
+        records[unit_hash(member)] = record
+        updates[key] = records
+    return updates
+
+def quarantined(state):
+    """(chunk_id, content_hash or None, record) for every quarantined chunk; None marks a manual ::status flag."""
+    rows = []
+    for key, value in state.items():
+        if key.endswith("::status") and value == "QUARANTINED":
+            rows.append((key[:-len("::status")], None, {}))
+        elif key.endswith("::failures") and isinstance(value, dict):
+            rows.extend((key[:-len("::failures")], h, r) for h, r in value.items() if r.get("quarantined"))
+    return sorted(rows, key=lambda row: -row[2].get("tokens", 0))
+
+def report(state):
+    """Prints quarantined chunks with their wasted token cost, worst first."""
+    rows = quarantined(state)
+    print(f"--- Quarantine Report: {len(rows)} chunk(s) ---")
+    for chunk_id, content_hash, record in rows:
+        if content_hash is None:
+            print(f"  {chunk_id}  [manual ::status]")
+            continue
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(record.get("last_attempt", 0)))
+        print(f"  {chunk_id}  {content_hash[:8]}  attempts={record['attempts']}  "
+              f"tokens~{record['tokens']}  last={when}")
+        print(f"      {record.get('last_error', '')[:120]}")
+    print(f"Wasted: ~{sum(r.get('tokens', 0) for _, _, r in rows)} prompt tokens.")
+    return rows
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else STATE_FILE
+    if not os.path.exists(path):
+        print(f"Error: {path} not found.")
+        return
+    with open(path, 'r') as f:
+        report(json.load(f))
+
+if __name__ == "__main__":
+    main()
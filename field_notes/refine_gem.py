@@ -253,7 +253,7 @@ def main():
     """
     
     try:
-        response = engine.generate(refine_prompt)
+        response = engine.generate_json(refine_prompt)
         # Extract JSON
         import re
         match = re.search(r'\{.*\}', response, re.DOTALL)
@@ -0,0 +1,88 @@
+import re
+from collections import Counter
+
+def _fold_pattern(pattern):
+    """Lower-cases a pattern's literals, leaving escapes (\\b, \\S, ...) alone."""
+    out, escaped = [], False
+    for ch in pattern:
+        out.append(ch if escaped else ch.lower())
+        escaped = not escaped and ch == "\\"
+    return "".join(out)
+
+class RuleSet:
+    """
+    Compiled multi-pattern matcher shared by the ingest guillotine and the privacy audit.
+    The rules (a {rule_id: pattern} mapping, or a list of patterns that are their own
+    ids) are fused into one alternation, so clean text costs a single regex pass however
+    many rules there are; only hits are resolved to a rule, in rule order. hits counts
+    matches per rule id for the life of the RuleSet.
+
+    re.IGNORECASE defeats the regex engine's literal prefix search, so case-insensitive
+    sets run the fused pattern case-sensitively over a lower-cased copy of ASCII str
+    (where lower-casing is exact and keeps offsets) and confirm hits on the original
+    text. bytes and mmap buffers are searched in place with the case-insensitive
+    pattern: copying a mapped file to lower-case it would defeat the mmap.
+    """
+    def __init__(self, rules, flags=re.IGNORECASE):
+        if not isinstance(rules, dict):
+            rules = {pattern: pattern for pattern in rules}
+        self.ids = list(rules)
+        self.patterns = list(rules.values())
+        self.flags = flags
+        self.hits = Counter()
+        self._compiled = {}
+
+    def _compile(self, kind):
+        """(fused alternation, folded fused alternation or None, per-rule regexes), built on first use."""
+        if kind not in self._compiled:
+            encode = (lambda p: p) if kind is str else (lambda p: p.encode('utf-8'))
+            fuse = lambda patterns: encode("|".join(f"(?:{p})" for p in patterns))
+            fused = re.compile(fuse(self.patterns), self.flags)
+            folded = None
+            if self.flags & re.IGNORECASE:
+                folded = re.compile(fuse(map(_fold_pattern, self.patterns)), self.flags & ~re.IGNORECASE)
+            self._compiled[kind] = (fused, folded, [re.compile(encode(p), self.flags) for p in self.patterns])
+        return self._compiled[kind]
+
+    def _haystack(self, buf, kind):
+        """(regex, text to search) for the fused pass; offsets in the text match buf's."""
+        fused, folded, _ = self._compile(kind)
+        if folded is None or kind is bytes or not buf.isascii():
+            return fused, buf
+        return folded, buf.lower()
+
+    def match(self, text):
+        """Id of the first rule (in rule order) that matches text, or None. Counts the hit."""
+        kind = str if isinstance(text, str) else bytes
+        regex, haystack = self._haystack(text, kind)
+        if not regex.search(haystack):
+            return None
+        singles = self._compile(kind)[2]
+        for rule_id, regex in zip(self.ids, singles):
+            if regex.search(text):
+                self.hits[rule_id] += 1
+                return rule_id
+        return None
+
+    def scan(self, buf):
+        """
+        Yields (rule_id, line_start, line_end) for every line of buf that matches, in
+        order. buf may be str, bytes or an mmap; the fused pattern runs over the whole
+        buffer, so lines without a hit are never visited from Python.
+        """
+        kind = str if isinstance(buf, str) else bytes
+        regex, haystack = self._haystack(buf, kind)
+        newline = "\n" if kind is str else b"\n"
+        pos, size = 0, len(buf)
+        while pos <= size:
+            found = regex.search(haystack, pos)
+            if not found:
+                return
+            start = haystack.rfind(newline, 0, found.start()) + 1
+            end = haystack.find(newline, found.start())
+            end = size if end < 0 else end
+            # Re-checking the line alone resolves the rule and drops matches that ran past it
+            rule_id = self.match(buf[start:end])
+            if rule_id is not None:
+                yield rule_id, start, end
+            pos = end + 1
@@ -1,14 +1,13 @@
 import os
 import json
-import glob
 import sys
-import hashlib
 import re
 
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from ai_engine_v2 import get_engine_v2
 from utils import update_status, DATA_DIR, RAW_NOTES_DIR
+from corpus_walk import read_corpus_walk, walk_corpus, dir_files
 
 REASONING_MODE = "--reasoning" in sys.argv
 # [FEAT-157] Hybrid Contextual Unification
@@ -136,7 +135,8 @@ def heuristic_synopsis(filename):
     }
     return mapping.get(ext, "")
 
-def scan_sector(year, curated_only=False):
+def scan_sector(year, curated_only=False, walk=None):
+    """walk: optional shared corpus walk (mass_scan epoch snapshot); otherwise the sector is listed directly."""
     print(f"--- Artifact Scanner v2.0: {year} (Reasoning: {REASONING_MODE}) ---")
     if year.lower() in ["root", "docs"]:
         year_dir = RAW_DIR
@@ -160,13 +160,14 @@ def scan_sector(year, curated_only=False):
     files_to_process = []
     IGNORE_TOKENS = ["resume", "review", "cover letter", "insights", "notes_", ".venv", ".git", "cheat sheet"]
     
-    for root, dirs, files in os.walk(year_dir):
-        if root != year_dir and not curated_only: continue 
-        for name in files:
-            if curated_only and name not in CURATED_MAP: continue
-            if year.lower() in ["root", "docs"] and root == year_dir:
-                if any(t in name.lower() for t in IGNORE_TOKENS): continue
-            files_to_process.append(os.path.join(root, name))
+    if walk is None:
+        walk = walk_corpus(year_dir, recursive=curated_only)
+    for path in dir_files(walk, year_dir, recursive=curated_only):
+        name = os.path.basename(path)
+        if curated_only and name not in CURATED_MAP: continue
+        if year.lower() in ["root", "docs"] and os.path.dirname(path) == year_dir:
+            if any(t in name.lower() for t in IGNORE_TOKENS): continue
+        files_to_process.append(path)
 
     for filepath in sorted(files_to_process):
         filename = os.path.basename(filepath)
@@ -218,7 +219,7 @@ def scan_sector(year, curated_only=False):
                         "keywords": []
                     }}
                     """
-                    response = ENGINE.generate(prompt)
+                    response = ENGINE.generate_json(prompt)
                     data = extract_json(response)
             except Exception: pass
         
@@ -267,7 +268,7 @@ if __name__ == "__main__":
         if targets:
             target = targets[0]
             curated = "--curated" in sys.argv
-            scan_sector(target, curated_only=curated)
+            scan_sector(target, curated_only=curated, walk=read_corpus_walk(sys.argv, RAW_DIR))
         else:
             print("Usage: python3 scan_artifacts.py <year|docs|root> [--curated] [--reasoning]")
 
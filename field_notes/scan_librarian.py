@@ -1,27 +1,86 @@
 # [FEAT-100] Librarian Heuristic File Classification
+import asyncio
 import json
 import os
 import sys
-import glob
 import re
 import time
-import threading
-import requests
 
 # Add current directory to path
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(BASE_DIR)
 from ai_engine import get_engine  # noqa: E402
-from utils import update_status, can_burn, RAW_NOTES_DIR, DATA_DIR, atomic_write_json  # noqa: E402
+from utils import update_status, can_burn, DATA_DIR, atomic_write_json  # noqa: E402
+from docx_cache import extract_docx_text  # noqa: E402
+from corpus_walk import load_corpus_walk, note_files  # noqa: E402
 
 # Config
-# Expanded glob to catch Insights, Philosophy, and Reviews using Absolute Paths from utils
-NOTES_GLOB = os.path.join(RAW_NOTES_DIR, "**/*.txt")
-DOCX_GLOB = os.path.join(RAW_NOTES_DIR, "**/*.docx")
-RAS_GLOB = os.path.join(RAW_NOTES_DIR, "**/ras-*.txt")
+# Candidate files (Insights, Philosophy, Reviews, notes, ras-*) come from the shared corpus walk
 MANIFEST_FILE = os.path.join(DATA_DIR, "file_manifest.json")
 ENGINE = get_engine(mode="LOCAL")
 OLLAMA_TIMEOUT = 30  # Strict 30s cap: batch indexing must never hang indefinitely
+# In-flight classifications per batch; match the backend's parallel slots (Ollama: OLLAMA_NUM_PARALLEL)
+CLASSIFY_CONCURRENCY = max(1, int(os.environ.get("LIBRARIAN_CONCURRENCY", os.environ.get("OLLAMA_NUM_PARALLEL", 4))))
+
+SAMPLE_ANCHOR_SCAN = 500   # Lines searched for the journal anchor
+SAMPLE_HEADER_LINES = 100  # Lines kept from the anchor (or skipped as head noise)
+SAMPLE_MIDDLE_LINES = 50   # Lines kept from the middle of the file
+
+def format_sample(head_lines, middle_lines):
+    """Builds the anchor-relative header + middle sample from pre-split lines."""
+    # Hunt for the Journal Anchor [ctrl-F10 s] or ASCII dividers
+    start_idx = 0
+    for i, line in enumerate(head_lines[:SAMPLE_ANCHOR_SCAN]): # Scan first 500 lines
+        if "[ctrl-F10 s]" in line or "======" in line or "------" in line:
+            start_idx = i
+            break
+    
+    # If no anchor found, skip the first 100 lines of head noise
+    if start_idx == 0:
+        start_idx = SAMPLE_HEADER_LINES
+
+    header = "\n".join(head_lines[start_idx : start_idx + SAMPLE_HEADER_LINES])
+    middle = "\n".join(middle_lines)
+    return f"[STARTING AT LINE {start_idx}]\n{header}\n\n[...]\n\n{middle}"
+
+def sample_text(text):
+    """In-memory sampler (DOCX text, or files that fit inside the head window)."""
+    lines = text.splitlines()
+    if len(lines) < SAMPLE_HEADER_LINES:
+        return text
+    mid = len(lines) // 2
+    return format_sample(lines, lines[mid : mid + SAMPLE_MIDDLE_LINES])
+
+def sample_file(path):
+    """
+    Seek-based sampler: reads at most the first 600 lines plus 50 lines from the
+    byte midpoint, so multi-hundred-MB journals cost O(sample) instead of O(file).
+    """
+    head_window = SAMPLE_ANCHOR_SCAN + SAMPLE_HEADER_LINES
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        head = []
+        while len(head) < head_window:
+            raw = f.readline()
+            if not raw:
+                break
+            head.append(raw)
+        if f.tell() >= size:
+            # Whole file is inside the head window: identical to the in-memory path
+            return sample_text(b"".join(head).decode('utf-8', errors='ignore'))
+
+        f.seek(size // 2)
+        f.readline() # Discard the partial line at the midpoint
+        middle = []
+        while len(middle) < SAMPLE_MIDDLE_LINES:
+            raw = f.readline()
+            if not raw:
+                break
+            middle.append(raw)
+
+    def _decode(raw_lines):
+        return [r.decode('utf-8', errors='ignore').rstrip('\r\n') for r in raw_lines]
+    return format_sample(_decode(head), _decode(middle))
 
 def read_sample(path):
     """
@@ -30,30 +89,8 @@ def read_sample(path):
     """
     try:
         if path.endswith('.docx'):
-            import docx2txt
-            text = docx2txt.process(path)
-        else:
-            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                text = f.read()
-        
-        lines = text.splitlines()
-        if len(lines) < 100:
-            return text
-        
-        # Hunt for the Journal Anchor [ctrl-F10 s] or ASCII dividers
-        start_idx = 0
-        for i, line in enumerate(lines[:500]): # Scan first 500 lines
-            if "[ctrl-F10 s]" in line or "======" in line or "------" in line:
-                start_idx = i
-                break
-        
-        # If no anchor found, skip the first 100 lines of head noise
-        if start_idx == 0:
-            start_idx = 100
-
-        header = "\n".join(lines[start_idx : start_idx + 100])
-        middle = "\n".join(lines[len(lines)//2 : len(lines)//2 + 50])
-        return f"[STARTING AT LINE {start_idx}]\n{header}\n\n[...]\n\n{middle}"
+            return sample_text(extract_docx_text(path))
+        return sample_file(path)
     except Exception as e:
         print(f"Error reading {path}: {e}")
         return ""
@@ -70,11 +107,11 @@ def extract_json(text):
     except Exception:
         return {}
 
-def classify_file(filename, text_sample):
+def classify_prompt(filename, text_sample):
     """
-    Calls the AI Engine to classify the file.
+    Librarian classification prompt for one file sample.
     """
-    prompt = f"""
+    return f"""
     [TASK]
     Act as a digital librarian. Analyze this file sample (Header + Middle) and classify it.
     
@@ -101,29 +138,34 @@ def classify_file(filename, text_sample):
       "priority": "HIGH|NORMAL"
     }}
     """
-    
-    print(f"   > Librarian analyzing {filename}...")
-    try:
-        # Daemon-thread wall-clock guard: ENGINE.generate has no timeout param and
-        # ai_engine swallows exceptions, so cap the call at OLLAMA_TIMEOUT here.
-        # (NOT ThreadPoolExecutor: its atexit handler joins non-daemon workers and
-        # would block interpreter exit on a hung request.)
-        result = {}
-        def _generate():
-            result["response"] = ENGINE.generate(prompt)
-        worker = threading.Thread(target=_generate, daemon=True)
-        worker.start()
-        worker.join(timeout=OLLAMA_TIMEOUT)
-        if worker.is_alive():
+
+def classify_file(filename, text_sample):
+    """
+    Calls the AI Engine to classify the file.
+    """
+    return classify_batch([(filename, text_sample)])[0]
+
+def classify_batch(items):
+    """
+    Classifies [(filename, text_sample), ...] through ENGINE.agenerate_many, keeping
+    CLASSIFY_CONCURRENCY calls in flight. A call past OLLAMA_TIMEOUT is aborted (its
+    connection dropped, so Ollama stops too) and comes back UNKNOWN.
+    """
+    for filename, _ in items:
+        print(f"   > Librarian analyzing {filename}...")
+    calls = [classify_prompt(filename, text_sample) for filename, text_sample in items]
+    responses = asyncio.run(ENGINE.agenerate_many(calls, CLASSIFY_CONCURRENCY, OLLAMA_TIMEOUT, structured=True))
+    results = []
+    for (filename, _), response in zip(items, responses):
+        if isinstance(response, TimeoutError):
             print(f"   > WARNING: Ollama classification timed out after {OLLAMA_TIMEOUT}s for {filename}. Skipping.")
-            return {"type": "UNKNOWN", "note": "timeout"}
-        return extract_json(result.get("response"))
-    except requests.exceptions.Timeout:
-        print(f"   > WARNING: Ollama classification timed out after {OLLAMA_TIMEOUT}s for {filename}. Skipping.")
-        return {"type": "UNKNOWN", "note": "timeout"}
-    except Exception as e:
-        print(f"Error classifying {filename}: {e}")
-        return {"type": "UNKNOWN", "note": str(e)}
+            results.append({"type": "UNKNOWN", "note": "timeout"})
+        elif isinstance(response, Exception):
+            print(f"Error classifying {filename}: {response}")
+            results.append({"type": "UNKNOWN", "note": str(response)})
+        else:
+            results.append(extract_json(response))
+    return results
 
 def main():
     print("--- Pinky Librarian v1.4 (Archaeology Aware) ---")
@@ -134,11 +176,8 @@ def main():
     else:
         manifest = {}
 
-    files = sorted(
-        glob.glob(NOTES_GLOB, recursive=True) + 
-        glob.glob(RAS_GLOB, recursive=True) +
-        glob.glob(DOCX_GLOB, recursive=True)
-    )
+    # Shared epoch walk from mass_scan (--walk=PATH), or a direct scandir pass
+    files = note_files(load_corpus_walk(sys.argv))
     
 # [FEAT-239] Neural Action Tags
     # [VIBE-007] Archaeology Hints & Manual Overrides
@@ -162,6 +201,8 @@ def main():
     # [FEAT-175] BKM Sentinel Keywords
     BKM_KEYWORDS = ["root cause", "silicon failure", "validation bkm", "post-mortem", "rca", "debug", "regression"]
 
+    pending = []
+    pending_names = set()
     for filepath in files:
         filename = os.path.basename(filepath)
 
@@ -169,56 +210,73 @@ def main():
         if filename in manifest and filename not in OVERRIDES:
             continue
 
-        # --- POLITENESS CHECK ---
-        while True:
-            ready, reason = can_burn()
-            if ready:
-                break
-            update_status("YIELD", f"Librarian Yielding: {reason}", filename=filename)
-            time.sleep(10)
-        
         # 1. Check Overrides (Explicit Truth)
         if filename in OVERRIDES:
             print(f"   --> {filename}: {OVERRIDES[filename]['type']} (Manual Override)")
             manifest[filename] = OVERRIDES[filename]
             continue
 
-        # 2. Check Team Anchors (Heuristic Hint)
-        found_tag = next((tag for tag in TEAM_TAGS if tag in filename), None)
-        
-        # [FEAT-175] BKM Sentinel Pre-Scan
-        is_bkm_suspect = any(k in filename.lower() for k in BKM_KEYWORDS)
-        
-        text_sample = read_sample(filepath)
-        if not text_sample:
-            continue
+        if filename not in pending_names:
+            pending_names.add(filename)
+            pending.append(filepath)
+
+    for start in range(0, len(pending), CLASSIFY_CONCURRENCY):
+        batch = pending[start:start + CLASSIFY_CONCURRENCY]
+
+        # --- POLITENESS CHECK --- (once per batch)
+        while True:
+            ready, reason = can_burn()
+            if ready:
+                break
+            update_status("YIELD", f"Librarian Yielding: {reason}", filename=os.path.basename(batch[0]))
+            time.sleep(10)
+
+        jobs = []
+        for filepath in batch:
+            filename = os.path.basename(filepath)
+
+            # 2. Check Team Anchors (Heuristic Hint)
+            found_tag = next((tag for tag in TEAM_TAGS if tag in filename), None)
             
-        if not is_bkm_suspect:
-            is_bkm_suspect = any(k in text_sample.lower() for k in BKM_KEYWORDS)
+            # [FEAT-175] BKM Sentinel Pre-Scan
+            is_bkm_suspect = any(k in filename.lower() for k in BKM_KEYWORDS)
+            
+            text_sample = read_sample(filepath)
+            if not text_sample:
+                continue
+                
+            if not is_bkm_suspect:
+                is_bkm_suspect = any(k in text_sample.lower() for k in BKM_KEYWORDS)
 
-        info = classify_file(filename, text_sample)
-        
-        # Apply team tag context if found
-        if found_tag:
-            info["year"] = info.get("year") or TEAM_TAGS[found_tag]
-            info["tags"] = list(set(info.get("tags", []) + [found_tag]))
-
-        # [FEAT-175] Priority Gating
-        if is_bkm_suspect:
-            info["priority"] = "HIGH"
-            if info.get("type") == "LOG":
-                info["type"] = "SCAR" # Upgrade to SCAR if keywords match
-        
-        # Fallback if AI fails
-        if not info or "type" not in info:
-            if "notes_" in filename and any(char.isdigit() for char in filename):
-                 info = {"type": "LOG", "year": filename[6:10], "note": "Fallback heuristic"}
-            else:
-                 info = {"type": "UNKNOWN", "manual_review": True}
+            jobs.append((filename, text_sample, found_tag, is_bkm_suspect))
+
+        results = classify_batch([(filename, text_sample) for filename, text_sample, _, _ in jobs])
+
+        for (filename, _, found_tag, is_bkm_suspect), info in zip(jobs, results):
+            # Apply team tag context if found
+            if found_tag:
+                info["year"] = info.get("year") or TEAM_TAGS[found_tag]
+                info["tags"] = list(set(info.get("tags", []) + [found_tag]))
+
+            # [FEAT-175] Priority Gating
+            if is_bkm_suspect:
+                info["priority"] = "HIGH"
+                if info.get("type") == "LOG":
+                    info["type"] = "SCAR" # Upgrade to SCAR if keywords match
             
-        manifest[filename] = info
-        print(f"   --> {filename}: {info.get('type')} ({info.get('year') or info.get('topic')}) [Priority: {info.get('priority', 'NORMAL')}]")
-        update_status("ONLINE", f"Classifying file: {filename}", filename=filename)
+            # Fallback if AI fails
+            if not info or "type" not in info:
+                if "notes_" in filename and any(char.isdigit() for char in filename):
+                     info = {"type": "LOG", "year": filename[6:10], "note": "Fallback heuristic"}
+                else:
+                     info = {"type": "UNKNOWN", "manual_review": True}
+                
+            manifest[filename] = info
+            print(f"   --> {filename}: {info.get('type')} ({info.get('year') or info.get('topic')}) [Priority: {info.get('priority', 'NORMAL')}]")
+            update_status("ONLINE", f"Classifying file: {filename}", filename=filename)
+
+        # Incremental checkpoint: a crash only loses the in-flight batch
+        atomic_write_json(MANIFEST_FILE, manifest)
 
     # Save Manifest (Atomic)
     atomic_write_json(MANIFEST_FILE, manifest)
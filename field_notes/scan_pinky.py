@@ -3,17 +3,19 @@ import json
 import os
 import glob
 import re
-import hashlib
 import sys
 import random
 
 # Add current directory to path to allow sibling import
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from ai_engine import get_engine
+from ai_engine import get_engine, EVENT_LIST_SCHEMA
+from file_inventory import FileInventory
+from date_chunker import iter_date_spans, date_label, spans_text
 
 # Configuration
 ENGINE = get_engine(mode="LOCAL")
+INVENTORY = FileInventory()
 
 # Inputs
 RESUME_PATH = "raw_notes/Jason Allred Resume - Jan 2026.txt"
@@ -47,8 +49,8 @@ def read_file(path):
         return ""
 
 def get_file_hash(path):
-    content = read_file(path)
-    return hashlib.md5(content.encode('utf-8')).hexdigest()
+    """md5 of the file text, served from the stat-keyed inventory when the file is unchanged."""
+    return INVENTORY.file_hash(path, read_file)
 
 def parse_gap_notes(text):
     """Loose chunking for files without strict timestamp structure."""
@@ -92,28 +94,15 @@ def parse_notes_into_chunks(text, filename=""):
         return parse_gap_notes(text)
 
     # Standard Strict Logic (Start of line date)
-    date_pattern = r'^(\d{1,2}/\d{1,2}/\d{2,4})'
-    chunks = []
-    current_date = "Header/Unknown"
-    current_content = []
-    
-    lines = text.splitlines()
-    for line in lines:
-        match = re.match(date_pattern, line.strip())
-        if match:
-            if current_content:
-                chunks.append({"date": current_date, "content": "\n".join(current_content)})
-            current_date = match.group(1)
-            current_content = [line]
-        else:
-            current_content.append(line)
-    if current_content:
-        chunks.append({"date": current_date, "content": "\n".join(current_content)})
-    return chunks
+    buf = text.encode('utf-8')
+    return [
+        {"date": date, "content": spans_text(buf, [(start, end)])}
+        for date, start, end in iter_date_spans(buf, "Header/Unknown", bucket_of=date_label)
+    ]
 
 def ask_pinky(prompt, label=""):
     print(f"   > Pinky is thinking ({label})...")
-    return ENGINE.generate(prompt)
+    return ENGINE.generate_json(prompt, schema=EVENT_LIST_SCHEMA)
 
 def extract_json(text):
     match = re.search(r'\[.*\]', text, re.DOTALL)
@@ -380,6 +369,8 @@ def main():
         with open(STATE_FILE, 'w') as f:
             json.dump(state, f, indent=2)
 
+    INVENTORY.save()
+
     print(f"\n--- SCAN COMPLETE (Processed {batches_processed_total} batches) ---")
 
 if __name__ == "__main__":
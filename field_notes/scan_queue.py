@@ -1,22 +1,21 @@
 import os
-import glob
-import re
+import contextlib
 import json
-import hashlib
 import sys
 import psutil
-import time
 
-from utils import RAW_NOTES_DIR, DATA_DIR
+from utils import DATA_DIR
+from work_queue import WorkQueue
+from blob_store import BlobStore
+from file_inventory import FileInventory
+from docx_cache import extract_docx_text, get_docx_cache
+from corpus_walk import load_corpus_walk, note_files, entry_stat
+from date_chunker import open_buffer, iter_date_spans, group_spans, spans_hash, spans_text, buffer_hash
+from chunk_planner import CHUNK_TOKEN_BUDGET, split_spans, spans_tokens, pack_pieces
+from quarantine import is_held
 from infra.status_model import StatusModel
 
 # Config
-# Absolute GLOB paths using utils single-source-of-truth
-NOTES_GLOB = os.path.join(RAW_NOTES_DIR, "**/*.txt")
-DOCX_GLOB = os.path.join(RAW_NOTES_DIR, "**/*.docx")
-RAS_GLOB = os.path.join(RAW_NOTES_DIR, "**/ras-*.txt")
-
-QUEUE_FILE = os.path.join(DATA_DIR, "queue.json")
 STATE_FILE = os.path.join(DATA_DIR, "chunk_state.json")
 MANIFEST_FILE = os.path.join(DATA_DIR, "file_manifest.json")
 
@@ -45,65 +44,124 @@ def should_yield() -> bool:
 def ensure_dirs():
     os.makedirs(DATA_DIR, exist_ok=True)
 
-def read_file(path):
-    try:
-        if path.endswith('.docx'):
-            import docx2txt
-            return docx2txt.process(path)
-        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-            return f.read()
-    except Exception as e:
-        print(f"Error reading {path}: {e}")
-        return ""
-
-def get_hash(text):
-    return hashlib.md5(text.encode('utf-8')).hexdigest()
+@contextlib.contextmanager
+def open_chunk_buffer(path):
+    """mmap of a text note; the cached (UTF-8 encoded) extraction for .docx."""
+    if path.endswith('.docx'):
+        yield extract_docx_text(path).encode('utf-8')
+    else:
+        with open_buffer(path) as buf:
+            yield buf
 
-def parse_chunks(text, filename, file_type="LOG", fallback_year=None):
+def bucket_spans(buf, file_type="LOG", fallback_year=None):
     """
-    Parses text into Month or Year buckets. 
-    Returns dict: {'YYYY-MM': 'content...'} or {'YYYY': 'content...'}
+    Splits a raw-notes buffer into Month or Year buckets.
+    Returns dict: {'YYYY-MM': [(start, end), ...]} or {'YYYY': [(0, len)]}
     """
     if file_type == "META":
         # Meta documents are processed as a single chunk for the year
         year = fallback_year or "Unknown"
-        return {str(year): text}
+        return {str(year): [(0, len(buf))]}
 
-    date_pattern = r'^(\d{1,2})/(\d{1,2})/(\d{2,4})'
-    chunks = {}
-    
     # [VIBE-007] Use manifest year as absolute fallback for archeology
-    current_bucket = fallback_year or "Unknown"
-    current_lines = []
-
-    for line in text.splitlines():
-        match = re.match(date_pattern, line.strip())
-        if match:
-            # New date found, determine bucket
-            month, day, year = match.groups()
-            if len(year) == 2: year = "20" + year # Assume 20xx
-            
-            # Pad month
-            month = month.zfill(2)
-            new_bucket = f"{year}-{month}"
-            
-            # Flush previous bucket if content exists
-            if current_lines:
-                if current_bucket not in chunks: chunks[current_bucket] = []
-                chunks[current_bucket].append("\n".join(current_lines))
-            
-            current_bucket = new_bucket
-            current_lines = [line]
-        else:
-            current_lines.append(line)
-            
-    # Flush final
-    if current_lines:
-        if current_bucket not in chunks: chunks[current_bucket] = []
-        chunks[current_bucket].append("\n".join(current_lines))
-        
-    # Join lists into single strings
-    return {k: "\n".join(v) for k, v in chunks.items()}
+    return group_spans(iter_date_spans(buf, fallback_year or "Unknown"))
+
+def parse_chunks(text, filename, file_type="LOG", fallback_year=None):
+    """
+    Parses text into Month or Year buckets. 
+    Returns dict: {'YYYY-MM': 'content...'} or {'YYYY': 'content...'}
+    """
+    buf = text.encode('utf-8')
+    return {b: spans_text(buf, spans) for b, spans in bucket_spans(buf, file_type, fallback_year).items()}
+
+def bucket_pieces(buf, filename, bucket_id, spans, content_hash, state, budget=CHUNK_TOKEN_BUDGET):
+    """
+    The pending pieces of one bucket: the bucket itself when it is a single sub-chunk,
+    otherwise those of its content-defined parts not yet recorded under chunk_id::parts,
+    so an edit to a month only requeues the sub-chunks it touched.
+    Returns (part hashes, or [] for an unsplit bucket, [piece, ...]).
+    """
+    chunk_id = f"{filename}::{bucket_id}"
+    parts = split_spans(buf, spans, budget)
+    if len(parts) == 1:
+        return [], [{"id": chunk_id, "bucket": bucket_id, "hash": content_hash, "spans": parts[0], "tokens": spans_tokens(buf, parts[0])}]
+    part_hashes = [spans_hash(buf, part) for part in parts]
+    done = set(state.get(f"{chunk_id}::parts", []))
+    return part_hashes, [
+        {"id": chunk_id, "bucket": bucket_id, "hash": content_hash, "part": h, "parts": part_hashes,
+         "index": i, "spans": part, "tokens": spans_tokens(buf, part)}
+        for i, (h, part) in enumerate(zip(part_hashes, parts)) if h not in done and not is_held(state, chunk_id, h)
+    ]
+
+def piece_label(piece):
+    return piece["bucket"] + (f"#{piece['index']}" if "part" in piece else "")
+
+def build_task(buf, filename, file_type, pieces, blobs):
+    """One queue task for a packed group of pieces; its text goes straight into the blob store."""
+    text = "\n".join(spans_text(buf, piece["spans"]) for piece in pieces)
+    task_id = f"{filename}::{piece_label(pieces[0])}"
+    if len(pieces) > 1:
+        task_id += f"..{piece_label(pieces[-1])}"
+    buckets = list(dict.fromkeys(piece["bucket"] for piece in pieces))
+    return {
+        "id": task_id,
+        "filename": filename,
+        "bucket": buckets[0],
+        "buckets": buckets,
+        "type": file_type,
+        "priority": 10 if file_type == "LOG" else 20, # Prioritize strategy
+        "hash": blobs.put(text),
+        "tokens": sum(piece["tokens"] for piece in pieces) + len(pieces) - 1, # Scheduling cost
+        # chunk_state entries the nibbler marks done once this task captures data
+        "members": [{k: piece[k] for k in ("id", "hash", "part", "parts") if k in piece} for piece in pieces]
+    }
+
+def chunk_file(filepath, file_type, year_guess, inventory, blobs, state, st=None, budget=CHUNK_TOKEN_BUDGET):
+    """
+    Streams a file through the date chunker and records its content and chunk hashes
+    in the inventory. Buckets that still need nibbling are planned into token-budget
+    sized tasks: buckets are cut into content-defined sub-chunks, and the pending ones
+    from the same year are packed together. Returns ({bucket: hash}, [task, ...]).
+    """
+    filename = os.path.basename(filepath)
+    try:
+        with open_chunk_buffer(filepath) as buf:
+            if not buf:
+                return {}, []
+            chunk_hashes, chunk_parts = {}, {}
+            pieces = []
+            for bucket_id, spans in bucket_spans(buf, file_type, year_guess).items():
+                content_hash = spans_hash(buf, spans)
+                chunk_hashes[bucket_id] = content_hash
+                # [FEAT-429] Poison Chunk Quarantine Protocol
+                if needs_nibble(state, f"{filename}::{bucket_id}", content_hash):
+                    part_hashes, pending = bucket_pieces(buf, filename, bucket_id, spans, content_hash, state, budget)
+                    if part_hashes:
+                        chunk_parts[bucket_id] = part_hashes
+                    pieces.extend(pending)
+            groups = pack_pieces(pieces, budget, group_of=lambda piece: piece["bucket"][:4])
+            tasks = [build_task(buf, filename, file_type, group, blobs) for group in groups]
+            file_hash = buffer_hash(buf)
+    except Exception as e:
+        print(f"Error reading {filepath}: {e}")
+        return {}, []
+    inventory.record(filepath, file_hash, chunks=chunk_hashes, chunk_params=[file_type, year_guess], st=st, parts=chunk_parts)
+    return chunk_hashes, tasks
+
+def needs_nibble(state, chunk_id, content_hash):
+    """[FEAT-429] Is this chunk NEW or CHANGED and NOT QUARANTINED (or backing off after a failure)?"""
+    if state.get(f"{chunk_id}::status") == "QUARANTINED":
+        return False
+    return state.get(chunk_id) != content_hash and not is_held(state, chunk_id, content_hash)
+
+def bucket_pending(state, chunk_id, content_hash, part_hashes=None):
+    """needs_nibble for a bucket; a split bucket only counts while one of its parts is neither done nor held."""
+    if not needs_nibble(state, chunk_id, content_hash):
+        return False
+    if not part_hashes:
+        return True
+    done = set(state.get(f"{chunk_id}::parts", []))
+    return any(h not in done and not is_held(state, chunk_id, h) for h in part_hashes)
 
 def main():
     print("--- Scan Queue Manager v2.1 (Hardened & Meta-Aware) ---")
@@ -124,20 +182,15 @@ def main():
     else:
         state = {}
         
-    # Load Existing Queue
-    if os.path.exists(QUEUE_FILE):
-        with open(QUEUE_FILE, 'r') as f:
-            try:
-                queue = json.load(f)
-            except: queue = []
-    else:
-        queue = []
-
-    files = sorted(
-        glob.glob(NOTES_GLOB, recursive=True) + 
-        glob.glob(RAS_GLOB, recursive=True) +
-        glob.glob(DOCX_GLOB, recursive=True)
-    )
+    # Open Shared Queue (migrates a legacy queue.json on first use)
+    queue = WorkQueue()
+    blobs = BlobStore()
+    inventory = FileInventory()
+
+    # Shared epoch walk from mass_scan (--walk=PATH), or a direct scandir pass
+    walk = load_corpus_walk(sys.argv)
+    stats = {e["path"]: entry_stat(e) for e in walk}
+    files = note_files(walk)
     tasks_added = 0
     
     for filepath in files:
@@ -159,44 +212,36 @@ def main():
         if not should_process:
             continue
 
-        text = read_file(filepath)
-        if not text: continue
-        
-        # Chunking
-        chunks = parse_chunks(text, filename, file_type=file_type, fallback_year=year_guess)
-        
-        for bucket_id, content in chunks.items():
-            content_hash = get_hash(content)
-            chunk_id = f"{filename}::{bucket_id}"
-            
-# [FEAT-429] Poison Chunk Quarantine Protocol
-            # Logic: Is this chunk NEW or CHANGED and NOT QUARANTINED?
-            if state.get(f"{chunk_id}::status") == "QUARANTINED":
+        st = stats[filepath]
+
+        # Chunking is skipped entirely when size/mtime/inode match the inventory
+        # and no bucket (or split bucket part) of the file is left to nibble
+        chunk_hashes = inventory.cached_chunks(filepath, [file_type, year_guess], st=st)
+        if chunk_hashes is not None:
+            chunk_parts = inventory.cached_parts(filepath, st=st)
+            if not any(bucket_pending(state, f"{filename}::{b}", h, chunk_parts.get(b)) for b, h in chunk_hashes.items()):
                 continue
-            if state.get(chunk_id) != content_hash:
-                # Add to queue
-                task = {
-                    "id": chunk_id,
-                    "filename": filename,
-                    "bucket": bucket_id,
-                    "type": file_type, 
-                    "priority": 10 if file_type == "LOG" else 20, # Prioritize strategy
-                    "content": content
-                }
-                
-                # Deduplicate queue
-                if not any(t['id'] == chunk_id for t in queue):
-                    queue.append(task)
-                    tasks_added += 1
-                    print(f"Queueing {chunk_id} ({file_type})")
-            
-    # Sort queue by priority DESC
-    queue.sort(key=lambda x: x.get('priority', 10), reverse=True)
-    
-    with open(QUEUE_FILE, 'w') as f:
-        json.dump(queue, f, indent=2)
-        
-    print(f"\nQueue Updated. {tasks_added} new tasks. Total Pending: {len(queue)}")
+        chunk_hashes, tasks = chunk_file(filepath, file_type, year_guess, inventory, blobs, state, st=st)
+        if not chunk_hashes:
+            continue # Empty or unreadable: leave its queued tasks alone
+
+        # The fresh plan replaces the file's queued tasks, so a re-pack under new task ids
+        # (an edit, a new month, other CDC cuts) does not queue the same chunks twice
+        added = queue.replace_group(f"{filename}::", tasks)
+        tasks_added += added
+        if added:
+            print(f"Queueing {added} task(s) for {filename} ({file_type})")
+
+    # Drop blobs of superseded chunk versions that no queued task still references
+    live_hashes = {t["hash"] for t in queue.tasks() if t.get("hash")}
+    pruned = blobs.prune(live_hashes)
+    inventory.prune(files)
+    inventory.save()
+    get_docx_cache().evict_missing()
+
+    print(f"\nQueue Updated. {tasks_added} new tasks. Total Pending: {queue.pending()}, "
+          f"ETA ~{queue.eta() / 60:.0f} min at {queue.tokens_per_sec:.0f} tok/s (pruned {pruned} stale blobs)")
+    queue.close()
 
 if __name__ == "__main__":
     main()
@@ -1,43 +1,24 @@
-import re
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from date_chunker import open_buffer, iter_date_spans, date_label, spans_text
 
 def parse_notes_into_chunks(text):
-    # Regex for M/D/Y patterns at the start of a line
+    # Shared streaming chunker: M/D/Y patterns at the start of a line
     # Supports 1/1/16, 12/12/2016, etc.
-    date_pattern = r'^(\d{1,2}/\d{1,2}/\d{2,4})'
-    
-    chunks = []
-    current_date = "Header/Unknown"
-    current_content = []
-    
-    lines = text.splitlines()
-    for line in lines:
-        match = re.match(date_pattern, line.strip())
-        if match:
-            # Save previous chunk
-            if current_content:
-                chunks.append({"date": current_date, "content": "\n".join(current_content)})
-            
-            current_date = match.group(1)
-            current_content = [line]
-        else:
-            current_content.append(line)
-            
-    # Add final chunk
-    if current_content:
-        chunks.append({"date": current_date, "content": "\n".join(current_content)})
-        
-    return chunks
+    buf = text.encode('utf-8')
+    return [
+        {"date": date, "content": spans_text(buf, [(start, end)])}
+        for date, start, end in iter_date_spans(buf, "Header/Unknown", bucket_of=date_label)
+    ]
 
 if __name__ == "__main__":
     test_file = "raw_notes/notes_2016_MVE.txt"
-    with open(test_file, 'r', encoding='utf-8', errors='ignore') as f:
-        text = f.read()
+    # Stream spans straight off the mmap; no entry text is materialized
+    with open_buffer(test_file) as buf:
+        spans = list(iter_date_spans(buf, "Header/Unknown", bucket_of=date_label))
     
-    chunks = parse_notes_into_chunks(text)
-    print(f"Total chunks found: {len(chunks)}")
-    for chunk in chunks[:5]:
-        print(f"Date: {chunk['date']} | Content Length: {len(chunk['content'])}")
-        # print(chunk['content'][:100])
-        # print("-" * 20)
-
+    print(f"Total chunks found: {len(spans)}")
+    for date, start, end in spans[:5]:
+        print(f"Date: {date} | Content Length: {end - start}")
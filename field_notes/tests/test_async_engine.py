@@ -0,0 +1,58 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Add the field_notes directory to sys.path to import ai_engine.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_engine import CognitiveEngine
+
+
+class SlowEngine(CognitiveEngine):
+    """Blocking engine that honours its cancel token like the streaming clients do."""
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.aborted = []
+        self.lock = threading.Lock()
+
+    def generate(self, prompt, context="", options=None, on_token=None, cancel=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            deadline = time.time() + (5 if prompt == "hang" else self.delay)
+            while time.time() < deadline:
+                if cancel.cancelled:
+                    self.aborted.append(prompt)
+                    cancel.check()
+                time.sleep(0.01)
+            if prompt == "boom":
+                raise ValueError("backend exploded")
+            return f'{{"echo": "{prompt}"}}'
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_agenerate_many_keeps_order_and_bounds_concurrency():
+    engine = SlowEngine()
+    prompts = [f"p{i}" for i in range(10)]
+    results = asyncio.run(engine.agenerate_many(prompts, concurrency=3))
+    assert results == [f'{{"echo": "p{i}"}}' for i in range(10)]
+    assert engine.peak == 3
+
+
+def test_timeouts_abort_the_call_and_errors_come_back_in_place():
+    engine = SlowEngine()
+    started = time.time()
+    results = asyncio.run(engine.agenerate_many(
+        ["ok", "hang", {"prompt": "boom"}], timeout=0.5, structured=True))
+    assert time.time() - started < 2
+    assert results[0] == '{"echo": "ok"}'
+    assert isinstance(results[1], TimeoutError) and engine.aborted == ["hang"]
+    assert isinstance(results[2], ValueError)
@@ -0,0 +1,32 @@
+import os
+import sys
+
+# Add the field_notes directory to sys.path to import blob_store.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blob_store import BlobStore, get_hash
+
+
+def test_put_get_roundtrip_keyed_by_md5(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    text = "1/2/24 Debugged PECI timeout on socket 1\n" * 50
+    content_hash = blobs.put(text)
+    assert content_hash == get_hash(text)
+    assert blobs.get(content_hash) == text
+    # Stored compressed
+    blob_path = tmp_path / content_hash[:2] / f"{content_hash}.z"
+    assert blob_path.stat().st_size < len(text)
+
+
+def test_missing_blob_returns_none(tmp_path):
+    assert BlobStore(str(tmp_path)).get("0" * 32) is None
+
+
+def test_prune_keeps_live_hashes(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    keep = blobs.put("keep me")
+    drop = blobs.put("drop me")
+    assert blobs.prune({keep}) == 1
+    assert blobs.has(keep)
+    assert not blobs.has(drop)
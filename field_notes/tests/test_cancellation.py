@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add the field_notes directory to sys.path to import cancellation.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ai_engine
+from cancellation import CancelToken, CancelWatcher, GenerationCancelled, run_cancellable
+
+
+class SlowStream:
+    """Ollama streaming reply that emits a few tokens, then blocks on the socket until closed."""
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.closed = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.closed.set()
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        for token in self.tokens:
+            yield json.dumps({"response": token, "done": False}).encode()
+        self.closed.wait(30)
+        raise ConnectionError("connection closed")
+
+
+def test_watcher_aborts_inflight_stream_within_a_second(monkeypatch):
+    stream = SlowStream(["partial ", "output "])
+    monkeypatch.setattr(ai_engine.http_pool, "stream", lambda *a, **kw: stream)
+    seen = []
+    lock_appeared = threading.Event()
+    threading.Timer(0.3, lock_appeared.set).start()
+
+    token = CancelToken()
+    started = time.time()
+    with pytest.raises(GenerationCancelled, match="session"):
+        with CancelWatcher(token, lambda: "session started" if lock_appeared.is_set() else None, poll=0.05):
+            ai_engine.stream_ollama("http://ollama/api/generate", {"prompt": "p"}, seen.append, token)
+    assert time.time() - started < 1.0
+    assert seen == ["partial ", "output "]
+    assert stream.closed.wait(1) # The connection was dropped, so the server stops generating
+
+
+def test_run_cancellable_returns_result_or_aborts_blocked_call():
+    assert run_cancellable(lambda: 42, None) == 42
+    assert run_cancellable(lambda: 42, CancelToken()) == 42
+
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel, args=("governor",)).start()
+    started = time.time()
+    with pytest.raises(GenerationCancelled):
+        run_cancellable(lambda: time.sleep(10), token, poll=0.05)
+    assert time.time() - started < 1.0
+
+
+def test_closers_run_once_and_can_be_unregistered():
+    token = CancelToken()
+    calls = []
+    token.on_cancel(lambda: calls.append("a"))
+    release = token.on_cancel(lambda: calls.append("b"))
+    release()
+    token.cancel("first")
+    token.cancel("second")
+    assert calls == ["a"] and token.reason == "first"
+    token.on_cancel(lambda: calls.append("late"))
+    assert calls == ["a", "late"]
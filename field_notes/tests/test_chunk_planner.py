@@ -0,0 +1,76 @@
+import os
+import sys
+
+# Add the field_notes directory to sys.path to import chunk_planner.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chunk_planner import split_spans, pack_pieces, spans_tokens, estimate_tokens
+from date_chunker import iter_date_spans, group_spans, spans_hash, spans_text
+
+
+def test_small_bucket_is_one_unchanged_part():
+    buf = b"1/2/24 a\n1/3/24 b"
+    spans = group_spans(iter_date_spans(buf, "Unknown"))["2024-01"]
+    parts = split_spans(buf, spans, budget=100)
+    assert len(parts) == 1
+    assert spans_hash(buf, parts[0]) == spans_hash(buf, spans)
+
+
+def test_parts_fit_budget_and_rejoin():
+    entries = [f"1/{d}/24 " + "x" * 20 + "\n" + "y" * 20 for d in range(1, 6)]
+    buf = "\n".join(entries).encode()
+    spans = group_spans(iter_date_spans(buf, "Unknown"))["2024-01"]
+    budget = 20 # One entry (17 tokens) per part
+    parts = split_spans(buf, spans, budget=budget)
+    assert len(parts) == 5
+    assert all(spans_tokens(buf, p) <= budget for p in parts)
+    # Parts joined back together are the original bucket text
+    assert "\n".join(spans_text(buf, p) for p in parts) == spans_text(buf, spans)
+
+    # A single entry larger than the budget is cut at its line breaks
+    parts = split_spans(buf, spans[:1], budget=12)
+    assert [spans_text(buf, p) for p in parts] == ["1/1/24 " + "x" * 20, "y" * 20]
+
+
+def test_token_estimate_errs_high_on_dense_logs():
+    assert estimate_tokens("debugged the retry path") == 5
+    dump = "0x0000: 1a 2b 3c 4d 5e 6f 70 81 | 0xffff: de ad be ef"
+    assert estimate_tokens(dump) > len(dump) // 2 # A plain chars / 4 ratio would say 14
+    assert estimate_tokens("caf\u00e9") == estimate_tokens("caf\u00e9".encode('utf-8')) == 3
+
+
+def test_crlf_bucket_splits_like_lf():
+    entries = [f"1/{d}/24 " + "x" * 20 + "\n" + "y" * 20 for d in range(1, 6)]
+    split = []
+    for newline in ("\n", "\r\n"):
+        buf = "\n".join(entries).replace("\n", newline).encode()
+        spans = group_spans(iter_date_spans(buf, "Unknown"))["2024-01"]
+        split.append([spans_text(buf, p) for p in split_spans(buf, spans, budget=20)])
+    assert split[0] == split[1] and len(split[1]) == 5
+
+
+def _part_hashes(text):
+    buf = text.encode()
+    spans = group_spans(iter_date_spans(buf, "Unknown"))["2024-03"]
+    return [spans_hash(buf, p) for p in split_spans(buf, spans)]
+
+
+def test_edit_only_changes_nearby_parts():
+    lines = [f"debugged PECI retry path, step {i}: register 0x{i * 7919 % 65536:04x} ok" for i in range(600)]
+    before = _part_hashes("3/1/24 start\n" + "\n".join(lines))
+    lines.insert(300, "NEW: found the firmware race")
+    after = _part_hashes("3/1/24 start\n" + "\n".join(lines))
+    assert len(before) > 5
+    assert len(set(after) - set(before)) <= 2
+
+
+def test_pack_merges_neighbours_within_budget_and_group():
+    pieces = [
+        {"bucket": "2023-12", "tokens": 10},
+        {"bucket": "2024-01", "tokens": 10},
+        {"bucket": "2024-02", "tokens": 10},
+        {"bucket": "2024-03", "tokens": 30},
+    ]
+    groups = pack_pieces(pieces, budget=32, group_of=lambda p: p["bucket"][:4])
+    assert [[p["bucket"] for p in g] for g in groups] == [["2023-12"], ["2024-01", "2024-02"], ["2024-03"]]
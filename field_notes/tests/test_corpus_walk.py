@@ -0,0 +1,45 @@
+import json
+import os
+import sys
+
+# Add the field_notes directory to sys.path to import corpus_walk.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus_walk import walk_corpus, note_files, dir_files, load_corpus_walk
+
+
+def build_tree(root):
+    (root / "2019").mkdir()
+    (root / "2019" / "deep").mkdir()
+    (root / ".git").mkdir()
+    (root / "notes_2024_PIAV.txt").write_text("1/2/24 a")
+    (root / "ras-viral.txt").write_text("ras")
+    (root / "Philosophy.docx").write_bytes(b"PK")
+    (root / "2019" / "riv_common.py").write_text("pass")
+    (root / "2019" / "deep" / "blackbox.py").write_text("pass")
+    (root / ".git" / "HEAD.txt").write_text("ref")
+    os.symlink(root / "ras-viral.txt", root / "2019" / "ras-link.txt")
+
+
+def test_walk_dedups_by_realpath_and_skips_hidden(tmp_path):
+    build_tree(tmp_path)
+    names = [os.path.basename(p) for p in note_files(walk_corpus(str(tmp_path)))]
+    # ras-viral.txt is listed once even though the symlink also reaches it
+    assert sorted(names) == ["Philosophy.docx", "notes_2024_PIAV.txt", "ras-viral.txt"]
+
+
+def test_dir_files_top_level_and_recursive(tmp_path):
+    build_tree(tmp_path)
+    entries = walk_corpus(str(tmp_path))
+    year_dir = str(tmp_path / "2019")
+    assert [os.path.basename(p) for p in dir_files(entries, year_dir)] == ["riv_common.py"]
+    assert sorted(os.path.basename(p) for p in dir_files(entries, year_dir, recursive=True)) == ["blackbox.py", "riv_common.py"]
+
+
+def test_load_walk_prefers_snapshot_for_same_root(tmp_path):
+    snapshot = tmp_path / "walk.json"
+    snapshot.write_text(json.dumps({"root": "/kb", "entries": [{"path": "/kb/a.txt", "size": 1, "mtime_ns": 1, "inode": 1}]}))
+    assert load_corpus_walk([f"--walk={snapshot}"], root="/kb")[0]["path"] == "/kb/a.txt"
+    # Snapshot for another root is ignored in favour of a direct walk
+    assert load_corpus_walk([f"--walk={snapshot}"], root=str(tmp_path / "empty")) == []
@@ -0,0 +1,71 @@
+import os
+import sys
+
+# Add the field_notes directory to sys.path to import date_chunker.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import date_chunker
+from date_chunker import open_buffer, iter_date_spans, group_spans, spans_hash, spans_text, date_label, buffer_hash
+from blob_store import get_hash
+
+NOTES = "TODO list\n1/2/24 Booted BMC\nretry ok\n  2/3/24 PECI stress\n1/15/2024 Back to Jan\n"
+
+
+def test_spans_slice_exact_entries():
+    buf = NOTES.encode('utf-8')
+    spans = list(iter_date_spans(buf, "2024"))
+    assert [(b, buf[s:e].decode()) for b, s, e in spans] == [
+        ("2024", "TODO list"),
+        ("2024-01", "1/2/24 Booted BMC\nretry ok"),
+        ("2024-02", "  2/3/24 PECI stress"),
+        ("2024-01", "1/15/2024 Back to Jan"),
+    ]
+
+
+def test_bucket_hash_matches_joined_text():
+    buf = NOTES.encode('utf-8')
+    grouped = group_spans(iter_date_spans(buf, "Unknown"))
+    text = spans_text(buf, grouped["2024-01"])
+    assert text == "1/2/24 Booted BMC\nretry ok\n1/15/2024 Back to Jan"
+    assert spans_hash(buf, grouped["2024-01"]) == get_hash(text)
+
+
+def test_date_labels_and_mmap(tmp_path):
+    note = tmp_path / "notes_2016_MVE.txt"
+    note.write_text(NOTES)
+    with open_buffer(str(note)) as buf:
+        labels = [d for d, _, _ in iter_date_spans(buf, "Header/Unknown", bucket_of=date_label)]
+    assert labels == ["Header/Unknown", "1/2/24", "2/3/24", "1/15/2024"]
+
+
+def test_empty_file(tmp_path):
+    empty = tmp_path / "empty.txt"
+    empty.write_text("")
+    with open_buffer(str(empty)) as buf:
+        assert list(iter_date_spans(buf, "Unknown")) == []
+
+
+def test_crlf_and_cr_files_chunk_and_hash_like_text_mode(tmp_path):
+    chunked = []
+    for name, newline in (("lf.txt", "\n"), ("crlf.txt", "\r\n"), ("cr.txt", "\r")):
+        note = tmp_path / name
+        # Undecodable bytes are dropped, as in text mode
+        note.write_bytes(b"\xff" + NOTES.replace("\n", newline).encode('utf-8'))
+        with open_buffer(str(note)) as buf:
+            grouped = group_spans(iter_date_spans(buf, "Unknown"))
+            texts = {b: spans_text(buf, s) for b, s in grouped.items()}
+            assert all(spans_hash(buf, s) == get_hash(texts[b]) for b, s in grouped.items())
+            chunked.append((texts, buffer_hash(buf)))
+        with open(note, 'r', encoding='utf-8', errors='ignore') as f: # How scan_pinky hashes it
+            assert chunked[-1][1] == get_hash(f.read())
+    assert chunked[0] == chunked[1] == chunked[2]
+    assert chunked[1][0]["2024-01"] == "1/2/24 Booted BMC\nretry ok\n1/15/2024 Back to Jan"
+
+
+def test_bucket_hash_is_the_decoded_text_hash(monkeypatch):
+    buf = "1/2/24 caf\u00e9\r\nmenu\r\n".encode('latin-1') # Not UTF-8: the \xe9 is dropped
+    monkeypatch.setattr(date_chunker, "HASH_BLOCK", 3) # CRLF and characters split across blocks
+    assert spans_hash(buf, [(0, len(buf))]) == get_hash("1/2/24 caf\nmenu\n")
+    utf8 = "1/2/24 caf\u00e9\r\nmenu".encode('utf-8')
+    assert spans_hash(utf8, [(0, len(utf8))]) == get_hash("1/2/24 caf\u00e9\nmenu")
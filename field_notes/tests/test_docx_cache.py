@@ -0,0 +1,52 @@
+import os
+import sys
+import types
+
+# Add the field_notes directory to sys.path to import docx_cache.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx_cache
+from docx_cache import DocxTextCache
+
+
+def fake_docx2txt(calls):
+    def process(path):
+        calls.append(path)
+        return f"extracted from {os.path.basename(path)}"
+    return types.SimpleNamespace(process=process)
+
+
+def test_extraction_is_cached_across_instances(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(docx_cache, "docx2txt", fake_docx2txt(calls))
+    doc = tmp_path / "Philosophy.docx"
+    doc.write_bytes(b"PK fake")
+
+    assert DocxTextCache(str(tmp_path / "cache")).extract(str(doc)) == "extracted from Philosophy.docx"
+    assert DocxTextCache(str(tmp_path / "cache")).extract(str(doc)) == "extracted from Philosophy.docx"
+    assert len(calls) == 1
+
+
+def test_modified_docx_is_reextracted(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(docx_cache, "docx2txt", fake_docx2txt(calls))
+    doc = tmp_path / "Review.docx"
+    doc.write_bytes(b"v1")
+    cache = DocxTextCache(str(tmp_path / "cache"))
+    cache.extract(str(doc))
+    doc.write_bytes(b"version two")
+    cache.extract(str(doc))
+    assert len(calls) == 2
+
+
+def test_evict_missing_sources(tmp_path, monkeypatch):
+    monkeypatch.setattr(docx_cache, "docx2txt", fake_docx2txt([]))
+    doc = tmp_path / "Gone.docx"
+    doc.write_bytes(b"x")
+    cache = DocxTextCache(str(tmp_path / "cache"))
+    cache.extract(str(doc))
+    doc.unlink()
+    assert cache.evict_missing() == 1
+    assert cache.index == {}
+    assert list((tmp_path / "cache" / "text").rglob("*.z")) == []
@@ -0,0 +1,65 @@
+import os
+import sys
+
+# Add the field_notes directory to sys.path to import file_inventory.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_inventory import FileInventory
+from blob_store import get_hash
+
+
+def counting_reader():
+    calls = []
+    def reader(path):
+        calls.append(path)
+        with open(path, 'r') as f:
+            return f.read()
+    return reader, calls
+
+
+def test_unchanged_file_is_not_reread(tmp_path):
+    note = tmp_path / "notes_2024.txt"
+    note.write_text("1/2/24 first entry\n")
+    inventory = FileInventory(str(tmp_path / "inv.json"))
+    reader, calls = counting_reader()
+    assert inventory.file_hash(str(note), reader) == get_hash("1/2/24 first entry\n")
+    assert inventory.file_hash(str(note), reader) == get_hash("1/2/24 first entry\n")
+    assert len(calls) == 1
+
+
+def test_modified_file_is_rehashed(tmp_path):
+    note = tmp_path / "notes_2024.txt"
+    note.write_text("old")
+    inventory = FileInventory(str(tmp_path / "inv.json"))
+    reader, calls = counting_reader()
+    inventory.file_hash(str(note), reader)
+    note.write_text("new text")
+    assert inventory.file_hash(str(note), reader) == get_hash("new text")
+    assert len(calls) == 2
+
+
+def test_cached_chunks_survive_reload_and_respect_params(tmp_path):
+    note = tmp_path / "notes_2024.txt"
+    note.write_text("1/2/24 entry")
+    inv_path = str(tmp_path / "inv.json")
+    inventory = FileInventory(inv_path)
+    inventory.record(str(note), "h", chunks={"2024-01": "c1"}, chunk_params=["LOG", None], parts={"2024-01": ["p0", "p1"]})
+    inventory.save()
+
+    reloaded = FileInventory(inv_path)
+    assert reloaded.cached_chunks(str(note), ["LOG", None]) == {"2024-01": "c1"}
+    assert reloaded.cached_chunks(str(note), ["META", "2024"]) is None
+    assert reloaded.cached_parts(str(note)) == {"2024-01": ["p0", "p1"]}
+
+
+def test_prune_forgets_deleted_files(tmp_path):
+    keep = tmp_path / "keep.txt"
+    gone = tmp_path / "gone.txt"
+    keep.write_text("a")
+    gone.write_text("b")
+    inventory = FileInventory(str(tmp_path / "inv.json"))
+    inventory.record(str(keep), "a")
+    inventory.record(str(gone), "b")
+    assert inventory.prune([str(keep)]) == 1
+    assert inventory.lookup(str(gone)) is None
@@ -1,6 +1,7 @@
 import sys
 import os
 import re
+import random
 import logging
 
 # Set up logging for test
@@ -43,5 +44,31 @@ Next Year's Technical Strategy
         if forbidden_found: print("  - Reason: Forbidden section found.")
         if not safe_found: print("  - Reason: Safe section missing.")
 
+def reference_guillotine(text):
+    """The original per-line implementation, kept to pin the compiled version's output."""
+    forbidden = [r"AREAS FOR IMPROVEMENT", r"AREAS FOR DEVELOPMENT", r"Results Coaching", r"Behaviors Coaching",
+                 r"Behaviors Feedback", r"Coach\b", r"Growth Feedback"]
+    safe = [r"Next Year's Technical Strategy", r"Future Goals", r"Technical Strategy",
+            r"Strategic Focal Points", r"Architecture Plans"]
+    clean_lines, is_dropped = [], False
+    for line in text.splitlines():
+        if any(re.search(p, line, re.IGNORECASE) for p in forbidden):
+            is_dropped = True
+            continue
+        if is_dropped and any(re.search(p, line, re.IGNORECASE) for p in safe):
+            is_dropped = False
+        if not is_dropped:
+            clean_lines.append(line)
+    return "\n".join(clean_lines)
+
+def test_compiled_guillotine_matches_reference():
+    rng = random.Random(19)
+    pool = ["plain note", "", "  ", "Areas for Improvement", "Coaching tips", "my coach said", "Growth Feedback",
+            "future goals:", "Technical Strategy / Coach", "Architecture Plans", "x\r", "1/2/24 fixed PECI"]
+    for _ in range(500):
+        lines = [rng.choice(pool) for _ in range(rng.randint(0, 12))]
+        text = rng.choice(["\n", "\r\n"]).join(lines) + rng.choice(["", "\n"])
+        assert scrub_input_buffer(text) == reference_guillotine(text), text
+
 if __name__ == "__main__":
     test_guillotine()
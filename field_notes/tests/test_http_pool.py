@@ -0,0 +1,92 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add the field_notes directory to sys.path to import http_pool.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_pool
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive
+    failures = {} # path -> 503s left to serve
+    peers = []
+    active = [0, 0] # in flight, peak
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self):
+        Handler.peers.append(self.client_address[1])
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        if Handler.failures.get(self.path, 0):
+            Handler.failures[self.path] -= 1
+            return self._reply(503, {"error": "loading"})
+        if self.path == "/slow":
+            Handler.active[0] += 1
+            Handler.active[1] = max(Handler.active)
+            time.sleep(0.1)
+            Handler.active[0] -= 1
+        self._reply(200, {"ok": self.path})
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(http_pool, "RETRY_BASE", 0.01)
+    Handler.failures, Handler.peers, Handler.active = {}, [], [0, 0]
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_calls_to_one_host_reuse_a_connection(server):
+    for _ in range(5):
+        assert http_pool.post(f"{server}/api/generate", json={"p": 1}).json() == {"ok": "/api/generate"}
+    with http_pool.stream("GET", f"{server}/api/tags") as resp:
+        assert resp.json() == {"ok": "/api/tags"}
+    assert len(set(Handler.peers)) == 1
+    assert http_pool.get_pool(f"{server}/x") is http_pool.get_pool(server)
+
+
+def test_only_idempotent_calls_are_retried(server):
+    Handler.failures = {"/api/tags": 2, "/api/generate": 1}
+    assert http_pool.get(f"{server}/api/tags").status_code == 200
+    assert http_pool.post(f"{server}/api/generate").status_code == 503
+    Handler.failures["/api/generate"] = 1
+    assert http_pool.post(f"{server}/api/generate", idempotent=True).status_code == 200
+
+
+def test_refused_connection_retries_then_raises(monkeypatch):
+    monkeypatch.setattr(http_pool, "RETRY_BASE", 0.01)
+    with pytest.raises(http_pool.requests.exceptions.ConnectionError):
+        http_pool.get("http://127.0.0.1:9/api/tags")
+
+
+def test_per_host_limit_caps_requests_in_flight(server):
+    http_pool.configure(server, limit=2)
+    threads = [threading.Thread(target=http_pool.get, args=(f"{server}/slow",)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert Handler.active[1] == 2
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add the field_notes directory to sys.path to import hub_session.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ai_engine_v2
+from cancellation import CancelToken, GenerationCancelled
+from hub_session import HubSession
+
+
+class FakeHub:
+    """Scripted Hub socket: answers each text_input with its words, one message per word."""
+    def __init__(self, echo_ids=True, delay=0.02):
+        self.echo_ids = echo_ids
+        self.delay = delay
+        self.sent = []
+        self.inbox = asyncio.Queue()
+        self.closed = False
+
+    async def send(self, raw):
+        message = json.loads(raw)
+        self.sent.append(message)
+        if message["type"] == "text_input":
+            asyncio.ensure_future(self._answer(message))
+
+    async def _answer(self, message):
+        if "hang" in message["content"]:
+            return
+        words = message["content"].split()[2:]
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.delay)
+            reply = {"brain": word + " ", "brain_source": "Brain", "final": i == len(words) - 1}
+            if self.echo_ids:
+                reply["request_id"] = message["request_id"]
+            self.inbox.put_nowait(json.dumps(reply))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raw = await self.inbox.get()
+        if raw is None:
+            raise StopAsyncIteration
+        return raw
+
+    async def close(self):
+        self.closed = True
+        self.inbox.put_nowait(None)
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    sockets, sessions = [], []
+
+    def make(echo_ids=True):
+        async def connect(uri):
+            sockets.append(FakeHub(echo_ids))
+            return sockets[-1]
+
+        session = HubSession("ws://hub", connect=connect)
+        sessions.append(session)
+        monkeypatch.setattr(ai_engine_v2, "get_session", lambda uri: session)
+        return session, sockets
+
+    yield make
+    for session in sessions:
+        session.close()
+
+
+def test_calls_share_one_connection_and_handshake(hub):
+    session, sockets = hub()
+    client = ai_engine_v2.McpClient()
+    assert client.generate("alpha beta") == "alpha beta "
+    assert client.generate("gamma") == "gamma "
+    assert session.connects == 1
+    assert [m["type"] for m in sockets[0].sent] == ["handshake", "text_input", "text_input"]
+
+
+def test_concurrent_calls_are_matched_by_request_id(hub):
+    session, sockets = hub()
+    client = ai_engine_v2.McpClient()
+    client.generate("warm up") # Learns that the Hub echoes ids
+    started = time.time()
+    results = asyncio.run(client.agenerate_many([f"p{i} a b c d" for i in range(5)]))
+    assert results == [f"p{i} a b c d " for i in range(5)]
+    assert time.time() - started < 0.4 # Interleaved, not one after another
+    assert session.connects == 1
+
+
+def test_lost_connection_fails_the_call_and_the_next_one_reconnects(hub):
+    session, sockets = hub()
+    client = ai_engine_v2.McpClient()
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(text=client.generate("hang")))
+    worker.start()
+    time.sleep(0.1)
+    session.loop.call_soon_threadsafe(sockets[0].inbox.put_nowait, None) # Hub restarts
+    worker.join(2)
+    assert result["text"] == ""
+    assert client.generate("back again") == "back again "
+    assert session.connects == 2
+
+
+def test_cancel_abandons_untagged_exchange_and_drops_its_socket(hub):
+    session, sockets = hub(echo_ids=False)
+    client = ai_engine_v2.McpClient()
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel, args=("Round Table session started",)).start()
+    with pytest.raises(GenerationCancelled):
+        client.generate("hang", cancel=token)
+    time.sleep(0.1)
+    assert sockets[0].closed # Its tail can't leak into the next untagged reply
+    assert client.generate("fresh start") == "fresh start "
+    assert session.connects == 2
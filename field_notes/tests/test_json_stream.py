@@ -0,0 +1,62 @@
+import json
+import os
+import sys
+
+# Add the field_notes directory to sys.path to import json_stream.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ai_engine
+from json_stream import JsonValueScanner, first_json_text
+
+
+def test_scanner_closes_on_first_value_across_chunks():
+    scanner = JsonValueScanner()
+    chunks = ['Sure! ', '[{"summary": "fixed ]', ' in \\"regex\\"", ', '"tags": ["a"]}', ']', ' Hope that helps [']
+    closed_at = next(i for i, chunk in enumerate(chunks) if scanner.feed(chunk))
+    assert closed_at == 4
+    assert scanner.value == [{"summary": 'fixed ] in "regex"', "tags": ["a"]}]
+    assert json.loads(scanner.text) == scanner.value
+
+
+def test_unparseable_brackets_are_skipped():
+    assert first_json_text('See [sic] and {not json} then {"rank": 2} {"rank": 3}') == '{"rank": 2}'
+    assert first_json_text("no structure here") is None
+    assert first_json_text(None) is None
+
+
+class FakeStream:
+    """Ollama /api/generate streaming reply, one NDJSON line per token."""
+    def __init__(self, tokens):
+        self.lines = [json.dumps({"response": t, "done": False}).encode() for t in tokens]
+        self.served = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        for line in self.lines:
+            self.served += 1
+            yield line
+
+
+def test_ollama_stream_hangs_up_when_value_closes(monkeypatch):
+    stream = FakeStream(['[{"date": "2024-01-02",', ' "summary": "x"}', ']', ' extra', ' chatter'])
+    sent = {}
+
+    def fake_post(method, url, json=None, **kwargs):
+        sent.update(json)
+        return stream
+
+    monkeypatch.setattr(ai_engine.http_pool, "stream", fake_post)
+    text = ai_engine.stream_ollama_json("http://ollama/api/generate", {"prompt": "p"}, ai_engine.EVENT_LIST_SCHEMA)
+    assert json.loads(text) == [{"date": "2024-01-02", "summary": "x"}]
+    assert sent["stream"] is True and sent["format"] == ai_engine.EVENT_LIST_SCHEMA
+    assert stream.served == 3 and stream.closed
@@ -0,0 +1,112 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add the field_notes directory to sys.path to import llm_cache.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_engine import CognitiveEngine
+from cancellation import CancelToken, GenerationCancelled
+from llm_cache import CachedEngine, ResponseCache
+
+
+class CountingEngine(CognitiveEngine):
+    url = "http://ollama/api/generate"
+    model = "llama3.1:8b"
+
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    def generate(self, prompt, context="", options=None, on_token=None, cancel=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        return f"answer to {prompt.strip()}"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm_cache.db"))
+    yield cache
+    cache.close()
+
+
+def test_repeat_calls_are_served_from_disk(cache, tmp_path):
+    backend = CountingEngine()
+    engine = CachedEngine(backend, cache)
+    assert engine.generate("classify this\r\n") == "answer to classify this"
+    seen = []
+    assert engine.generate("classify this  ", on_token=seen.append) == "answer to classify this"
+    assert backend.calls == 1 and engine.last_hit and seen == ["answer to classify this"]
+    engine.generate("classify this", options={"temperature": 0.7}) # Options are part of the key
+    engine.generate_json("classify this") # So is structured mode
+    assert backend.calls == 3
+
+    # A later run (new process) starts warm
+    reopened = ResponseCache(cache.path)
+    assert CachedEngine(CountingEngine(), reopened).generate("classify this") == "answer to classify this"
+    stats = reopened.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 3 and stats["entries"] == 3
+    reopened.close()
+
+
+def test_lru_eviction_keeps_recently_used(cache):
+    cache.max_bytes = 100
+    for i in range(4):
+        cache.put(f"k{i}", "b", None, "x" * 30)
+        time.sleep(0.01)
+        if i == 1:
+            cache.get("k0") # Touch: k1 is now the oldest
+    assert cache.get("k1") is None and cache.get("k0") is not None
+    assert cache.stats()["bytes"] <= 100 and cache.stats()["evictions"] == 1
+
+
+def test_identical_inflight_calls_run_once(cache):
+    backend = CountingEngine(delay=0.2)
+    engine = CachedEngine(backend, cache)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(engine.generate("same prompt"))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert backend.calls == 1 and results == ["answer to same prompt"] * 5
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_failures_are_not_cached_and_waiters_can_cancel(cache):
+    class Failing(CountingEngine):
+        def generate(self, *args, **kwargs):
+            super().generate(*args, **kwargs)
+            return None
+
+    backend = Failing()
+    engine = CachedEngine(backend, cache)
+    assert engine.generate("p") is None and engine.generate("p") is None
+    assert backend.calls == 2
+
+    slow = CachedEngine(CountingEngine(delay=1.0), cache)
+    threading.Thread(target=slow.generate, args=("slow",)).start()
+    time.sleep(0.1)
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel, args=("lock",)).start()
+    started = time.time()
+    with pytest.raises(GenerationCancelled):
+        slow.generate("slow", cancel=token)
+    assert time.time() - started < 0.8
+
+
+def test_forget_last_sends_the_retry_to_the_backend(cache):
+    backend = CountingEngine()
+    engine = CachedEngine(backend, cache)
+    engine.generate("extract events")
+    engine.generate("extract events")
+    assert backend.calls == 1 and engine.last_hit
+    engine.forget_last() # The caller judged the answer unusable
+    engine.generate("extract events")
+    assert backend.calls == 2 and not engine.last_hit
+    assert cache.stats()["invalidations"] == 1
@@ -8,12 +8,12 @@ sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import mass_scan
+import utils
 from mass_scan import (
     register_pid,
     check_lock,
     atomic_write_text,
     wait_for_roundtable_lock,
-    lock_pid_alive,
     MASS_SCAN_PID_FILE,
 )
 
@@ -48,7 +48,7 @@ def test_check_lock_absent(tmp_path):
 def test_check_lock_stale_pid_recovery(tmp_path, monkeypatch):
     lock = tmp_path / "round_table.lock"
     lock.write_text("99999999")  # a PID that is not alive
-    monkeypatch.setattr(mass_scan, "lock_pid_alive", lambda pid: False)
+    monkeypatch.setattr(utils, "lock_pid_alive", lambda pid: False)
     assert check_lock(str(lock)) is False
     assert not lock.exists()
 
@@ -56,11 +56,24 @@ def test_check_lock_stale_pid_recovery(tmp_path, monkeypatch):
 def test_check_lock_live_pid(tmp_path, monkeypatch):
     lock = tmp_path / "round_table.lock"
     lock.write_text(str(os.getpid()))
-    monkeypatch.setattr(mass_scan, "lock_pid_alive", lambda pid: True)
+    monkeypatch.setattr(utils, "lock_pid_alive", lambda pid: True)
     monkeypatch.setattr("os.path.getmtime", lambda p: time.time() - 10)
     assert check_lock(str(lock)) is True
 
 
+def test_stale_lock_is_reported_once_per_mtime(tmp_path, caplog):
+    lock = tmp_path / "round_table.lock"
+    lock.write_text("")
+    stale = time.time() - 3600
+    os.utime(lock, (stale, stale))
+    with caplog.at_level("WARNING"):
+        for _ in range(4):
+            assert check_lock(str(lock)) is False
+        os.utime(lock, (stale + 1, stale + 1))
+        assert check_lock(str(lock)) is False
+    assert sum("Stale Round Table Lock" in r.message for r in caplog.records) == 2
+
+
 def test_wait_for_lock_timeout(tmp_path):
     lock = tmp_path / "round_table.lock"
     lock.write_text(str(os.getpid()))  # held by a live PID
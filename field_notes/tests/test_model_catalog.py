@@ -0,0 +1,68 @@
+import os
+import sys
+
+# Add the field_notes directory to sys.path to import model_catalog.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ai_engine
+from model_catalog import ModelCatalog, pick_model
+
+URL = "http://localhost:11434/api/generate"
+
+
+class FakeTags:
+    def __init__(self, models):
+        self.models = models
+        self.calls = 0
+
+    def __call__(self, url):
+        self.calls += 1
+        if isinstance(self.models, Exception):
+            raise self.models
+        return list(self.models)
+
+
+def make_catalog(path, fetch, clock):
+    return ModelCatalog(path=str(path), ttl=600, down_ttl=60, fetch=fetch, clock=lambda: clock[0])
+
+
+def test_list_is_shared_across_processes_until_ttl(tmp_path):
+    path, clock = tmp_path / "catalog.json", [1000.0]
+    fetch = FakeTags(["llama3.1:8b", "nomic-embed-text"])
+    assert make_catalog(path, fetch, clock).models(URL) == ["llama3.1:8b", "nomic-embed-text"]
+    # A second short-lived process reads the file instead of probing
+    assert make_catalog(path, fetch, clock).models(URL) == ["llama3.1:8b", "nomic-embed-text"]
+    assert fetch.calls == 1
+    clock[0] += 601
+    make_catalog(path, fetch, clock).models(URL)
+    assert fetch.calls == 2
+
+
+def test_down_host_is_probed_once_and_keeps_last_list(tmp_path):
+    path, clock = tmp_path / "catalog.json", [1000.0]
+    make_catalog(path, FakeTags(["llama3.1:8b"]), clock).models(URL)
+    clock[0] += 700
+    down = FakeTags(ConnectionError("refused"))
+    for _ in range(3):
+        assert make_catalog(path, down, clock).models(URL) == ["llama3.1:8b"]
+    assert down.calls == 1
+    clock[0] += 61
+    make_catalog(path, down, clock).models(URL)
+    assert down.calls == 2
+
+
+def test_pick_model_falls_back_to_a_generation_model():
+    assert pick_model("llama3.1:8b", ["nomic-embed-text", "llama3.1:8b"]) == "llama3.1:8b"
+    assert pick_model("missing", ["nomic-embed-text", "qwen2:7b"]) == "qwen2:7b"
+    assert pick_model("missing", None) == "missing"
+
+
+def test_client_construction_does_not_probe(tmp_path, monkeypatch):
+    fetch = FakeTags(["qwen2:7b"])
+    monkeypatch.setattr(ai_engine, "CATALOG", make_catalog(tmp_path / "catalog.json", fetch, [0.0]))
+    client = ai_engine.OllamaClient()
+    assert fetch.calls == 0
+    assert client.model == "qwen2:7b" and fetch.calls == 1
+    client.model = "pinned"
+    assert client.model == "pinned"
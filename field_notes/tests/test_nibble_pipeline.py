@@ -0,0 +1,156 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# Add the directory to sys.path to import nibble_v2
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import nibble_v2
+from blob_store import BlobStore
+from engine_stats import EngineStats
+from work_queue import WorkQueue
+from write_behind import WriteBehind
+
+
+def test_next_task_is_prepared_off_thread_during_generation(tmp_path, monkeypatch):
+    queue = WorkQueue(str(tmp_path / "q.db"), str(tmp_path / "legacy.json"))
+    blobs = BlobStore(str(tmp_path / "blobs"))
+    store = WriteBehind(str(tmp_path / "journal"))
+    for month in ("01", "02", "03"):
+        text = f"1/{int(month)}/24 fixed bug {month}"
+        queue.enqueue({"id": f"notes::2024-{month}", "filename": "notes", "bucket": f"2024-{month}",
+                       "type": "LOG", "priority": 10, "hash": blobs.put(text), "tokens": 10})
+
+    prefetch = nibble_v2.Prefetcher()
+    scrub_threads = {}
+    ahead_during_generation = []
+
+    def scrub(content):
+        scrub_threads[content[-2:]] = threading.current_thread() is threading.main_thread()
+        return content
+
+    class Engine:
+        def generate_json(self, prompt, schema=None, cancel=None, **kwargs):
+            ahead_during_generation.append(prefetch.task["id"] if prefetch.task else None)
+            month = prompt[-2:]
+            return json.dumps([{"date": f"2024-{month}-01", "summary": f"bug {month}", "sensitivity": "Public"}])
+
+    monkeypatch.setattr(nibble_v2, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(nibble_v2, "STATE_FILE", str(tmp_path / "chunk_state.json"))
+    monkeypatch.setattr(nibble_v2, "ENGINE_STATS", EngineStats(str(tmp_path / "stats.json")))
+    monkeypatch.setattr(nibble_v2, "get_engine", lambda mode: Engine())
+    monkeypatch.setattr(nibble_v2, "scrub_input_buffer", scrub)
+    monkeypatch.setattr(nibble_v2, "should_yield", lambda: False)
+    monkeypatch.setattr(nibble_v2, "update_status", lambda *a, **kw: None)
+    monkeypatch.setattr(nibble_v2.time, "sleep", lambda s: None)
+
+    assert nibble_v2.nibble(queue, blobs, store, limit=3, mode="LOCAL", fast=True, prefetch=prefetch) == 3
+    assert ahead_during_generation == ["notes::2024-02", "notes::2024-03", None]
+    assert scrub_threads == {"01": True, "02": False, "03": False}
+    assert queue.pending() == 0 and prefetch.task is None
+    with open(tmp_path / "2024_03.json") as f:
+        assert json.load(f)[0]["summary"] == "bug 03"
+
+
+def make_pipeline(tmp_path, monkeypatch, engine, months=("01", "02", "03")):
+    queue = WorkQueue(str(tmp_path / "q.db"), str(tmp_path / "legacy.json"))
+    blobs = BlobStore(str(tmp_path / "blobs"))
+    store = WriteBehind(str(tmp_path / "journal"))
+    for month in months:
+        queue.enqueue({"id": f"notes::2024-{month}", "filename": "notes", "bucket": f"2024-{month}",
+                       "type": "LOG", "priority": 10, "hash": blobs.put(f"1/{int(month)}/24 note {month}"),
+                       "tokens": 10})
+    monkeypatch.setattr(nibble_v2, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(nibble_v2, "STATE_FILE", str(tmp_path / "chunk_state.json"))
+    monkeypatch.setattr(nibble_v2, "ENGINE_STATS", EngineStats(str(tmp_path / "stats.json")))
+    monkeypatch.setattr(nibble_v2, "get_engine", lambda mode: engine)
+    monkeypatch.setattr(nibble_v2, "should_yield", lambda: False)
+    monkeypatch.setattr(nibble_v2, "update_status", lambda *a, **kw: None)
+    monkeypatch.setattr(nibble_v2.time, "sleep", lambda s: None)
+    return queue, blobs, store
+
+
+def test_single_task_dispatches_run_the_peeked_task_and_hold_no_lease(tmp_path, monkeypatch):
+    ran = []
+
+    class Engine:
+        def generate_json(self, prompt, schema=None, cancel=None, **kwargs):
+            ran.append(prompt[-2:])
+            return json.dumps([{"date": f"2024-{prompt[-2:]}-01", "summary": "x", "sensitivity": "Public"}])
+
+    queue, blobs, store = make_pipeline(tmp_path, monkeypatch, Engine())
+    # mass_scan's loop: peek picks the engine, the worker runs one task per request
+    peeked = []
+    while (task := queue.peek()) is not None:
+        peeked.append(task["bucket"][-2:])
+        assert nibble_v2.nibble(queue, blobs, store, limit=1, mode="LOCAL", fast=True) == 1
+    assert peeked == ran == ["01", "02", "03"]
+    assert queue.pending() == 0
+
+
+def test_auto_runs_pick_the_engine_per_task_and_prefetch_within_the_dispatch(tmp_path, monkeypatch):
+    ran = []
+
+    class Engine:
+        def __init__(self, mode):
+            self.mode = mode
+
+        def generate_json(self, prompt, schema=None, cancel=None, **kwargs):
+            ran.append((self.mode, prompt[-2:], queue.peek() is None))
+            return json.dumps([{"date": "2023-01-01", "summary": prompt[-2:], "sensitivity": "Public"}])
+
+    queue, blobs, store = make_pipeline(tmp_path, monkeypatch, None, months=("01", "02"))
+    queue.enqueue({"id": "notes::2023-03", "filename": "notes", "bucket": "2023-03", "type": "LOG",
+                   "priority": 10, "hash": blobs.put("3/1/23 note 03"), "tokens": 10})
+    monkeypatch.setattr(nibble_v2, "get_engine", Engine)
+    # mass_scan's dispatch: one multi-task --auto run
+    assert nibble_v2.nibble(queue, blobs, store, limit=8, mode=nibble_v2.engine_mode_for(["--auto"]), fast=True) == 3
+    # The next task was already leased (being prepared) while each earlier one generated
+    assert ran == [("HYBRID", "01", False), ("HYBRID", "02", True), ("REASONING", "03", True)]
+    assert queue.pending() == 0
+
+
+def test_only_real_answers_count_as_chunk_failures(tmp_path, monkeypatch):
+    class Engine:
+        def generate_json(self, prompt, schema=None, cancel=None, **kwargs):
+            # 01: Ollama unreachable (the client returns None), 02: answered with nothing usable
+            return None if prompt.endswith("01") else "[]"
+
+    queue, blobs, store = make_pipeline(tmp_path, monkeypatch, Engine(), months=("01", "02"))
+    assert nibble_v2.nibble(queue, blobs, store, limit=2, mode="LOCAL", fast=True) == 2
+    state = store.get(nibble_v2.STATE_FILE, {})
+    assert "notes::2024-01::failures" not in state
+    assert [r["attempts"] for r in state["notes::2024-02::failures"].values()] == [1]
+
+
+def test_failed_cached_answer_is_forgotten_and_costs_no_tokens(tmp_path, monkeypatch):
+    class Engine:
+        last_hit = True # Served from the response cache
+        forgotten = 0
+
+        def generate_json(self, prompt, schema=None, cancel=None, **kwargs):
+            return "[]"
+
+        def forget_last(self):
+            self.forgotten += 1
+
+    engine = Engine()
+    queue, blobs, store = make_pipeline(tmp_path, monkeypatch, engine, months=("01",))
+    assert nibble_v2.nibble(queue, blobs, store, limit=1, mode="LOCAL", fast=True) == 1
+    record, = store.get(nibble_v2.STATE_FILE, {})["notes::2024-01::failures"].values()
+    assert record["attempts"] == 1 and record["tokens"] == 0
+    assert engine.forgotten == 1 # The retry asks the model again
+
+
+def test_only_a_live_round_table_lock_cancels_generation(tmp_path, monkeypatch):
+    lock = tmp_path / "round_table.lock"
+    monkeypatch.setattr(nibble_v2, "ROUND_TABLE_LOCK", str(lock))
+    assert nibble_v2.interactive_session() is None
+    lock.write_text(str(os.getpid()))
+    assert nibble_v2.interactive_session() == "Round Table session started"
+    os.utime(lock, (time.time() - 3600, time.time() - 3600)) # Left behind an hour ago
+    assert nibble_v2.interactive_session() is None
+    lock.write_text("99999999") # Holder died
+    assert nibble_v2.interactive_session() is None and not lock.exists()
@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+import time
+
+# Add the field_notes directory to sys.path to import nibbler_worker.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nibbler_worker import dispatch, send, serve, worker_alive
+
+
+def start_worker(path, handler):
+    thread = threading.Thread(target=serve, args=(handler, path), kwargs={"idle_timeout": 30}, daemon=True)
+    thread.start()
+    deadline = time.time() + 5
+    while not worker_alive(path) and time.time() < deadline:
+        time.sleep(0.05)
+    return thread
+
+
+def test_requests_reuse_one_warm_worker(tmp_path):
+    path = str(tmp_path / "w.sock")
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return {"ok": True, "processed": request["limit"]}
+
+    thread = start_worker(path, handler)
+    assert send({"cmd": "ping"}, path)["pid"] == os.getpid()
+    assert send({"cmd": "run", "flags": ["--reasoning"], "limit": 1}, path) == {"ok": True, "processed": 1}
+    assert send({"cmd": "run", "flags": [], "limit": 2}, path)["processed"] == 2
+    assert len(calls) == 2
+
+    assert send({"cmd": "shutdown"}, path)["ok"]
+    thread.join(timeout=5)
+    assert not os.path.exists(path)
+    assert send({"cmd": "ping"}, path) is None
+
+
+def test_handler_errors_are_replied_not_fatal(tmp_path):
+    path = str(tmp_path / "w.sock")
+
+    def handler(request):
+        raise RuntimeError("engine exploded")
+
+    thread = start_worker(path, handler)
+    assert send({"cmd": "run", "flags": [], "limit": 1}, path) == {"ok": False, "error": "engine exploded"}
+    assert send({"cmd": "ping"}, path)["ok"]
+    send({"cmd": "shutdown"}, path)
+    thread.join(timeout=5)
+
+
+def test_busy_worker_times_out_without_looking_absent(tmp_path):
+    path = str(tmp_path / "w.sock")
+    release = threading.Event()
+
+    def handler(request):
+        release.wait(5) # A generation (or a pacing pause) outlasting the caller's timeout
+        return {"ok": True, "processed": 1}
+
+    thread = start_worker(path, handler)
+    reply = send({"cmd": "run", "flags": [], "limit": 1}, path, timeout=0.2)
+    assert reply["timeout"] and not reply["ok"] # Not None: callers must not start a one-shot nibbler
+    # The next dispatch queues behind the busy worker instead of falling back
+    result = {}
+    dispatcher = threading.Thread(target=lambda: result.update(reply=dispatch("unused.py", [], path=path)))
+    dispatcher.start()
+    release.set()
+    dispatcher.join(5)
+    assert result["reply"] == {"ok": True, "processed": 1}
+    send({"cmd": "shutdown"}, path)
+    thread.join(timeout=5)
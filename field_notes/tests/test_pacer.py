@@ -0,0 +1,67 @@
+import os
+import sys
+
+# Add the field_notes directory to sys.path to import pacer.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pacer
+from pacer import Pacer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_pacer(readings, load=0.5):
+    clock = FakeClock()
+    gpu = iter(readings)
+    last = [readings[-1]]
+
+    def read_gpu():
+        last[0] = next(gpu, last[0])
+        return last[0]
+
+    return Pacer(read_gpu=read_gpu, read_load=lambda: load, sleep=clock.sleep, clock=clock.time), clock
+
+
+def test_cool_idle_machine_runs_nearly_back_to_back():
+    p, _ = make_pacer([(55, 0)])
+    waits = [p.pause()[0] for _ in range(5)]
+    assert waits == [pacer.MIN_DELAY] * 5
+    assert p.delay == pacer.MIN_DELAY # Recovered additively from START_DELAY
+
+
+def test_hot_gpu_backs_off_and_returns_once_cooled():
+    p, clock = make_pacer([(78, 0), (76, 0), (70, 0)])
+    waited, reason = p.pause()
+    assert reason.startswith("GPU 78C")
+    assert p.delay == pacer.START_DELAY * pacer.BACKOFF_FACTOR
+    assert waited == pacer.MIN_DELAY + 2 * pacer.POLL_SECONDS # Cooled before the ceiling
+
+
+def test_hard_ceiling_waits_past_the_delay():
+    p, _ = make_pacer([(90, 0)] * 200 + [(60, 0)])
+    waited, _ = p.pause()
+    assert waited > p.delay
+
+
+def test_external_reasons_wait_out_a_growing_delay():
+    p, _ = make_pacer([(50, 0)])
+    waits = [p.pause("Round Table lock")[0] for _ in range(6)]
+    assert waits[:3] == [30.0, 60.0, 120.0]
+    assert waits[-1] == pacer.MAX_DELAY
+
+
+def test_load_and_foreign_gpu_use_count_as_pressure():
+    assert make_pacer([(50, 0)], load=3.5)[0].sample().startswith("Load 3.50")
+    assert make_pacer([(50, 95)])[0].sample() == "GPU busy (95%)"
+    no_gpu = Pacer(read_gpu=lambda: None, read_load=lambda: 0.1)
+    assert no_gpu.sample() is None
@@ -0,0 +1,56 @@
+import os
+import sys
+
+# Add the field_notes directory to sys.path to import quarantine.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quarantine
+from quarantine import is_held, record_failure, quarantined
+
+
+def fail(state, members, now, tokens=900):
+    state.update(record_failure(state, members, "Engine Error: timeout", tokens, now=now))
+
+
+def test_failures_back_off_exponentially_then_quarantine():
+    state, member = {}, {"id": "notes.txt::2024-01", "hash": "aaa"}
+    fail(state, [member], now=1000)
+    record = state["notes.txt::2024-01::failures"]["aaa"]
+    assert record["attempts"] == 1 and record["tokens"] == 900
+    assert record["retry_after"] == 1000 + quarantine.BACKOFF_SECONDS
+    assert is_held(state, member["id"], "aaa", now=1001)
+    assert not is_held(state, member["id"], "aaa", now=record["retry_after"])
+
+    fail(state, [member], now=2000)
+    assert state["notes.txt::2024-01::failures"]["aaa"]["retry_after"] == 2000 + 2 * quarantine.BACKOFF_SECONDS
+    for attempt in range(quarantine.MAX_ATTEMPTS - 2):
+        fail(state, [member], now=3000 + attempt)
+    record = state["notes.txt::2024-01::failures"]["aaa"]
+    assert record["quarantined"] and record["tokens"] == 900 * quarantine.MAX_ATTEMPTS
+    assert is_held(state, member["id"], "aaa", now=10 ** 12) # Never expires...
+    assert not is_held(state, member["id"], "bbb", now=1001) # ...but edited content starts over
+
+
+def test_parts_are_tracked_separately_and_share_the_cost():
+    state = {}
+    members = [{"id": "planner.txt::2024", "hash": "bkt", "part": "p1"},
+               {"id": "notes.txt::2024-02", "hash": "ccc"}]
+    fail(state, members, now=1000, tokens=1000)
+    assert state["planner.txt::2024::failures"] == {"p1": state["planner.txt::2024::failures"]["p1"]}
+    assert state["planner.txt::2024::failures"]["p1"]["tokens"] == 500
+    assert state["notes.txt::2024-02::failures"]["ccc"]["tokens"] == 500
+
+
+def test_report_lists_automatic_and_manual_quarantine(capsys):
+    state = {"old.txt::2019::status": "QUARANTINED"}
+    member = {"id": "notes.txt::2024-01", "hash": "aaa"}
+    for attempt in range(quarantine.MAX_ATTEMPTS):
+        fail(state, [member], now=1000 + attempt)
+    fail(state, [{"id": "notes.txt::2024-03", "hash": "ddd"}], now=1000) # Backing off, not quarantined
+
+    rows = quarantine.report(state)
+    assert [(chunk_id, h) for chunk_id, h, _ in rows] == [("notes.txt::2024-01", "aaa"), ("old.txt::2019", None)]
+    out = capsys.readouterr().out
+    assert "attempts=3" in out and "timeout" in out and f"~{900 * quarantine.MAX_ATTEMPTS} prompt tokens" in out
+    assert quarantined({}) == []
@@ -0,0 +1,40 @@
+import mmap
+import os
+import sys
+
+# Add the field_notes directory to sys.path to import rule_engine.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rule_engine import RuleSet
+
+
+def test_match_reports_first_listed_rule_and_counts():
+    rules = RuleSet([r"feedback", r"Growth Feedback", r"Coach\b"])
+    assert rules.match("Positive GROWTH FEEDBACK here") == "feedback"
+    assert rules.match("Coaching session") is None
+    assert rules.match("met my coach") == r"Coach\b"
+    assert rules.match("Über-COACH") == r"Coach\b" # Non-ASCII text takes the re.IGNORECASE path
+    assert rules.hits == {"feedback": 1, r"Coach\b": 2}
+
+
+def test_scan_yields_only_matching_lines():
+    rules = RuleSet({"drop": r"AREAS FOR IMPROVEMENT", "coach": r"Coach\b"})
+    text = "intro\nAreas for improvement\nbody\nHead Coach\n\nlast coach"
+    lines = [(rule, text[start:end]) for rule, start, end in rules.scan(text)]
+    assert lines == [("drop", "Areas for improvement"), ("coach", "Head Coach"), ("coach", "last coach")]
+
+
+def test_scan_ignores_matches_spanning_lines():
+    rules = RuleSet([r"needs\sto improve"])
+    assert list(rules.scan("he needs\nto improve")) == []
+    assert [s for _, s, _ in rules.scan("ok\nneeds to improve")] == [3]
+
+
+def test_scan_runs_over_mmap(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"1/2/24 fine\n" * 1000 + b"Results Coaching\n" + b"1/3/24 fine\n" * 1000)
+    rules = RuleSet([r"RESULTS coaching"]) # Case-insensitive, searched in place
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        (rule, start, end), = rules.scan(mm)
+        assert mm[start:end] == b"Results Coaching"
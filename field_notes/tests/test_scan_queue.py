@@ -0,0 +1,32 @@
+import os
+import sys
+import time
+
+# Add the field_notes directory to sys.path to import scan_queue.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scan_queue import bucket_pending, chunk_file
+from blob_store import BlobStore
+from file_inventory import FileInventory
+
+
+def test_split_bucket_with_only_held_parts_is_not_pending(tmp_path):
+    note = tmp_path / "notes_2024.txt"
+    note.write_text("".join(f"1/{day}/24 entry number {day} about the retry path\n" for day in range(1, 7)))
+    inventory = FileInventory(str(tmp_path / "inv.json"))
+    chunk_hashes, tasks = chunk_file(str(note), "LOG", None, inventory, BlobStore(str(tmp_path / "blobs")), {}, budget=20)
+    chunk_id, content_hash = "notes_2024.txt::2024-01", chunk_hashes["2024-01"]
+    parts = inventory.cached_parts(str(note))["2024-01"]
+    assert len(parts) > 1 and len(tasks) > 1
+
+    # One part nibbled, the rest backing off after failures
+    later = time.time() + 3600
+    state = {f"{chunk_id}::parts": parts[:1],
+             f"{chunk_id}::failures": {h: {"attempts": 1, "retry_after": later} for h in parts[1:]}}
+    assert not bucket_pending(state, chunk_id, content_hash, parts)
+    assert bucket_pending(state, chunk_id, content_hash) # Unknown parts: only the bucket check
+    assert chunk_file(str(note), "LOG", None, inventory, BlobStore(str(tmp_path / "blobs")), state, budget=20)[1] == []
+
+    state[f"{chunk_id}::failures"][parts[-1]]["retry_after"] = 0
+    assert bucket_pending(state, chunk_id, content_hash, parts)
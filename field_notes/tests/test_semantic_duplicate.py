@@ -0,0 +1,44 @@
+import difflib
+import os
+import random
+import sys
+
+# Add the directory to sys.path to import nibble_v2
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nibble_v2 import is_near_duplicate, is_semantic_duplicate, SummaryIndex
+
+
+def reference(new_summary, existing_events, threshold=0.85):
+    return any(
+        difflib.SequenceMatcher(None, new_summary.lower(), e.get('summary', '').lower()).ratio() > threshold
+        for e in existing_events
+    )
+
+
+def test_prefilter_keeps_exact_ratio_semantics():
+    rng = random.Random(7)
+    words = ["PECI", "BMC", "retry", "fixed", "firmware", "race", "in", "the", "boot", "path", "timeout"]
+    summaries = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 12))) for _ in range(300)]
+    events = [{"summary": s} for s in summaries[:150]]
+    for new in summaries[150:] + ["fixed PECI retry in the boot path", ""]:
+        assert is_semantic_duplicate(new, events) == reference(new, events)
+
+
+def test_sequence_order_is_new_then_existing():
+    # ratio() is 0.844 one way round and 0.862 the other
+    first = "in timeout timeout in fixed fixed timeout fixed in peci"
+    second = "boot peci timeout in fixed fixed timeout fixed in peci"
+    assert not is_near_duplicate(first, [second])
+    assert is_near_duplicate(second, [first])
+
+
+def test_summary_index_tracks_appends():
+    events = [{"date": "2024-01-02", "summary": "Fixed PECI retry"}]
+    index = SummaryIndex()
+    assert index.on_date("b.json", events, "2024-01-02") == ["fixed peci retry"]
+    new = {"date": "2024-01-02", "summary": "Fixed PECI retry path"}
+    assert is_near_duplicate(new["summary"].lower(), index.on_date("b.json", events, "2024-01-02"))
+    events.append({"date": "2024-01-03", "summary": "BMC boot"})
+    index.add("b.json", events[-1])
+    assert index.on_date("b.json", events, "2024-01-03") == ["bmc boot"]
@@ -0,0 +1,110 @@
+import json
+import os
+import sys
+import time
+
+# Add the field_notes directory to sys.path to import work_queue.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from work_queue import SCHEDULE_ORDER, WorkQueue
+
+
+def make_task(chunk_id, priority=10):
+    return {"id": chunk_id, "filename": "notes.txt", "bucket": "2024-01", "type": "LOG", "priority": priority}
+
+
+def test_enqueue_unique_chunk_id(tmp_path):
+    queue = WorkQueue(str(tmp_path / "q.db"), legacy_path=None)
+    assert queue.enqueue(make_task("a::2024-01")) is True
+    assert queue.enqueue(make_task("a::2024-01")) is False
+    assert queue.pending() == 1
+
+
+def test_lease_orders_by_priority_then_fifo(tmp_path):
+    queue = WorkQueue(str(tmp_path / "q.db"), legacy_path=None)
+    queue.enqueue_many([make_task("log1"), make_task("meta", priority=20), make_task("log2")])
+    assert queue.peek()["id"] == "meta"
+    assert [queue.lease()["id"] for _ in range(3)] == ["meta", "log1", "log2"]
+    assert queue.lease() is None
+
+
+def test_ack_and_release(tmp_path):
+    queue = WorkQueue(str(tmp_path / "q.db"), legacy_path=None)
+    queue.enqueue(make_task("a"))
+    task = queue.lease()
+    assert queue.peek() is None
+    queue.release(task["id"])
+    assert queue.lease()["id"] == "a"
+    queue.ack("a")
+    assert queue.pending() == 0
+
+
+def test_expired_lease_is_served_again(tmp_path, monkeypatch):
+    queue = WorkQueue(str(tmp_path / "q.db"), legacy_path=None)
+    queue.enqueue(make_task("a"))
+    assert queue.lease(lease_seconds=60)["id"] == "a"
+    now = time.time()
+    monkeypatch.setattr("time.time", lambda: now + 61)
+    assert queue.lease()["id"] == "a"
+
+
+def test_legacy_queue_json_is_migrated(tmp_path):
+    legacy = tmp_path / "queue.json"
+    legacy.write_text(json.dumps([make_task("old1"), make_task("old2")]))
+    queue = WorkQueue(str(tmp_path / "q.db"), legacy_path=str(legacy))
+    assert queue.pending() == 2
+    assert not legacy.exists()
+    assert (tmp_path / "queue.json.migrated").exists()
+
+
+def test_shortest_job_first_within_band_with_aging(tmp_path, monkeypatch):
+    queue = WorkQueue(str(tmp_path / "q.db"), legacy_path=None, tokens_per_sec=10)
+    now = time.time()
+    monkeypatch.setattr("time.time", lambda: now)
+    queue.enqueue(dict(make_task("big"), tokens=6000))    # 600s
+    queue.enqueue(dict(make_task("small"), tokens=100))   # 10s
+    queue.enqueue(dict(make_task("meta", priority=20), tokens=9000))
+    assert [t["id"] for t in queue.tasks()] == ["meta", "small", "big"]
+    assert [round(finish) for _, finish in queue.schedule()] == [900, 910, 1510]
+    assert round(queue.eta()) == 1510
+
+    # After waiting long enough, the big task is aged ahead of a fresh small one
+    monkeypatch.setattr("time.time", lambda: now + 3600)
+    queue.ack("small")
+    queue.enqueue(dict(make_task("fresh"), tokens=100))
+    assert [t["id"] for t in queue.tasks()] == ["meta", "big", "fresh"]
+
+
+def planned(task_id, *units, hash=None):
+    members = [{"id": chunk, "hash": "bucket", "part": part} for chunk, part in units]
+    return {**make_task(task_id), "hash": hash or task_id, "members": members}
+
+
+def test_replan_replaces_the_files_queued_tasks(tmp_path):
+    queue = WorkQueue(str(tmp_path / "q.db"), legacy_path=None)
+    queue.enqueue(make_task("other.txt::2024-01"))
+    first = [planned("n.txt::2024-01#0..2024-01#1", ("n.txt::2024-01", "p0"), ("n.txt::2024-01", "p1")),
+             planned("n.txt::2024-02", ("n.txt::2024-02", "q0"))]
+    assert queue.replace_group("n.txt::", first) == 2
+    assert queue.replace_group("n.txt::", first) == 0 # Unchanged plan: nothing requeued
+
+    # p0 is being nibbled on its own; an edit and a new month re-pack the rest under new ids
+    queue.ack(first[0]["id"])
+    queue.enqueue(planned("n.txt::2024-01#0", ("n.txt::2024-01", "p0")))
+    queue.conn.execute("UPDATE tasks SET lease_until = ? WHERE id = ?", (time.time() + 60, "n.txt::2024-01#0"))
+    second = [planned("n.txt::2024-01#0", ("n.txt::2024-01", "p0"), hash="changed"),
+              planned("n.txt::2024-01#1..2024-03", ("n.txt::2024-01", "p1"), ("n.txt::2024-03", "r0"))]
+    assert queue.replace_group("n.txt::", second) == 1
+    ids = sorted(t["id"] for t in queue.tasks())
+    assert ids == ["n.txt::2024-01#0", "n.txt::2024-01#1..2024-03", "other.txt::2024-01"]
+
+
+def test_lease_walks_the_schedule_index(tmp_path):
+    queue = WorkQueue(str(tmp_path / "q.db"), legacy_path=None)
+    plan = queue.conn.execute(
+        f"EXPLAIN QUERY PLAN SELECT seq, payload FROM tasks WHERE lease_until < ? {SCHEDULE_ORDER} LIMIT 1",
+        (time.time(),)).fetchall()
+    details = " ".join(row[-1] for row in plan)
+    assert "idx_tasks_schedule" in details
+    assert "TEMP B-TREE" not in details
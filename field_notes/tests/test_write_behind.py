@@ -0,0 +1,68 @@
+import json
+import os
+import sys
+
+# Add the field_notes directory to sys.path to import write_behind.
+sys.path.append(os.path.abspath("Portfolio_Dev/field_notes"))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from write_behind import WriteBehind
+
+
+def read(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_writes_are_deferred_until_flush(tmp_path):
+    bucket, state = str(tmp_path / "2024_01.json"), str(tmp_path / "chunk_state.json")
+    store = WriteBehind(str(tmp_path / "journal"), flush_every=2)
+    store.append(bucket, [{"date": "2024-01-09", "summary": "b"}], sort_by="date")
+    store.append(bucket, [{"date": "2024-01-02", "summary": "a"}], sort_by="date")
+    store.update(state, {"notes.txt::2024-01": "h1"})
+    store.commit()
+    assert not os.path.exists(bucket) and not os.path.exists(state)
+
+    store.update(state, {"notes.txt::2024-02": "h2"})
+    store.commit() # Second commit reaches flush_every
+    assert [e["summary"] for e in read(bucket)] == ["a", "b"]
+    assert read(state) == {"notes.txt::2024-01": "h1", "notes.txt::2024-02": "h2"}
+    assert os.listdir(tmp_path / "journal") == []
+
+
+def test_crash_recovery_replays_journal_once(tmp_path):
+    bucket, state = str(tmp_path / "2024_01.json"), str(tmp_path / "chunk_state.json")
+    journal = tmp_path / "journal"
+    store = WriteBehind(str(journal), flush_every=100)
+    store.append(bucket, [{"date": "2024-01-02", "summary": "a"}])
+    store.update(state, {"k": "v"})
+    store.commit()
+    store.append(bucket, [{"date": "2024-01-03", "summary": "uncommitted"}])
+
+    # Simulate a crash after a flush that never got to truncate the journal:
+    # the bucket already holds the event, and the journal is left by a dead pid
+    with open(bucket, "w") as f:
+        json.dump([{"date": "2024-01-02", "summary": "a"}], f)
+    os.rename(store.journal_path, journal / "nibbler.999999999.jsonl")
+
+    WriteBehind(str(journal))
+    assert read(bucket) == [{"date": "2024-01-02", "summary": "a"}]
+    assert read(state) == {"k": "v"}
+    assert os.listdir(journal) == []
+
+
+def test_external_rewrite_is_merged_not_clobbered(tmp_path):
+    state = str(tmp_path / "chunk_state.json")
+    with open(state, "w") as f:
+        json.dump({"old": "x"}, f)
+    store = WriteBehind(str(tmp_path / "journal"), flush_every=100)
+    store.update(state, {"mine": "1"})
+    store.commit()
+
+    # A nudge script rewrites the state file behind our back
+    with open(state, "w") as f:
+        json.dump({"nudged": "y"}, f)
+    os.utime(state, ns=(1, 1))
+    assert store.get(state, {}) == {"nudged": "y", "mine": "1"}
+    store.flush()
+    assert read(state) == {"nudged": "y", "mine": "1"}
@@ -1,4 +1,5 @@
 import json
+import logging
 import os
 import time
 import glob
@@ -110,6 +111,18 @@ def get_vram_usage():
     except:
         return 0.0
 
+def get_gpu_telemetry():
+    """Returns (temperature_c, utilization_pct) of the first GPU via nvidia-smi, or None."""
+    try:
+        output = subprocess.check_output(
+            ["nvidia-smi", "--query-gpu=temperature.gpu,utilization.gpu", "--format=csv,nounits,noheader"],
+            encoding="utf-8", timeout=5
+        )
+        temp, util = map(float, output.strip().splitlines()[0].split(','))
+        return temp, util
+    except:
+        return None
+
 def get_free_vram_gb():
     """Returns free VRAM in gigabytes using nvidia-smi."""
     try:
@@ -123,6 +136,55 @@ def get_free_vram_gb():
 # [FEAT-373] Multi-Language Safe-Scalpel (Passive Mode)
         return 6.0  # Safe fallback estimate
 
+def lock_pid_alive(pid):
+    """Returns True if the given PID is still alive, False otherwise.
+    Non-int/empty values are treated as alive (True)."""
+    try:
+        pid = int(pid)
+    except (TypeError, ValueError):
+        return True
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+
+# Lock path -> mtime of the stale lock already reported; callers poll check_lock several times a second
+_STALE_LOCKS_LOGGED = {}
+
+def check_lock(lock_path):
+    """Returns True if background tasks should yield to Intercom."""
+    if os.path.exists(lock_path):
+        # Check for stale lock (older than 30 mins for faster recovery)
+        mtime = os.path.getmtime(lock_path)
+        if time.time() - mtime > 1800:
+            if _STALE_LOCKS_LOGGED.get(lock_path) != mtime:
+                _STALE_LOCKS_LOGGED[lock_path] = mtime
+                logging.warning("[LOCK] Stale Round Table Lock detected (>30m). Ignoring.")
+            return False
+        # If the lock file holds a valid PID that is no longer alive, treat as stale
+        try:
+            with open(lock_path, 'r') as f:
+                content = f.read().strip()
+            if content:
+                pid = int(content)
+                if not lock_pid_alive(pid):
+                    logging.warning(f"[LOCK] Round Table Lock PID {pid} is dead. Removing stale lock.")
+                    try:
+                        os.remove(lock_path)
+                    except OSError as e:
+                        logging.error(f"[LOCK] Failed to remove stale lock {lock_path}: {e}")
+                    return False
+        except (ValueError, OSError):
+            # Empty or unreadable content: fall back to mtime check only
+            pass
+        return True
+    return False
+
 def can_burn(max_load=4.0, check_vram=True, vram_threshold=0.95, min_free_vram_gb=2.0):
     """
     Politeness check for background tasks.
@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import time
+
+from utils import DATA_DIR
+from engine_stats import EngineStats
+
+# Config
+QUEUE_DB = os.path.join(DATA_DIR, "queue.db")
+LEGACY_QUEUE_FILE = os.path.join(DATA_DIR, "queue.json")
+DEFAULT_LEASE_SECONDS = 1800  # Matches mass_scan.run_task subprocess timeout
+AGING_FACTOR = 0.25 # Seconds of expected run time forgiven per second spent waiting
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    priority INTEGER NOT NULL DEFAULT 10,
+    payload TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    lease_until REAL NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0,
+    score REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_order ON tasks (priority DESC, seq);
+"""
+SCHEDULE_INDEX = "CREATE INDEX IF NOT EXISTS idx_tasks_schedule ON tasks (priority DESC, score, seq)"
+
+# Priority bands stay strict; within a band, shortest expected run time first, with
+# waiting time aged in so a large chunk cannot be starved by a stream of small ones.
+# The aged run time cost / rate - (now - enqueued_at) * AGING_FACTOR differs between
+# tasks only by cost / rate + enqueued_at * AGING_FACTOR, so that is stored as score
+# at enqueue time and lease()/peek() walk idx_tasks_schedule instead of sorting the table.
+SCHEDULE_ORDER = "ORDER BY priority DESC, score, seq"
+
+def task_units(task):
+    """(chunk id, content hash) units a task nibbles: its planner members, else the task itself."""
+    members = task.get('members')
+    if not members:
+        return {(task['id'], task.get('hash'))}
+    return {(m['id'], m.get('part') or m['hash']) for m in members}
+
+class WorkQueue:
+    """
+    Indexed, transactional work queue shared by scan_queue, nibble_v2, force_feed and mass_scan.
+    Replaces the rewrite-the-whole-list queue.json: enqueue/dequeue/ack touch one row,
+    in-flight tasks hold a lease (expired leases are re-served), and the chunk id is UNIQUE.
+    Each task's cost is its estimated prompt tokens; with the engine's historical rate
+    that gives the expected run time used for scheduling and ETAs.
+    """
+    def __init__(self, path=QUEUE_DB, legacy_path=LEGACY_QUEUE_FILE, tokens_per_sec=None):
+        self.path = path
+        self.tokens_per_sec = tokens_per_sec or EngineStats().tokens_per_sec()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit mode: every multi-statement operation opens its own explicit transaction
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(tasks)")}
+        if "cost" not in columns: # queue.db created before cost-aware scheduling
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN cost REAL NOT NULL DEFAULT 0")
+        if "score" not in columns: # queue.db created before the stored schedule score
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN score REAL NOT NULL DEFAULT 0")
+            self.conn.execute("UPDATE tasks SET score = cost / ? + enqueued_at * ?", (self.tokens_per_sec, AGING_FACTOR))
+        self.conn.execute(SCHEDULE_INDEX)
+        if legacy_path and os.path.exists(legacy_path):
+            self._migrate_legacy(legacy_path)
+
+    def _migrate_legacy(self, legacy_path):
+        """One-shot import of a pre-existing queue.json, preserving its order."""
+        try:
+            with open(legacy_path, 'r') as f:
+                legacy = json.load(f)
+        except Exception:
+            legacy = []
+        if isinstance(legacy, list):
+            self.enqueue_many(legacy)
+        os.replace(legacy_path, legacy_path + ".migrated")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _insert(self, task):
+        now, cost = time.time(), float(task.get('tokens', 0))
+        cur = self.conn.execute(
+            "INSERT OR IGNORE INTO tasks (id, priority, payload, enqueued_at, cost, score) VALUES (?, ?, ?, ?, ?, ?)",
+            (task['id'], int(task.get('priority', 10)), json.dumps(task), now, cost,
+             cost / self.tokens_per_sec + now * AGING_FACTOR)
+        )
+        return cur.rowcount == 1
+
+    def enqueue(self, task):
+        """Adds a task. Returns False if a task with the same id is already queued."""
+        return self._insert(task)
+
+    def enqueue_many(self, tasks):
+        """Adds tasks in one transaction. Returns the number actually inserted."""
+        added = 0
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for task in tasks:
+                if self._insert(task):
+                    added += 1
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def replace_group(self, prefix, tasks):
+        """
+        Makes tasks the queued work for every task id starting with prefix (one notes
+        file's "name::"), so a re-plan that packs the same chunks under new ids does not
+        queue them twice. Ready tasks of the group that are not in tasks are dropped; an
+        unchanged task keeps its place. In-flight tasks are left alone, and a new task
+        whose units are all in flight is skipped. Returns the number of tasks added.
+        """
+        now = time.time()
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1) # Range scan on the UNIQUE id index
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            ready, in_flight = {}, set()
+            for task_id, payload, lease_until in self.conn.execute(
+                    "SELECT id, payload, lease_until FROM tasks WHERE id >= ? AND id < ?", (prefix, upper)):
+                task = json.loads(payload)
+                if lease_until >= now:
+                    in_flight |= task_units(task)
+                else:
+                    ready[task_id] = task
+            added, keep = 0, set()
+            for task in tasks:
+                old = ready.get(task['id'])
+                if old is not None and old.get('hash') == task.get('hash'):
+                    keep.add(task['id'])
+                    continue
+                if task_units(task) <= in_flight:
+                    continue
+                if old is not None:
+                    self.conn.execute("DELETE FROM tasks WHERE id = ?", (task['id'],))
+                if self._insert(task):
+                    added += 1
+                    keep.add(task['id'])
+            for task_id in ready.keys() - keep:
+                self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def contains(self, task_id):
+        row = self.conn.execute("SELECT 1 FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return row is not None
+
+    def peek(self):
+        """Returns the next task that lease() would hand out, without leasing it."""
+        now = time.time()
+        row = self.conn.execute(
+            f"SELECT payload FROM tasks WHERE lease_until < ? {SCHEDULE_ORDER} LIMIT 1", (now,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def lease(self, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Dequeues the highest-priority ready task and marks it in-flight.
+        The task stays in the table until ack(); if the worker dies, the lease
+        expires and the task is served again.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                f"SELECT seq, payload FROM tasks WHERE lease_until < ? {SCHEDULE_ORDER} LIMIT 1", (now,)
+            ).fetchone()
+            if row:
+                self.conn.execute("UPDATE tasks SET lease_until = ? WHERE seq = ?", (now + lease_seconds, row[0]))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return json.loads(row[1]) if row else None
+
+    def ack(self, task_id):
+        """Removes a finished task (success or permanent skip)."""
+        self.conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def release(self, task_id):
+        """Returns a leased task to the ready set without losing its place."""
+        self.conn.execute("UPDATE tasks SET lease_until = 0 WHERE id = ?", (task_id,))
+
+    def tasks(self):
+        """Yields every queued task payload (including in-flight ones) in dequeue order."""
+        for task, _ in self.schedule():
+            yield task
+
+    def schedule(self):
+        """
+        Yields (task, expected_finish) for every queued task in dequeue order, where
+        expected_finish is the engine seconds from now until that task completes.
+        """
+        elapsed = 0.0
+        for payload, cost in self.conn.execute(f"SELECT payload, cost FROM tasks {SCHEDULE_ORDER}"):
+            elapsed += cost / self.tokens_per_sec
+            yield json.loads(payload), elapsed
+
+    def eta(self):
+        """Expected engine seconds to drain the whole queue at the historical rate."""
+        total = self.conn.execute("SELECT COALESCE(SUM(cost), 0) FROM tasks").fetchone()[0]
+        return total / self.tokens_per_sec
+
+    def pending(self):
+        """Total tasks in the queue, including in-flight ones."""
+        return self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
@@ -0,0 +1,145 @@
+import glob
+import json
+import os
+import time
+
+from utils import DATA_DIR, atomic_write_json
+
+# Config
+JOURNAL_DIR = os.path.join(DATA_DIR, "journal")
+FLUSH_EVERY = 20 # Commits (nibbled tasks) between flushes
+FLUSH_SECONDS = 300 # ...or this long since the last flush, whichever comes first
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _load(path, default):
+    try:
+        with open(path, 'r') as f:
+            doc = json.load(f)
+        return doc if isinstance(doc, type(default)) else default
+    except Exception:
+        return default
+
+def _default_for(op):
+    return [] if "append" in op else {}
+
+def _apply(doc, op, replay=False):
+    """Applies one journaled op. Replays skip items already present, so they are idempotent."""
+    if "append" in op:
+        for item in op["append"]:
+            if not (replay and item in doc):
+                doc.append(item)
+        if op.get("sort_by"):
+            doc.sort(key=lambda x: x.get(op["sort_by"], ''))
+    else:
+        doc.update(op["update"])
+
+class WriteBehind:
+    """
+    Write-behind cache for the nibbler's JSON documents (YYYY_MM.json buckets and
+    chunk_state.json). Mutations land in memory and in a per-process journal, one
+    fsync'd line per commit(); flush() atomically rewrites only the dirty documents,
+    every flush_every commits or flush_seconds, then truncates the journal. A journal
+    left behind by a crashed process is replayed on startup, so nothing committed is lost.
+    Documents rewritten by another process (refine_gem, nudge scripts) are re-read and
+    the unflushed ops re-applied on top.
+    """
+    def __init__(self, journal_dir=JOURNAL_DIR, flush_every=FLUSH_EVERY, flush_seconds=FLUSH_SECONDS):
+        os.makedirs(journal_dir, exist_ok=True)
+        self.journal_dir = journal_dir
+        self.journal_path = os.path.join(journal_dir, f"nibbler.{os.getpid()}.jsonl")
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.docs = {}      # path -> cached document
+        self.mtimes = {}    # path -> mtime_ns when we last read or wrote it
+        self.unflushed = {} # path -> committed ops not yet written to the document
+        self.pending = []   # ops of the current, uncommitted task
+        self.commits = 0
+        self.last_flush = time.time()
+        self.recover()
+
+    def get(self, path, default):
+        """The live document for path (default if the file is missing or unreadable)."""
+        mtime = _mtime_ns(path)
+        if path not in self.docs or mtime != self.mtimes.get(path):
+            doc = _load(path, default)
+            for op in self.unflushed.get(path, []) + [op for op in self.pending if op["path"] == path]:
+                _apply(doc, op, replay=True)
+            self.docs[path] = doc
+            self.mtimes[path] = mtime
+        return self.docs[path]
+
+    def append(self, path, items, sort_by=None):
+        op = {"path": path, "append": items, "sort_by": sort_by}
+        _apply(self.get(path, []), op)
+        self.pending.append(op)
+
+    def update(self, path, mapping):
+        op = {"path": path, "update": mapping}
+        _apply(self.get(path, {}), op)
+        self.pending.append(op)
+
+    def commit(self):
+        """Makes the current task's mutations durable with one journal append; flushes when due."""
+        if self.pending:
+            with open(self.journal_path, 'a') as f:
+                f.write(json.dumps({"ops": self.pending}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            for op in self.pending:
+                self.unflushed.setdefault(op["path"], []).append(op)
+            self.pending = []
+            self.commits += 1
+        if self.commits >= self.flush_every or (self.commits and time.time() - self.last_flush >= self.flush_seconds):
+            self.flush()
+
+    def flush(self):
+        """Atomically rewrites every dirty document, then truncates the journal."""
+        for path, ops in list(self.unflushed.items()):
+            doc = self.get(path, _default_for(ops[0]))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write_json(path, doc)
+            self.mtimes[path] = _mtime_ns(path)
+        self.unflushed = {}
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.commits = 0
+        self.last_flush = time.time()
+
+    def recover(self):
+        """Replays journals of this process and of nibblers that died before flushing."""
+        journals = []
+        for path in glob.glob(os.path.join(self.journal_dir, "nibbler.*.jsonl")):
+            try:
+                pid = int(os.path.basename(path).split(".")[1])
+            except ValueError:
+                continue
+            if pid == os.getpid() or not _pid_alive(pid):
+                journals.append(path)
+        for path in journals:
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        ops = json.loads(line)["ops"]
+                    except (ValueError, KeyError):
+                        continue # Torn final line: that task was never acked and will be re-served
+                    for op in ops:
+                        self.unflushed.setdefault(op["path"], []).append(op)
+        if self.unflushed:
+            self.flush()
+        for path in journals:
+            if os.path.exists(path):
+                os.remove(path)